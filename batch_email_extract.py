@@ -1,44 +1,216 @@
 import os
+import time
 import glob
-import subprocess
-from pathlib import Path
+import argparse
+
+from new_email_ext import (batch_process_from_excel, make_pool, print_pool_metrics, add_cache_arguments,
+                           make_cache, add_store_arguments, make_store, add_metrics_arguments, profile_file,
+                           add_concurrency_arguments, make_limiter, pool_size, add_host_arguments,
+                           install_scheduler, save_results, normalize_url, add_chunk_arguments,
+                           extract_websites, DEFAULT_RECYCLE_PAGES, DEFAULT_RECYCLE_MEMORY_MB, DEFAULT_CHECKOUT_TIMEOUT)
+from concurrency import AdaptiveConcurrency, DEFAULT_MAX_CONCURRENCY
+from metrics import metrics, profiled, RssMonitor
+from email_cache import site_key, ERROR
+from output_store import read_table, DEFAULT_CONSOLIDATED, DEFAULT_STORE_PATHS
+from job_queue import (open_queue, add_queue_arguments, add_requeue_arguments, WEBSITE_QUEUE, DEFAULT_MAX_ATTEMPTS,
+                       DEFAULT_REQUEUE_DAYS, DAY, READY, LEASED, DEAD)
+import resource_policy
+from service import run_remote, add_service_arguments, ServiceError, FAILED
 
 # Use the same data directory as other scripts
 DATA_DIR = 'data'
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def process_excel_file(excel_file):
-    """Process a single Excel file by running the email extractor."""
+INPUT_EXTENSIONS = ['.xlsx', '.csv', '.parquet']
+DEFAULT_POLL = 30
+MERGED_REPORT = os.path.join(DATA_DIR, 'batch_merged_metrics.json')
+
+def process_excel_file(excel_file, engine='auto', pool=None, cache=None, store=None, limiter=None, chunk_rows=None):
+    """Process a single Excel file with the email extractor, reusing the shared driver pool."""
     print(f"\n📊 Processing: {excel_file}")
     
     print(f"📨 Running email extraction for {excel_file}...")
     try:
-        # Run without capturing output to see real-time progress
-        result = subprocess.run(
-            ['python3', 'new_email_ext.py', '--excel', excel_file],
-            check=True
-        )
-        if result.returncode != 0:
-            print(f"❌ Process exited with code {result.returncode}")
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Failed processing {excel_file}. Return code: {e.returncode}")
-        if e.output:
-            print("Error output:", e.output.decode())
-    except FileNotFoundError:
-        print("❌ Error: Could not find python or new_email_ext.py. Make sure both exist in the current directory.")
+        batch_process_from_excel(excel_file, engine, pool, cache, store, limiter, chunk_rows)
+    except FileNotFoundError as e:
+        print(f"❌ Error: {e}")
     except Exception as e:
         print(f"❌ Unexpected error processing {excel_file}:", str(e))
 
-def main():
-    # Find all Excel files in the data directory that don't end with _updated.xlsx
-    excel_files = [
-        f for f in glob.glob(os.path.join(DATA_DIR, "*.xlsx"))
-        if not f.endswith("_updated.xlsx")
-    ]
-    # check there's no _update for each file
+def find_pending_files():
+    """Input sheets (.xlsx, .csv or .parquet) in the data directory that have no _updated counterpart yet."""
+    # Files the pipeline writes itself: the consolidated emails and the output stores
+    generated = {os.path.normpath(path) for path in [DEFAULT_CONSOLIDATED] + list(DEFAULT_STORE_PATHS.values())}
+    pending = []
+    for extension in INPUT_EXTENSIONS:
+        for f in sorted(glob.glob(os.path.join(DATA_DIR, f"*{extension}"))):
+            if f.endswith((f"_updated{extension}", f"_updated.partial{extension}", f"_updated.previous{extension}",
+                           f"_metrics{extension}")):
+                continue
+            if os.path.normpath(f) in generated:
+                continue
+            if not os.path.exists(f[:-len(extension)] + f"_updated{extension}"):
+                pending.append(f)
+    return pending
+
+def website_job_key(website):
+    """Queue key of a website: its site_key, so each site is fetched once across all sheets."""
+    url = normalize_url(website) if isinstance(website, str) else None
+    return (site_key(url) or url) if url else None
+
+
+def sheet_keys(df):
+    """row index -> website job key for the rows of a sheet that have a fetchable website."""
+    import pandas as pd
+    keys = {}
+    for idx, website in df['Website'].items():
+        if pd.notna(website) and website_job_key(website):
+            keys[idx] = website_job_key(website)
+    return keys
+
+
+def enqueue_files(excel_files, queue, max_attempts=DEFAULT_MAX_ATTEMPTS, requeue_days=DEFAULT_REQUEUE_DAYS):
+    """
+    Add a website job for every domain in the sheets, for worker.py to process.
+
+    Domains already in the queue are skipped unless their job finished or died
+    more than `requeue_days` days ago.
+    """
+    total = 0
+    skipped = 0
+    for excel_file in excel_files:
+        df = read_table(excel_file)
+        keys = sheet_keys(df)
+        items = {key: {'website': df.at[idx, 'Website']} for idx, key in keys.items()}
+        added = queue.put(WEBSITE_QUEUE, list(items.items()), max_attempts, requeue_after=requeue_days * DAY)
+        total += added
+        skipped += len(items) - added
+        print(f"📥 {os.path.basename(excel_file)}: queued {added} of {len(items)} domains")
+    if skipped:
+        print(f"⏭️ Skipped {skipped} domains queued or finished in the last {requeue_days:g} days; their results are "
+              f"reused by --collect (run 'python job_queue.py purge {WEBSITE_QUEUE}' to fetch them again)")
+    print(f"✅ Queued {total} website jobs at {queue.path}; run worker.py, then collect with --collect")
+
+
+def collect_files(excel_files, queue, store=None):
+    """
+    Write the _updated file of every sheet whose website jobs have all finished.
+
+    Dead-lettered websites get an "ERROR: ..." email like failed fetches in a
+    local run. Sheets with jobs still waiting or running are left for later.
+
+    Returns:
+        list: The sheets that are not finished yet
+    """
+    unfinished = []
     for excel_file in excel_files:
-        if os.path.exists(excel_file.replace(".xlsx", "_updated.xlsx")):
-            excel_files.remove(excel_file)
+        df = read_table(excel_file)
+        df['Email'] = df['Email'].astype(object) if 'Email' in df else None
+        keys = sheet_keys(df)
+        results = queue.results(WEBSITE_QUEUE, set(keys.values()))
+        missing = set(keys.values()) - set(results)
+        if missing:
+            print(f"⚠️ {os.path.basename(excel_file)}: {len(missing)} domains were never queued, run --enqueue first")
+            continue
+        waiting = sum(1 for status, _, _ in results.values() if status in (READY, LEASED))
+        if waiting:
+            print(f"⏳ {os.path.basename(excel_file)}: {waiting} of {len(results)} domains still queued or running")
+            unfinished.append(excel_file)
+            continue
+
+        for idx, key in keys.items():
+            status, result, error = results[key]
+            if status == DEAD:
+                df.at[idx, 'Email'] = 'ERROR: ' + (error or 'failed')
+            else:
+                df.at[idx, 'Email'] = result['email']
+        save_results(df, excel_file, store)
+    return unfinished
+
+
+def process_merged(excel_files, engine='auto', pool=None, cache=None, store=None, limiter=None):
+    """
+    Extract emails for all sheets in one pass, fetching each website once however many sheets list it.
+
+    The rows of every sheet are collapsed to their unique sites (site_key, so
+    www., trailing-slash and http/https variants are one fetch) and run through
+    a single extract_websites call, so the Chrome sessions stay busy until the
+    last website instead of draining at the end of every sheet. The results
+    are then fanned out to each sheet's _updated file. Every sheet is held in
+    memory, so this does not combine with --chunk-rows.
+
+    Returns:
+        dict: Summary with rows, unique websites, duplicate ratio and fetches saved
+    """
+    metrics.start_run()
+    hits_before = cache.hits if cache else 0
+
+    with RssMonitor(children=False) as rss:
+        sheets = {}
+        groups = {}
+        for excel_file in excel_files:
+            df = read_table(excel_file)
+            df['Email'] = df['Email'].astype(object) if 'Email' in df else None
+            sheets[excel_file] = df
+            count = 0
+            for idx, website in df['Website'].items():
+                url = normalize_url(website) if isinstance(website, str) else None
+                # www., scheme and trailing-slash variants of a site are one fetch, as in fill_emails
+                key = site_key(url) if url else None
+                if key:
+                    groups.setdefault(key, []).append((excel_file, idx))
+                    count += 1
+            print(f"📊 {os.path.basename(excel_file)}: {count} websites in {len(df)} rows")
+
+        rows = sum(len(targets) for targets in groups.values())
+        print(f"🔍 {rows} websites across {len(sheets)} sheets, {len(groups)} unique")
+
+        def fill(key, email):
+            for excel_file, idx in groups[key]:
+                sheets[excel_file].at[idx, 'Email'] = email
+
+        websites = {}
+        for key, targets in groups.items():
+            excel_file, idx = targets[0]
+            website = sheets[excel_file].at[idx, 'Website']
+            entry = cache.get(key) if cache is not None else None
+            if entry:
+                fill(key, entry.email)
+            else:
+                websites[key] = website
+
+        done = 0
+
+        def record(key, email, status, reason=None):
+            nonlocal done
+            done += 1
+            fill(key, email)
+            if cache is not None:
+                cache.put(key, email if status != ERROR else None, status, reason)
+            print(f"[{done}/{len(websites)}] {'✔️ Found' if email else '❌ No'} email on {websites[key]}: {email or 'N/A'}"
+                  + (f" ({len(groups[key])} rows)" if len(groups[key]) > 1 else ''))
+
+        if websites:
+            limiter = extract_websites(websites, engine, pool, limiter, record)
+        for excel_file, df in sheets.items():
+            save_results(df, excel_file, store)
+
+    summary = {'sheets': len(sheets), 'rows': rows, 'unique_websites': len(groups),
+               'duplicate_ratio': round(1 - len(groups) / rows, 3) if rows else 0.0,
+               'fetches_saved': rows - len(groups), 'cache_hits': (cache.hits - hits_before) if cache else 0,
+               'fetched': len(websites)}
+    metrics.write_report(MERGED_REPORT, inputs=list(sheets), engine=engine,
+                         concurrency=limiter.summary() if limiter else None, peak_rss_mb=rss.peak_mb, **summary)
+    print(f"📈 Run report saved to {MERGED_REPORT}")
+    print(f"📊 Summary: {rows} websites, {len(groups)} unique ({summary['duplicate_ratio']:.0%} duplicates), "
+          f"{summary['fetches_saved']} fetches saved; fetched {len(websites)}, {summary['cache_hits']} from the cache")
+    return summary
+
+
+def main(engine='auto', pool_size=DEFAULT_MAX_CONCURRENCY, recycle_pages=DEFAULT_RECYCLE_PAGES,
+         recycle_memory_mb=DEFAULT_RECYCLE_MEMORY_MB, checkout_timeout=DEFAULT_CHECKOUT_TIMEOUT, cache=None,
+         store=None, profile=None, limiter=None, chunk_rows=None, merge=False):
+    excel_files = find_pending_files()
     
     print(excel_files)
     if not excel_files:
@@ -47,13 +219,102 @@ def main():
     
     print(f"🔍 Found {len(excel_files)} Excel files to process")
     
-    # Process each Excel file
-    for i, excel_file in enumerate(excel_files, 1):
-        print(f"\n[{i}/{len(excel_files)}] Processing file: {os.path.basename(excel_file)}")
-        process_excel_file(excel_file)
+    # Process each Excel file, keeping the Chrome sessions warm and the learned concurrency between files
+    with make_pool(pool_size, recycle_pages, recycle_memory_mb, checkout_timeout) as pool:
+        if limiter is None:
+            limiter = AdaptiveConcurrency(maximum=pool_size, on_low_memory=pool.trim)
+        elif limiter.on_low_memory is None:
+            limiter.on_low_memory = pool.trim
+        with profiled(profile, profile_file(profile)):
+            if merge:
+                process_merged(excel_files, engine, pool, cache, store, limiter)
+            else:
+                for i, excel_file in enumerate(excel_files, 1):
+                    print(f"\n[{i}/{len(excel_files)}] Processing file: {os.path.basename(excel_file)}")
+                    process_excel_file(excel_file, engine, pool, cache, store, limiter, chunk_rows)
+        print_pool_metrics(pool)
+    if cache is not None:
+        print(f"💾 Cache: {cache.hits} hits, {cache.misses} misses")
     
     print("\n✅ Batch processing complete!")
     print(f"📊 Processed {len(excel_files)} files")
 
+def process_remote(excel_files, address, engine='auto', chunk_rows=None, merge=False):
+    """Send each pending sheet to a running service.py, which reuses its warm Chrome sessions and cache."""
+    if not excel_files:
+        print("❌ No Excel files found in the data directory!")
+        return
+    if merge:
+        job = run_remote(address, 'emails', {'files': [os.path.abspath(file) for file in excel_files],
+                                             'engine': engine})
+        print(f"\n{'❌ Batch failed' if job['state'] == FAILED else '✅ Batch processing complete!'}")
+        return
+    failed = 0
+    for i, excel_file in enumerate(excel_files, 1):
+        print(f"\n[{i}/{len(excel_files)}] Processing file: {os.path.basename(excel_file)}")
+        # The service may run in another directory
+        job = run_remote(address, 'emails', {'file': os.path.abspath(excel_file), 'engine': engine,
+                                             'chunk_rows': chunk_rows})
+        failed += job['state'] == FAILED
+    print("\n✅ Batch processing complete!")
+    print(f"📊 Processed {len(excel_files) - failed}/{len(excel_files)} files on {address}")
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Extract emails for every input sheet in the data directory')
+    parser.add_argument('--engine', choices=['http', 'browser', 'auto'], default='auto',
+                        help='Email extraction engine (default: auto)')
+    parser.add_argument('--pool-size', type=int,
+                        help='Maximum number of Chrome sessions (default: the concurrency ceiling)')
+    parser.add_argument('--recycle-pages', type=int, default=DEFAULT_RECYCLE_PAGES,
+                        help=f'Restart a Chrome session after this many pages (default: {DEFAULT_RECYCLE_PAGES})')
+    parser.add_argument('--recycle-memory-mb', type=int, default=DEFAULT_RECYCLE_MEMORY_MB,
+                        help=f'Restart a Chrome session above this memory use (default: {DEFAULT_RECYCLE_MEMORY_MB})')
+    parser.add_argument('--checkout-timeout', type=float, default=DEFAULT_CHECKOUT_TIMEOUT,
+                        help=f'Seconds to wait for a free Chrome session (default: {DEFAULT_CHECKOUT_TIMEOUT})')
+    add_cache_arguments(parser)
+    add_store_arguments(parser)
+    add_metrics_arguments(parser)
+    add_concurrency_arguments(parser)
+    add_host_arguments(parser)
+    add_chunk_arguments(parser)
+    add_queue_arguments(parser)
+    add_requeue_arguments(parser)
+    parser.add_argument('--enqueue', action='store_true',
+                        help='Queue the websites of the pending sheets for worker.py instead of processing them here')
+    parser.add_argument('--collect', action='store_true',
+                        help='Write the _updated files of pending sheets from the results of the queued jobs')
+    parser.add_argument('--wait', action='store_true',
+                        help='With --collect, keep polling until every pending sheet is finished')
+    parser.add_argument('--poll', type=float, default=DEFAULT_POLL,
+                        help=f'Seconds between checks with --wait (default: {DEFAULT_POLL})')
+    parser.add_argument('--merge', action='store_true',
+                        help='Process all pending sheets as one set, fetching each website once across sheets')
+    add_service_arguments(parser)
+    args = parser.parse_args()
+    if args.merge and args.chunk_rows:
+        parser.error("--merge holds every sheet in memory and cannot be combined with --chunk-rows")
+
+    if args.remote and not (args.enqueue or args.collect):
+        try:
+            process_remote(find_pending_files(), args.remote, args.engine, args.chunk_rows, args.merge)
+        except ServiceError as e:
+            print(f"❌ {e}")
+            exit(1)
+    elif args.enqueue or args.collect:
+        queue = open_queue(args.queue_backend, args.queue_path)
+        if args.enqueue:
+            enqueue_files(find_pending_files(), queue, requeue_days=args.requeue_days)
+        if args.collect:
+            store = make_store(args)
+            pending = collect_files(find_pending_files(), queue, store)
+            while pending and args.wait:
+                time.sleep(args.poll)
+                pending = collect_files(pending, queue, store)
+        queue.close()
+    else:
+        resource_policy.set_policy(args.resource_policy)
+        install_scheduler(args)
+        if args.metrics_port:
+            metrics.serve(args.metrics_port)
+        main(args.engine, pool_size(args), args.recycle_pages, args.recycle_memory_mb, args.checkout_timeout,
+             make_cache(args), make_store(args), args.profile, make_limiter(args), args.chunk_rows, args.merge) 
\ No newline at end of file
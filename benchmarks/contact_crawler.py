@@ -0,0 +1,118 @@
+"""
+Hit rate and page cost of the contact crawler against the old fixed-path guesses.
+
+Serves synthetic sites whose email sits in different places (a linked contact
+page, an Impressum, an About page, a mailto link, an unlinked /kontakt page,
+or nowhere) and runs both strategies over them with a plain HTTP fetcher.
+Run from the repository root:
+
+    python -m benchmarks.contact_crawler --sites 120
+"""
+import time
+import argparse
+import threading
+import urllib.request
+import urllib.error
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from contact_crawler import crawl_site, visible_text, FALLBACK_PATHS
+from new_email_ext import find_email_in_text
+
+FILLER = "Family run restaurant with fresh fish, local wine and a view of the harbour. " * 5
+PAGE = "<html><head><title>{title}</title></head><body><nav>{nav}</nav><p>{filler}</p>{body}</body></html>"
+
+# kind -> (links on the homepage, page holding the email, how the email is shown)
+LAYOUTS = [
+    ([('/contact', 'Contact')], '/contact', 'text'),
+    ([('/impressum', 'Impressum'), ('/menu', 'Menu')], '/impressum', 'text'),
+    ([('/about-us', 'About us'), ('/gallery', 'Gallery')], '/about-us', 'text'),
+    ([('/menu', 'Menu')], '/', 'mailto'),
+    ([('/menu', 'Menu'), ('/gallery', 'Gallery')], '/kontakt', 'text'),
+    ([('/menu', 'Menu'), ('/gallery', 'Gallery')], None, None),
+]
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """Serves /site<N>/<page>; the layout of site N is LAYOUTS[N % len(LAYOUTS)]."""
+    requests = 0
+
+    def do_GET(self):
+        SiteHandler.requests += 1
+        parts = [part for part in self.path.split('/') if part]
+        if not parts or not parts[0].startswith('site'):
+            self.send_error(404)
+            return
+        site = parts[0]
+        page = '/' + '/'.join(parts[1:])
+        links, email_page, style = LAYOUTS[int(site[4:]) % len(LAYOUTS)]
+        known = {'/', email_page} | {path for path, _ in links}
+        if page not in known:
+            self.send_error(404)
+            return
+        nav = ''.join(f'<a href="/{site}{path}">{text}</a> ' for path, text in links) if page == '/' else ''
+        body = ''
+        if page == email_page:
+            address = f'hello@{site}.example.it'
+            body = f'<a href="mailto:{address}">Email us</a>' if style == 'mailto' else f'<p>Mail: {address}</p>'
+        html = PAGE.format(title=site, nav=nav, filler=FILLER, body=body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(html)))
+        self.end_headers()
+        self.wfile.write(html)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fetch(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.geturl(), response.read().decode('utf-8', 'replace')
+
+
+def legacy_guess(website):
+    """The previous strategy: three fixed contact paths, then the homepage."""
+    for url in [website + path for path in FALLBACK_PATHS] + [website]:
+        try:
+            _, html = fetch(url)
+        except urllib.error.URLError:
+            continue
+        email = find_email_in_text(visible_text(html))
+        if email:
+            return email
+    return None
+
+
+def run(name, strategy, websites):
+    SiteHandler.requests = 0
+    start = time.perf_counter()
+    found = sum(1 for website in websites if strategy(website))
+    elapsed = time.perf_counter() - start
+    print(f"{name:16} {found}/{len(websites)} emails, "
+          f"{SiteHandler.requests / len(websites):.2f} requests per site, {elapsed:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the contact crawler with fixed-path guessing')
+    parser.add_argument('--sites', type=int, default=120, help='Number of synthetic sites (default: 120)')
+    args = parser.parse_args()
+
+    server = start_server()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    websites = [f"{base}/site{i}" for i in range(args.sites)]
+
+    run('Fixed paths:', legacy_guess, websites)
+    run('Contact crawler:', lambda website: crawl_site(website, fetch)[0], websites)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Throughput comparison of the HTTP email engine against the Chrome path.
+
+Serves a set of synthetic business sites from a local web server and runs
+both engines over them. Run from the repository root:
+
+    python -m benchmarks.email_engine --sites 200 --latency 0.2 --browser-sample 5
+"""
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import host_scheduler
+from host_scheduler import HostScheduler
+from http_engine import extract_emails_http, FOUND
+from new_email_ext import extract_email_from_website, get_driver
+
+PAGE = """<html><head><title>{title}</title></head><body>
+<h1>{title}</h1><p>{filler}</p>{contact}
+</body></html>"""
+FILLER = "Fresh seafood and local dishes served daily by the beach. " * 10
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """Serves /site<N>/ homepages and /site<N>/contact pages. Every third site has no email."""
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        parts = [part for part in self.path.split('/') if part]
+        if not parts or not parts[0].startswith('site'):
+            self.send_error(404)
+            return
+        site = parts[0]
+        page = parts[1] if len(parts) > 1 else ''
+        if page not in ('', 'contact'):
+            self.send_error(404)
+            return
+        number = int(site[4:])
+        contact = ''
+        if page == 'contact' and number % 3:
+            contact = f'<p>Write to us: info@{site}.example.it</p>'
+        body = PAGE.format(title=site, filler=FILLER, contact=contact).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(latency):
+    SiteHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_http(websites, concurrency):
+    start = time.perf_counter()
+    results = extract_emails_http(websites, concurrency=concurrency, per_host=0)
+    elapsed = time.perf_counter() - start
+    found = sum(1 for _, status in results.values() if status == FOUND)
+    return elapsed, found
+
+
+def run_browser(websites):
+    start = time.perf_counter()
+    found = 0
+    for website in websites:
+        if extract_email_from_website(website):
+            found += 1
+    return time.perf_counter() - start, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare HTTP and browser email extraction throughput')
+    parser.add_argument('--sites', type=int, default=200, help='Number of synthetic sites (default: 200)')
+    parser.add_argument('--latency', type=float, default=0.1, help='Server latency per request in seconds')
+    parser.add_argument('--concurrency', type=int, default=50, help='HTTP engine concurrency')
+    parser.add_argument('--browser-sample', type=int, default=5,
+                        help='Number of sites to run through Chrome (0 to skip)')
+    args = parser.parse_args()
+
+    server = start_server(args.latency)
+    # Every synthetic site is served from 127.0.0.1; politeness limits would measure the scheduler, not the engine
+    host_scheduler.install(HostScheduler(per_host=args.concurrency, delay=0, per_ip=args.concurrency))
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    websites = [f"{base}/site{i}" for i in range(args.sites)]
+
+    elapsed, found = run_http(websites, args.concurrency)
+    print(f"HTTP engine:    {len(websites)} sites in {elapsed:.2f}s "
+          f"({len(websites) / elapsed:.1f} sites/s), {found} emails")
+
+    if args.browser_sample:
+        sample = websites[:args.browser_sample]
+        try:
+            get_driver().quit()
+        except Exception as e:
+            print(f"Browser engine skipped, Chrome is not available: {e}")
+        else:
+            elapsed, found = run_browser(sample)
+            print(f"Browser engine: {len(sample)} sites in {elapsed:.2f}s "
+                  f"({len(sample) / elapsed:.2f} sites/s), {found} emails")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
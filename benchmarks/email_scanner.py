@@ -0,0 +1,123 @@
+"""
+Speed and accuracy of email_scanner against the old find_email_in_text.
+
+Runs both over a corpus of pages and reports MB/s and precision/recall of the
+email each one picks. Without --corpus a synthetic corpus covering the common
+obfuscations and false positives is generated. Run from the repository root:
+
+    python -m benchmarks.email_scanner --pages 600
+    python -m benchmarks.email_scanner --corpus saved_pages/
+
+A saved corpus is a directory of .html files plus labels.json mapping each
+file name to its website and the expected email (null if the page has none):
+
+    {"bar.html": {"website": "https://bar.example.it", "email": "info@bar.example.it"}}
+"""
+import os
+import json
+import time
+import random
+import argparse
+
+from email_scanner import best_email
+from contact_crawler import visible_text
+from new_email_ext import find_email_in_text
+
+FILLER = ('<div class="section"><p>Our kitchen serves fresh fish, handmade pasta and local wine every day. '
+          'Book a table on the terrace and enjoy the sunset over the harbour.</p>'
+          '<img src="/static/img/dish-{n}.jpg" srcset="/static/img/dish-{n}@2x.jpg 2x"></div>\n')
+SCRIPTS = ('<script>window.__config={"sentry":"https://4f1c2e9ab77d4b5f9c1e2d3a4b5c6d7e@o12345.ingest.sentry.io/42",'
+           '"cdn":"https://cdn.example.net/app.js"}</script>\n')
+PAGE = '<html><head><title>{name}</title>{scripts}</head><body><header>{header}</header>{filler}{body}</body></html>'
+
+
+def cloudflare(email, key=0x5a):
+    return f'{key:02x}' + ''.join(f'{ord(c) ^ key:02x}' for c in email)
+
+
+def entities(email):
+    return ''.join(f'&#{ord(c)};' for c in email)
+
+
+# name -> body template; {email} is the site's address, {domain} its domain
+LAYOUTS = {
+    'plain': '<footer><p>Email: {email}</p></footer>',
+    'mailto': '<footer><a href="mailto:{email}?subject=Booking">Write to us</a></footer>',
+    'cloudflare': '<footer><a href="/cdn-cgi/l/email-protection#{cf}">'
+                  '<span class="__cf_email__" data-cfemail="{cf}">[email&#160;protected]</span></a></footer>',
+    'spelled': '<footer><p>Mail us: {local} [at] {domain_spelled}</p></footer>',
+    'entities': '<footer><p>Contact: {entities}</p></footer>',
+    'retina_first': '<img src="/img/logo@2x.png"><footer><p>{email}</p></footer>',
+    'placeholder_first': '<form><input type="email" placeholder="you@example.com"></form><p>Reach us at {email}</p>',
+    'agency_first': '<p>Website by studio@webagency-design.com</p><footer><p>{email}</p></footer>',
+    'none': '<footer><p>Call us to book a table.</p></footer>',
+    'junk_only': '<img src="/img/hero@3x.webp"><form><input placeholder="name@domain.com"></form>',
+}
+
+
+def make_page(layout, number, rng):
+    domain = f'trattoria{number}.example.it'
+    email = f'{rng.choice(["info", "hello", "prenotazioni"])}@{domain}'
+    local, _ = email.split('@')
+    fields = {
+        'email': email, 'cf': cloudflare(email), 'local': local, 'entities': entities(email),
+        'domain_spelled': domain.replace('.', ' [dot] '),
+    }
+    body = LAYOUTS[layout].format(**fields)
+    filler = ''.join(FILLER.format(n=n) for n in range(rng.randint(40, 120)))
+    page = PAGE.format(name=domain, scripts=SCRIPTS, header='<nav><a href="/menu">Menu</a></nav>',
+                       filler=filler, body=body)
+    expected = None if layout in ('none', 'junk_only') else email
+    return page.encode(), f'https://{domain}', expected
+
+
+def synthetic_corpus(pages, seed=1):
+    rng = random.Random(seed)
+    layouts = list(LAYOUTS)
+    return [make_page(layouts[i % len(layouts)], i, rng) for i in range(pages)]
+
+
+def load_corpus(directory):
+    with open(os.path.join(directory, 'labels.json')) as f:
+        labels = json.load(f)
+    corpus = []
+    for name, label in labels.items():
+        with open(os.path.join(directory, name), 'rb') as f:
+            corpus.append((f.read(), label.get('website'), label.get('email')))
+    return corpus
+
+
+def old_extract(page, website):
+    return find_email_in_text(visible_text(page.decode('utf-8', 'replace')))
+
+
+def evaluate(name, extract, corpus):
+    size = sum(len(page) for page, _, _ in corpus)
+    start = time.perf_counter()
+    picked = [extract(page, website) for page, website, _ in corpus]
+    elapsed = time.perf_counter() - start
+
+    predicted = sum(1 for email in picked if email)
+    relevant = sum(1 for _, _, expected in corpus if expected)
+    correct = sum(1 for email, (_, _, expected) in zip(picked, corpus)
+                  if email and expected and email.lower() == expected.lower())
+    precision = correct / predicted if predicted else 0.0
+    recall = correct / relevant if relevant else 0.0
+    print(f"{name:20} {size / elapsed / 1e6:7.1f} MB/s   precision {precision:.2f}   recall {recall:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare email_scanner with find_email_in_text')
+    parser.add_argument('--corpus', help='Directory of saved .html pages with a labels.json')
+    parser.add_argument('--pages', type=int, default=600, help='Synthetic pages when no corpus is given')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.pages)
+    size = sum(len(page) for page, _, _ in corpus)
+    print(f"{len(corpus)} pages, {size / 1e6:.1f} MB")
+    evaluate('find_email_in_text:', old_extract, corpus)
+    evaluate('email_scanner:', best_email, corpus)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Micro-benchmark of single-pass feed parsing against the old per-card BeautifulSoup path.
+
+Uses a saved results feed (the outerHTML of div[role='feed']) or generates a
+synthetic one. Run from the repository root:
+
+    python -m benchmarks.feed_parser --html saved_feed.html
+    python -m benchmarks.feed_parser --cards 200
+"""
+import time
+import argparse
+
+from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+
+from feed_parser import parse_feed_html, format_stars, CARDS_XPATH
+
+CARD = """<div class="Nv2PK THOPZb CpccDe"><a class="hfpxzc" aria-label="{name}"
+href="https://www.google.com/maps/place/{slug}/data=!4m7!3m6!1s0x3051{i:04x}:0x{i:08x}!8m2!3d7.{i:04d}!4d98.{i:04d}!16s%2Fg%2F11{i}?authuser=0&amp;hl=en&amp;rclk=1"></a>
+<div class="bfdHYd Ppzolf OFBs3e"><div class="lI9IFe"><div class="y7PRA"><div class="Lui3Od"><div class="UaQhfb fontBodyMedium">
+<div class="NrDZNb"><div class="qBF1Pd fontHeadlineSmall">{name}</div></div>
+<div class="W4Efsd"><div class="AJB7ye"><span class="e4rVHe fontBodyMedium"><span role="img" class="ZkP5Je" aria-label="4.{stars} stars">
+<span class="MW4etd">4.{stars}</span><span class="UY7F9">({reviews:,})</span></span></span></div></div>
+<div class="W4Efsd"><div class="W4Efsd"><span><span>Restaurant</span></span><span> <span aria-hidden="true">·</span>
+<span>{i} Beach Road</span></span></div><div class="W4Efsd"><span><span>Open</span><span> ⋅ Closes 10 PM</span></span></div></div>
+</div></div></div></div></div></div>"""
+
+
+def make_feed_html(cards):
+    """Synthetic results feed with the structure of a real Maps feed."""
+    body = "".join(
+        CARD.format(name=f"Restaurant {i}", slug=f"Restaurant+{i}", i=i, stars=i % 10, reviews=i * 37)
+        for i in range(cards)
+    )
+    return f'<div role="feed" aria-label="Results">{body}</div>'
+
+
+def parse_cards_old(card_htmls):
+    """The previous extraction: one html.parser build per card outerHTML."""
+    records = []
+    for html in card_htmls:
+        mini = BeautifulSoup(html, "html.parser")
+        name = mini.find('div', class_='qBF1Pd').get_text(strip=True) if mini.find('div', 'qBF1Pd') else "N/A"
+        # Same rating span and format as feed_parser, so only parsing speed differs
+        stars = format_stars(mini.find('span', class_='MW4etd').get_text(strip=True)) if mini.find('span', 'MW4etd') else "N/A"
+        reviews = mini.find('span', class_='UY7F9').get_text(strip=True).strip("()") if mini.find('span', 'UY7F9') else "N/A"
+        addr = " / ".join(span.get_text(strip=True) for span in mini.select("div.W4Efsd span") if span.get_text(strip=True)) or "N/A"
+        records.append((name, stars, reviews, addr))
+    return records
+
+
+def best_of(runs, func, *args):
+    times = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark results feed parsing')
+    parser.add_argument('--html', help='Saved feed HTML file (default: synthetic feed)')
+    parser.add_argument('--cards', type=int, default=200, help='Cards in the synthetic feed (default: 200)')
+    parser.add_argument('--runs', type=int, default=5, help='Repetitions, best time is reported (default: 5)')
+    args = parser.parse_args()
+
+    if args.html:
+        with open(args.html, encoding='utf-8') as f:
+            feed_html = f.read()
+    else:
+        feed_html = make_feed_html(args.cards)
+
+    # The old path fetched each card's outerHTML over the WebDriver wire; only its parsing is timed here
+    card_htmls = [lxml_html.tostring(card, encoding='unicode') for card in lxml_html.fromstring(feed_html).xpath(CARDS_XPATH)]
+
+    old_time, old_records = best_of(args.runs, parse_cards_old, card_htmls)
+    new_time, listings = best_of(args.runs, parse_feed_html, feed_html)
+
+    new_records = [(l.name, l.stars, l.reviews, l.address) for l in listings]
+    mismatches = sum(1 for old, new in zip(old_records, new_records) if old != new)
+
+    print(f"Cards:              {len(card_htmls)}")
+    print(f"Per-card html.parser: {old_time * 1000:.1f} ms")
+    print(f"Single-pass lxml:     {new_time * 1000:.1f} ms ({old_time / new_time:.1f}x faster)")
+    print(f"Mismatched records:   {mismatches + abs(len(old_records) - len(new_records))}")
+    print(f"Place IDs parsed:     {sum(1 for l in listings if l.place_id)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Local server for saved Google Maps pages and business websites.
+
+Directory layout:
+
+    <dir>/search.html                 served for /maps/search/...
+    <dir>/payloads/search-<n>.json    served for /search?tbm=map&start=<n>, the feed's search responses
+    <dir>/place/<slug>.html           served for /maps/place/<slug>/...
+    <dir>/sites/<host>/<page>.html    served for /sites/<host>/<page> (index.html for /)
+    /static/<name>.<ext>              generated filler of STATIC_SIZE bytes (images, fonts, media, css)
+
+Connections for hosts starting with "dead-" are dropped without a response.
+--fail-rate and --drop-rate inject 503s and dropped connections into any request.
+
+Point the scraper at it with GMS_MAPS_BASE_URL and the email extraction with
+GMS_SITES_BASE_URL. Run from the repository root:
+
+    python -m benchmarks.fixtures --dir fixtures/replay
+    python -m benchmarks.fixture_server --dir fixtures/replay --port 8000
+    GMS_MAPS_BASE_URL=http://127.0.0.1:8000 GMS_SITES_BASE_URL=http://127.0.0.1:8000 python gms.py
+"""
+import os
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, unquote, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+DEAD_PREFIX = 'dead-'
+STATIC_SIZE = 50000
+STATIC_TYPES = {
+    '.jpg': 'image/jpeg', '.png': 'image/png', '.webp': 'image/webp', '.woff2': 'font/woff2',
+    '.mp4': 'video/mp4', '.css': 'text/css', '.js': 'application/javascript',
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    root = '.'
+    latency = 0.0
+    site_latency = 0.0
+    fail_rate = 0.0
+    drop_rate = 0.0
+
+    def resolve(self, path):
+        parts = [unquote(part) for part in urlparse(path).path.split('/') if part]
+        if parts == ['search']:
+            start = parse_qs(urlparse(path).query).get('start', ['0'])[0]
+            return os.path.join(self.root, 'payloads', f'search-{os.path.basename(start)}.json')
+        if len(parts) >= 2 and parts[0] == 'maps' and parts[1] == 'search':
+            return os.path.join(self.root, 'search.html')
+        if len(parts) >= 3 and parts[0] == 'maps' and parts[1] == 'place':
+            slug = os.path.basename(parts[2])
+            return os.path.join(self.root, 'place', f'{slug}.html')
+        if len(parts) >= 2 and parts[0] == 'sites':
+            page = os.path.basename(parts[-1]) if len(parts) > 2 else 'index'
+            return os.path.join(self.root, 'sites', os.path.basename(parts[1]), f'{page}.html')
+        return None
+
+    def do_GET(self):
+        parts = urlparse(self.path).path.split('/')
+        is_site = len(parts) > 2 and parts[1] == 'sites'
+        time.sleep(self.site_latency if is_site else self.latency)
+        if (is_site and parts[2].startswith(DEAD_PREFIX)) or random.random() < self.drop_rate:
+            # Close the socket without answering, like a dead or overloaded host
+            self.close_connection = True
+            return
+        if random.random() < self.fail_rate:
+            self.send_error(503)
+            return
+        if parts[1] == 'static':
+            self.send_static(parts[-1])
+            return
+        file_path = self.resolve(self.path)
+        if not file_path or not os.path.exists(file_path):
+            self.send_error(404)
+            return
+        with open(file_path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8' if file_path.endswith('.json')
+                         else 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_static(self, name):
+        """Page assets: a few bytes of CSS or JS, STATIC_SIZE bytes of filler for everything else."""
+        extension = os.path.splitext(name)[1]
+        if extension not in STATIC_TYPES:
+            self.send_error(404)
+            return
+        body = b'/* fixture */\n' if extension in ('.css', '.js') else b'\0' * STATIC_SIZE
+        self.send_response(200)
+        self.send_header('Content-Type', STATIC_TYPES[extension])
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(root, port=0, latency=0.0, site_latency=0.0, fail_rate=0.0, drop_rate=0.0):
+    """Serve a fixture directory in a background thread and return the server."""
+    handler = type('Handler', (FixtureHandler,), {
+        'root': root, 'latency': latency, 'site_latency': site_latency,
+        'fail_rate': fail_rate, 'drop_rate': drop_rate,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve saved Maps search and place pages')
+    parser.add_argument('--dir', required=True, help='Fixture directory')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on (default: 8000)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Delay before each Maps response in seconds')
+    parser.add_argument('--site-latency', type=float, default=0.0, help='Delay before each website response in seconds')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of requests answered with a 503')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Share of connections dropped without a response')
+    args = parser.parse_args()
+
+    server = start_server(args.dir, args.port, args.latency, args.site_latency, args.fail_rate, args.drop_rate)
+    print(f"Serving {args.dir} on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
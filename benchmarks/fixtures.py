@@ -0,0 +1,222 @@
+"""
+Build a replay fixture directory for the local fixture server.
+
+The directory holds a Maps search page whose feed loads its cards in batches
+as it is scrolled, the search responses each batch is fetched with (the first
+batch is embedded in the page, as on Maps), one place page per card, and the
+business websites those places link to:
+
+    <dir>/search.html
+    <dir>/payloads/search-<start>.json
+    <dir>/place/<slug>.html
+    <dir>/sites/<host>/index.html, contact.html, about.html
+
+Hosts starting with "dead-" have no pages; the fixture server drops their
+connections. Run from the repository root:
+
+    python -m benchmarks.fixtures --dir fixtures/replay --results 200
+"""
+import os
+import json
+import random
+import argparse
+from urllib.parse import urlparse
+
+from feed_parser import Listing
+from maps_payload import build_payload
+from benchmarks.feed_parser import CARD
+
+DEAD_PREFIX = 'dead-'
+BATCH = 20
+
+SEARCH_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{query} - Google Maps</title>
+<link rel="stylesheet" href="/static/maps.css">
+<style>div[role=feed] {{ height: 600px; overflow-y: auto; }} .pane {{ position: fixed; top: 0; left: 420px; }}</style>
+</head><body>
+<div role="feed" aria-label="Results for {query}"></div>
+<script>
+const CARDS = {cards};
+const BATCH = {batch};
+const feed = document.querySelector("div[role='feed']");
+let loaded = 0, loading = false;
+function loadMore() {{
+    if (loading || loaded >= CARDS.length) return;
+    loading = true;
+    setTimeout(() => {{
+        fetch('/search?tbm=map&start=' + loaded).then((response) => response.text()).catch(() => '').then(() => {{
+            feed.insertAdjacentHTML('beforeend', CARDS.slice(loaded, loaded + BATCH).join(''));
+            loaded = Math.min(loaded + BATCH, CARDS.length);
+            if (loaded >= CARDS.length) {{
+                feed.insertAdjacentHTML('beforeend', '<span class="HlvSq">You\\'ve reached the end of the list.</span>');
+            }}
+            loading = false;
+        }});
+    }}, {feed_delay});
+}}
+feed.addEventListener('scroll', () => {{
+    if (feed.scrollTop + feed.clientHeight >= feed.scrollHeight - 5) loadMore();
+}});
+// The detail pane: clicking a card loads its place page instead of navigating away
+document.addEventListener('click', async (event) => {{
+    const link = event.target.closest('div.Nv2PK a');
+    if (!link) return;
+    event.preventDefault();
+    const response = await fetch(new URL(link.href).pathname);
+    const page = new DOMParser().parseFromString(await response.text(), 'text/html');
+    document.querySelectorAll('.pane').forEach((pane) => pane.remove());
+    const pane = page.querySelector('#pane');
+    pane.classList.add('pane');
+    pane.insertAdjacentHTML('afterbegin', '<button jsaction="pane.homeBack">Back</button>');
+    pane.querySelector('button').addEventListener('click', () => pane.remove());
+    document.body.appendChild(pane);
+}});
+feed.insertAdjacentHTML('beforeend', CARDS.slice(0, BATCH).join(''));
+loaded = Math.min(BATCH, CARDS.length);
+</script>
+</body></html>
+"""
+
+PLACE_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{name} - Google Maps</title></head><body>
+<div id="pane" role="main">
+<img src="/static/{slug}-photo.jpg" alt="">
+<h1 class="DUwDvf">{name}</h1>
+<button class="DkEaL">{category}</button>
+<button data-item-id="address" aria-label="Address: {address}">{address}</button>
+{website}
+<button data-item-id="phone:tel:{phone}" aria-label="Phone: {phone}">{phone}</button>
+<button data-item-id="oloc" aria-label="Plus code: {plus_code}">{plus_code}</button>
+</div>
+</body></html>
+"""
+WEBSITE_ROW = '<a data-item-id="authority" aria-label="Website: {host}" href="https://{host}/">{host}</a>'
+
+SITE_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<link rel="stylesheet" href="/static/site.css"><link rel="preload" as="font" href="/static/site.woff2" crossorigin>
+</head><body>
+<img src="/static/hero.jpg" alt=""><img src="/static/logo.png" alt="">
+<nav><a href="/">Home</a> {nav}</nav>
+<main><h1>{title}</h1><p>{filler}</p>{body}</main>
+</body></html>
+"""
+FILLER = "Fresh seafood, local dishes and cold drinks, served daily a few steps from the beach. " * 8
+
+# (homepage links, page holding the email, how it is shown)
+SITE_LAYOUTS = [
+    ('<a href="/contact">Contact</a>', 'contact', 'text'),
+    ('<a href="/about">About us</a>', 'about', 'mailto'),
+    ('<a href="/menu">Menu</a>', 'index', 'text'),
+    ('<a href="/menu">Menu</a>', None, None),
+]
+
+
+def place_slug(i):
+    return f'Restaurant+{i}'
+
+
+def site_host(i, dead=False):
+    return f'{DEAD_PREFIX if dead else ""}restaurant-{i}-replay.com'
+
+
+def place_record(i, host=None):
+    """The (Listing, details) a search response carries for listing i; matches its card and place page."""
+    listing = Listing(name=f"Restaurant {i}", stars=float(f"4.{i % 10}"), reviews=i * 37,
+                      address=f'{i} Beach Road, Replay Beach', place_url=None,
+                      place_id=f'0x3051{i:04x}:0x{i:08x}', lat=float(f'7.{i:04d}'), lng=float(f'98.{i:04d}'))
+    details = {'phone': f'+66 76 {i:06d}', 'website': f'https://{host}/' if host else None, 'category': 'Restaurant',
+               'address': listing.address, 'plus_code': f'{i:04d}+XY Replay Beach'}
+    return listing, details
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def build_site(root, host, layout):
+    """Write one business website; returns its email or None."""
+    nav, email_page, style = SITE_LAYOUTS[layout]
+    email = f'info@{host}' if email_page else None
+    for page in ('index', 'contact', 'about', 'menu'):
+        body = ''
+        if page == email_page:
+            body = (f'<p><a href="mailto:{email}">Send us an email</a></p>' if style == 'mailto'
+                    else f'<p>Write to {email}</p>')
+        write(os.path.join(root, 'sites', host, f'{page}.html'),
+              SITE_PAGE.format(title=f'{host} {page}', nav=nav if page == 'index' else '', filler=FILLER, body=body))
+    return email
+
+
+def build_sites(root, count, dead_rate=0.0, seed=1):
+    """
+    Write `count` business websites.
+
+    Returns:
+        list: (website URL, expected email or None) per site
+    """
+    rng = random.Random(seed)
+    sites = []
+    for i in range(count):
+        dead = rng.random() < dead_rate
+        host = site_host(i, dead)
+        email = None if dead else build_site(root, host, i % len(SITE_LAYOUTS))
+        sites.append((f'https://{host}/', email))
+    return sites
+
+
+def build_maps(root, results, query='restaurants near replay beach', feed_delay=300, website_rate=0.8,
+               dead_rate=0.0, seed=1):
+    """
+    Write a search page with `results` cards, its search responses, their place pages and their websites.
+
+    Returns:
+        list: Website URL (or None) per listing, in feed order
+    """
+    rng = random.Random(seed)
+    cards = [CARD.format(name=f"Restaurant {i}", slug=place_slug(i), i=i, stars=i % 10, reviews=i * 37)
+             for i in range(results)]
+    write(os.path.join(root, 'search.html'),
+          SEARCH_PAGE.format(query=query, cards=json.dumps(cards), batch=BATCH, feed_delay=feed_delay))
+
+    websites = []
+    for i in range(results):
+        host = None
+        if rng.random() < website_rate:
+            dead = rng.random() < dead_rate
+            host = site_host(i, dead)
+            if not dead:
+                build_site(root, host, i % len(SITE_LAYOUTS))
+        websites.append(f'https://{host}/' if host else None)
+        listing, details = place_record(i, host)
+        write(os.path.join(root, 'place', f'{place_slug(i)}.html'), PLACE_PAGE.format(
+            name=listing.name, slug=place_slug(i), category=details['category'], address=details['address'],
+            website=WEBSITE_ROW.format(host=host) if host else '', phone=details['phone'],
+            plus_code=details['plus_code'],
+        ))
+
+    for start in range(BATCH, results, BATCH):
+        records = [place_record(i, urlparse(websites[i]).hostname if websites[i] else None)
+                   for i in range(start, min(start + BATCH, results))]
+        write(os.path.join(root, 'payloads', f'search-{start}.json'), build_payload(records))
+    return websites
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build replay fixtures for the fixture server')
+    parser.add_argument('--dir', required=True, help='Directory to write')
+    parser.add_argument('--results', type=int, default=200, help='Listings in the search feed (default: 200)')
+    parser.add_argument('--sites', type=int, default=0, help='Extra standalone websites (default: 0)')
+    parser.add_argument('--dead-rate', type=float, default=0.0, help='Share of websites whose domain is dead')
+    args = parser.parse_args()
+
+    build_maps(args.dir, args.results, dead_rate=args.dead_rate)
+    if args.sites:
+        build_sites(args.dir, args.sites, args.dead_rate)
+    print(f"✅ Fixtures written to {args.dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Check of the search response parser against saved payloads, and a micro-benchmark
+of the network backend's parsing against the feed HTML parse of the same results.
+
+Every benchmarks/payloads/<name>.txt is parsed and compared field by field with
+<name>.expected.json; the run fails on any mismatch. Save more responses there
+when Google changes the layout: copy a /search?tbm=map response body from
+DevTools and scrub it with benchmarks.scrub_payload. Run from the repository root:
+
+    python -m benchmarks.maps_payload
+    python -m benchmarks.maps_payload --results 1000
+"""
+import os
+import sys
+import glob
+import json
+import argparse
+
+from feed_parser import parse_feed_html
+from maps_payload import parse_search_payload, parse_payloads, build_payload
+from benchmarks.feed_parser import make_feed_html, best_of
+from benchmarks.fixtures import place_record, site_host, BATCH
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(__file__), 'payloads')
+FIELDS = ['name', 'stars', 'reviews', 'place_id', 'lat', 'lng', 'phone', 'website', 'category', 'address',
+          'plus_code']
+
+
+def check_saved_payloads(directory=PAYLOAD_DIR):
+    """
+    Compare the parse of every saved payload with its expected records.
+
+    Returns:
+        tuple: (fields compared, list of mismatch descriptions)
+    """
+    compared = 0
+    mismatches = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.txt'))):
+        name = os.path.basename(path)
+        with open(path, encoding='utf-8') as f:
+            parsed = parse_search_payload(f.read())
+        with open(path[:-len('.txt')] + '.expected.json', encoding='utf-8') as f:
+            expected = json.load(f)
+        if len(parsed) != len(expected):
+            mismatches.append(f"{name}: {len(parsed)} places, expected {len(expected)}")
+        for i, ((listing, details), want) in enumerate(zip(parsed, expected)):
+            got = dict(details, **listing._asdict())
+            for field in FIELDS:
+                compared += 1
+                if got.get(field) != want.get(field):
+                    mismatches.append(f"{name}[{i}].{field}: {got.get(field)!r}, expected {want.get(field)!r}")
+    return compared, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check and benchmark search response parsing')
+    parser.add_argument('--results', type=int, default=200, help='Listings in the synthetic search (default: 200)')
+    parser.add_argument('--runs', type=int, default=5, help='Repetitions, best time is reported (default: 5)')
+    args = parser.parse_args()
+
+    compared, mismatches = check_saved_payloads()
+    print(f"Saved payload fields: {compared - len(mismatches)}/{compared} match")
+    for mismatch in mismatches:
+        print(f"   ❌ {mismatch}")
+
+    records = [place_record(i, site_host(i)) for i in range(args.results)]
+    payloads = [build_payload(records[start:start + BATCH]) for start in range(0, args.results, BATCH)]
+    feed_html = make_feed_html(args.results)
+
+    dom_time, cards = best_of(args.runs, parse_feed_html, feed_html)
+    network_time, (listings, details) = best_of(args.runs, parse_payloads, payloads)
+
+    # Card fields both backends read; the feed card's address is its whole info line, so it is left out
+    shared = ['name', 'stars', 'reviews', 'place_id', 'lat', 'lng']
+    differing = {field: sum(1 for card, listing in zip(cards, listings) if getattr(card, field) != getattr(listing, field))
+                 for field in shared}
+    with_contact = sum(1 for place in details.values() if place['phone'] or place['website'])
+
+    print(f"Listings:             {len(cards)}")
+    print(f"Feed HTML (dom):      {dom_time * 1000:.1f} ms")
+    print(f"Search responses:     {network_time * 1000:.1f} ms ({dom_time / network_time:.1f}x)")
+    print(f"Differing card fields: " + (', '.join(f'{field} {count}' for field, count in differing.items() if count)
+                                        or 'none'))
+    # The dom backend opens a place page per listing for phone and website; the responses carry them
+    print(f"Detail page loads:    dom {len(cards)}, network {len(cards) - len(details)} "
+          f"({with_contact} listings with phone or website from the responses)")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
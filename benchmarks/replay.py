@@ -0,0 +1,263 @@
+"""
+Offline replay benchmarks: the scraper and the email extraction against a local fixture server.
+
+Each scenario builds its fixtures, starts benchmarks.fixture_server in a
+separate process with the scenario's latency and failure settings, points
+the code at it through GMS_MAPS_BASE_URL / GMS_SITES_BASE_URL and reports
+throughput, peak RSS (this process and its Chrome children) and p50/p95
+latencies from the run's metrics. Results are appended to
+data/benchmarks/replay.jsonl and compared with the previous run of the same
+scenario. Run from the repository root:
+
+    python -m benchmarks.replay                     # every scenario
+    python -m benchmarks.replay sites slow_sites    # some of them
+    python -m benchmarks.replay --list
+"""
+import os
+import json
+import time
+import socket
+import shutil
+import tempfile
+import argparse
+import threading
+import subprocess
+import multiprocessing
+
+import pandas as pd
+
+import contact_crawler
+import resource_policy
+from metrics import metrics, RssMonitor
+from concurrency import AdaptiveConcurrency
+from benchmarks.fixtures import build_maps, build_sites
+from benchmarks.fixture_server import start_server
+
+RESULTS_FILE = os.path.join('data', 'benchmarks', 'replay.jsonl')
+
+# name -> settings. kind 'maps' runs gms.scrape_location, 'sites' runs batch_process_from_excel.
+SCENARIOS = {
+    'feed_200': {
+        'kind': 'maps', 'results': 200, 'latency': 0.05, 'site_latency': 0.05,
+        'description': '200-result feed scrolled in batches, direct detail pages',
+    },
+    'feed_200_network': {
+        'kind': 'maps', 'results': 200, 'latency': 0.05, 'site_latency': 0.05, 'backend': 'network',
+        'description': 'feed_200 read from the captured search responses instead of the feed HTML',
+    },
+    'sites': {
+        'kind': 'sites', 'sites': 200, 'site_latency': 0.05,
+        'description': '200 healthy business websites over HTTP',
+    },
+    'slow_sites': {
+        'kind': 'sites', 'sites': 200, 'site_latency': 1.5,
+        'description': '200 websites answering after 1.5s each',
+    },
+    'dead_domains': {
+        'kind': 'sites', 'sites': 200, 'site_latency': 0.05, 'dead_rate': 0.3, 'fail_rate': 0.05,
+        'description': '30% dead domains plus 5% of requests failing with 503',
+    },
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _serve(root, port, latency, site_latency, fail_rate, drop_rate):
+    start_server(root, port, latency, site_latency, fail_rate, drop_rate)
+    threading.Event().wait()
+
+
+def launch_server(root, settings):
+    """Run the fixture server in its own process so it does not compete with the code under test."""
+    port = free_port()
+    process = multiprocessing.Process(target=_serve, daemon=True, args=(
+        root, port, settings.get('latency', 0.0), settings.get('site_latency', 0.0),
+        settings.get('fail_rate', 0.0), settings.get('drop_rate', 0.0),
+    ))
+    process.start()
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return process, f'http://127.0.0.1:{port}'
+
+
+def run_maps(settings, root, base):
+    """Scrape the fixture search with gms.scrape_location. Needs Chrome."""
+    import gms
+
+    websites = build_maps(root, settings['results'], dead_rate=settings.get('dead_rate', 0.0))
+    gms.MAPS_BASE_URL = base
+    store_path = os.path.join(root, 'store')
+    start = time.perf_counter()
+    gms.scrape_location('replay beach', 'restaurants', detail_mode=settings.get('detail_mode', 'direct'),
+                        email_mode='none', store_path=store_path, use_index=False,
+                        backend=settings.get('backend', 'dom'))
+    elapsed = time.perf_counter() - start
+    journal = gms.Journal('replay beach', 'restaurants')
+    journal.reset()
+    report_file = os.path.join(gms.DATA_DIR, 'replay_beach_restaurants_metrics.json')
+    if os.path.exists(report_file):
+        os.remove(report_file)
+    return {'listings': len(websites), 'websites': sum(1 for w in websites if w), 'seconds': elapsed,
+            'listings_per_min': len(websites) / elapsed * 60}
+
+
+def run_sites(settings, root, base):
+    """Fill in the Email column of a sheet of fixture websites with batch_process_from_excel."""
+    from new_email_ext import batch_process_from_excel, DATA_DIR
+
+    sites = build_sites(root, settings['sites'], settings.get('dead_rate', 0.0))
+    sheet = os.path.join(root, 'replay_sites.csv')
+    pd.DataFrame({
+        'Business Name': [f'Restaurant {i}' for i in range(len(sites))],
+        'Website': [url for url, _ in sites],
+        'Email': '',
+    }).to_csv(sheet, index=False)
+
+    limiter = AdaptiveConcurrency(fixed=settings['concurrency']) if settings.get('concurrency') else None
+    start = time.perf_counter()
+    batch_process_from_excel(sheet, settings.get('engine', 'auto'), cache=None, store=None, limiter=limiter)
+    elapsed = time.perf_counter() - start
+
+    output = os.path.join(DATA_DIR, 'replay_sites_updated.csv')
+    found = pd.read_csv(output)['Email'].fillna('').astype(str)
+    expected = [email or '' for _, email in sites]
+    correct = sum(1 for got, want in zip(found, expected) if want and got == want)
+    for path in (output, os.path.join(DATA_DIR, 'replay_sites_updated_metrics.json')):
+        if os.path.exists(path):
+            os.remove(path)
+    return {'sites': len(sites), 'seconds': elapsed, 'sites_per_min': len(sites) / elapsed * 60,
+            'emails_found': correct, 'emails_expected': sum(1 for email in expected if email)}
+
+
+def latencies(snapshot):
+    """p50/p95 of every timer recorded during the run."""
+    return {name: {'p50': timer['p50'], 'p95': timer['p95'], 'count': timer['count']}
+            for name, timer in snapshot['timers'].items()}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(name, settings):
+    root = tempfile.mkdtemp(prefix=f'replay_{name}_')
+    server, base = launch_server(root, settings)
+    contact_crawler.SITES_BASE_URL = base
+    try:
+        with RssMonitor(exclude=[server.pid]) as rss:
+            if settings['kind'] == 'maps':
+                result = run_maps(settings, root, base)
+            else:
+                result = run_sites(settings, root, base)
+        snapshot = metrics.snapshot()
+    finally:
+        contact_crawler.SITES_BASE_URL = ''
+        server.terminate()
+        shutil.rmtree(root, ignore_errors=True)
+
+    result.update(scenario=name, ts=time.time(), concurrency=settings.get('concurrency', 'adaptive'), revision=git_revision(), resource_policy=resource_policy.policy,
+                  peak_rss_mb=round(rss.peak / 2 ** 20, 1), latencies=latencies(snapshot),
+                  counters=snapshot['counters'])
+    return result
+
+
+def load_results():
+    if not os.path.exists(RESULTS_FILE):
+        return []
+    with open(RESULTS_FILE) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_result(result):
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    with open(RESULTS_FILE, 'a') as f:
+        f.write(json.dumps(result) + '\n')
+
+
+def change(new, old):
+    if not old:
+        return ''
+    return f' ({(new - old) / old * 100:+.0f}% vs {old:.1f})'
+
+
+def report(result, previous):
+    rate_key = 'listings_per_min' if 'listings_per_min' in result else 'sites_per_min'
+    print(f"\n📊 {result['scenario']}: {result[rate_key]:.1f} {rate_key.replace('_', ' ')}"
+          f"{change(result[rate_key], previous and previous.get(rate_key))}")
+    print(f"   {result['seconds']:.1f}s, peak RSS {result['peak_rss_mb']} MB"
+          f"{change(result['peak_rss_mb'], previous and previous.get('peak_rss_mb'))}")
+    if 'emails_expected' in result:
+        print(f"   {result['emails_found']}/{result['emails_expected']} emails found")
+    for name, timer in sorted(result['latencies'].items()):
+        if timer['p50'] is not None:
+            print(f"   {name:18} p50 {timer['p50'] * 1000:8.1f} ms   p95 {timer['p95'] * 1000:8.1f} ms"
+                  f"   ({timer['count']})")
+    if result['counters']:
+        print('   ' + ', '.join(f'{name}={value}' for name, value in result['counters'].items()))
+
+
+def chrome_available():
+    from new_email_ext import get_driver
+    try:
+        get_driver().quit()
+        return True
+    except Exception as e:
+        print(f"⚠️ Chrome is not available, skipping Maps scenarios: {e}")
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run offline replay benchmarks against a local fixture server')
+    parser.add_argument('scenarios', nargs='*', help=f'Scenarios to run (default: all of {", ".join(SCENARIOS)})')
+    parser.add_argument('--list', action='store_true', help='List the scenarios and exit')
+    parser.add_argument('--engine', choices=['http', 'browser', 'auto'], help='Email engine for site scenarios')
+    parser.add_argument('--resource-policy', choices=list(resource_policy.POLICIES), default=resource_policy.policy,
+                        help='Resources Chrome skips, to compare page-load latency between policies')
+    parser.add_argument('--concurrency', type=int,
+                        help='Pin the Chrome concurrency of site scenarios instead of adapting it')
+    parser.add_argument('--no-save', action='store_true', help=f'Do not append the results to {RESULTS_FILE}')
+    args = parser.parse_args()
+    resource_policy.set_policy(args.resource_policy)
+
+    if args.list:
+        for name, settings in SCENARIOS.items():
+            print(f"{name:14} {settings['description']}")
+        return
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    if any(SCENARIOS[name]['kind'] == 'maps' for name in names) and not chrome_available():
+        names = [name for name in names if SCENARIOS[name]['kind'] != 'maps']
+
+    history = load_results()
+    for name in names:
+        settings = dict(SCENARIOS[name])
+        if args.engine:
+            settings['engine'] = args.engine
+        if args.concurrency:
+            settings['concurrency'] = args.concurrency
+        print(f"\n▶️ {name}: {settings['description']}")
+        result = run_scenario(name, settings)
+        previous = next((r for r in reversed(history) if r['scenario'] == name), None)
+        report(result, previous)
+        if not args.no_save:
+            save_result(result)
+
+
+if __name__ == "__main__":
+    main()
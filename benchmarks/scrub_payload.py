@@ -0,0 +1,134 @@
+"""
+Scrub a captured search response body before it is saved to benchmarks/payloads/.
+
+Copy a /search?tbm=map response body from DevTools (Network tab, the request's
+Response) to a file outside the repository, then run from the repository root:
+
+    python -m benchmarks.scrub_payload captured.txt patong_restaurants
+
+This writes benchmarks/payloads/patong_restaurants.txt with the same layout and
+wire format as the capture. Phone numbers, website hosts, URL paths, opaque
+tokens, reviewer names and long free text are replaced. It also writes
+patong_restaurants.expected.json with the records the current parser reads from
+the scrubbed body. Check both before committing them. The expected records are
+what later parser changes are tested against, so compare them with the Maps UI.
+Look through the text for anything personal the rules missed.
+"""
+import os
+import re
+import json
+import hashlib
+import argparse
+from urllib.parse import urlsplit
+
+from maps_payload import decode_payload, parse_search_payload, XSSI_PREFIX, XSSI_SUFFIX
+from benchmarks.maps_payload import PAYLOAD_DIR, FIELDS
+
+PHONE_REGEX = re.compile(r'^(tel:)?\+?[\d\s().-]{7,}$')
+TOKEN_REGEX = re.compile(r'^[A-Za-z0-9_-]{20,}$')
+# Place IDs and feature IDs are public and are what the parser is checked on
+KEEP_REGEX = re.compile(r'^(ChIJ[A-Za-z0-9_-]+|0x[0-9a-f]+:0x[0-9a-f]+)$')
+GOOGLE_HOSTS = ('google.com', 'googleusercontent.com', 'gstatic.com', 'ggpht.com', 'googleadservices.com')
+# A review's author sits next to the link to their contributions
+CONTRIBUTOR_MARKER = '/maps/contrib/'
+# Longer strings with spaces are reviews, descriptions or posts, except for addresses
+FREE_TEXT_LENGTH = 80
+# Characters Google escapes inside the "d" string of a wrapped body
+WIRE_ESCAPES = {'=': '\\u003d', '&': '\\u0026', '<': '\\u003c', '>': '\\u003e'}
+
+
+class Scrubber:
+    """Replaces personal values consistently: the same phone or host maps to the same fake one everywhere."""
+
+    def __init__(self):
+        self.hosts = {}
+        self.phones = {}
+
+    def host(self, host):
+        bare = host[4:] if host.startswith('www.') else host
+        if bare not in self.hosts:
+            self.hosts[bare] = f'site-{len(self.hosts) + 1}.example.com'
+        return ('www.' if host.startswith('www.') else '') + self.hosts[bare]
+
+    def phone(self, text):
+        if text not in self.phones:
+            digits = iter(hashlib.sha256(text.encode()).hexdigest())
+            # The country code and leading digit stay, so the number keeps its format
+            keep = 4 if text.startswith(('+', 'tel:+')) else 1
+            fake = ''.join(str(int(next(digits), 16) % 10) if c.isdigit() and i > keep else c
+                           for i, c in enumerate(text))
+            self.phones[text] = fake
+        return self.phones[text]
+
+    def string(self, text, address=False):
+        if KEEP_REGEX.match(text):
+            return text
+        if text.startswith(('http://', 'https://')):
+            parts = urlsplit(text)
+            host = parts.hostname or ''
+            if host.endswith(GOOGLE_HOSTS):
+                return f'{parts.scheme}://{host}/scrubbed'
+            return f'{parts.scheme}://{self.host(host)}/'
+        if text.startswith('www.') or text.replace('www.', '', 1) in self.hosts:
+            return self.host(text)
+        if PHONE_REGEX.match(text) and sum(c.isdigit() for c in text) >= 7:
+            return self.phone(text)
+        if TOKEN_REGEX.match(text):
+            return 'x' * len(text)
+        if not address and len(text) > FREE_TEXT_LENGTH and ' ' in text:
+            return 'Scrubbed text.'
+        return text
+
+    def walk(self, data):
+        if isinstance(data, list):
+            if any(isinstance(item, str) and CONTRIBUTOR_MARKER in item for item in data):
+                data = ['A reviewer' if isinstance(item, str) and not item.startswith('http') else item
+                        for item in data]
+            return [self.walk(item) for item in data]
+        if isinstance(data, str):
+            # Full addresses are long but are a parsed field
+            return self.string(data, address=',' in data and not data.endswith('.'))
+        return data
+
+
+def encode_like(original, data):
+    """Re-encode scrubbed JSON in the wire format of the original body."""
+    inner = XSSI_PREFIX + '\n' + json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    text = original.strip()
+    if not text.startswith('{'):
+        return inner
+    wrapper = json.loads(text[:-len(XSSI_SUFFIX)] if text.endswith(XSSI_SUFFIX) else text)
+    wrapper = {key: ('x' * len(value) if isinstance(value, str) and TOKEN_REGEX.match(value) else value)
+               for key, value in wrapper.items()}
+    wrapper['d'] = inner
+    body = json.dumps(wrapper, separators=(',', ':'))
+    if '\\u003d' in text:
+        # JSON syntax has none of these characters, so every one is inside a string
+        for char, escape in WIRE_ESCAPES.items():
+            body = body.replace(char, escape)
+    return body + (XSSI_SUFFIX if text.endswith(XSSI_SUFFIX) else '')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scrub a captured search response for benchmarks/payloads/')
+    parser.add_argument('captured', help='Response body copied from DevTools')
+    parser.add_argument('name', help='Name of the saved payload, without extension')
+    args = parser.parse_args()
+
+    with open(args.captured, encoding='utf-8') as f:
+        original = f.read()
+    scrubbed = encode_like(original, Scrubber().walk(decode_payload(original)))
+
+    path = os.path.join(PAYLOAD_DIR, args.name + '.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(scrubbed)
+    records = [{field: dict(details, **listing._asdict()).get(field) for field in FIELDS}
+               for listing, details in parse_search_payload(scrubbed)]
+    with open(path[:-len('.txt')] + '.expected.json', 'w', encoding='utf-8') as f:
+        json.dump(records, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    print(f"✅ Saved {path} with {len(records)} places; check {args.name}.expected.json against Maps")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Startup cost of the command-line entry points.
+
+Runs each script with --help in a fresh interpreter (what every CLI call pays
+before doing any work), reports the best and median wall time, the import time
+measured by -X importtime and which heavy libraries were loaded. Results are
+appended to data/benchmarks/startup.jsonl and compared with the previous run.
+Run from the repository root:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup gms batch_email_extract --runs 10
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+RESULTS_FILE = os.path.join('data', 'benchmarks', 'startup.jsonl')
+
+# name -> command line after the interpreter
+ENTRY_POINTS = {
+    'gms': ['gms.py', '--help'],
+    'multi_location_scraper': ['multi_location_scraper.py', '--help'],
+    'batch_email_extract': ['batch_email_extract.py', '--help'],
+    'new_email_ext': ['new_email_ext.py', '--help'],
+    'worker': ['worker.py', '--help'],
+    'service': ['service.py', '--help'],
+}
+HEAVY_MODULES = ['pandas', 'selenium.webdriver', 'aiohttp', 'bs4', 'pyarrow']
+
+
+def wall_times(command, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + command, capture_output=True, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def import_profile(command):
+    """Total import time in ms and the heavy libraries a command loads, from -X importtime."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime'] + command, capture_output=True, text=True,
+                            check=True).stderr
+    total = 0
+    loaded = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Top-level imports are the least indented; their cumulative times add up to the total
+        if name.startswith(' ') and not name.startswith('  '):
+            total += int(cumulative)
+        loaded.add(name.strip())
+    return total / 1000, [module for module in HEAVY_MODULES if module in loaded]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous():
+    """Last result per entry point."""
+    previous = {}
+    if os.path.exists(RESULTS_FILE):
+        with open(RESULTS_FILE) as f:
+            for line in f:
+                if line.strip():
+                    result = json.loads(line)
+                    previous[result['entry_point']] = result
+    return previous
+
+
+def change(new, old):
+    if not old:
+        return ''
+    return f' ({(new - old) / old * 100:+.0f}% vs {old * 1000:.0f} ms)'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the startup time of the command-line entry points')
+    parser.add_argument('entry_points', nargs='*', help=f'Entry points (default: all of {", ".join(ENTRY_POINTS)})')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per entry point (default: 5)')
+    parser.add_argument('--no-save', action='store_true', help=f'Do not append the results to {RESULTS_FILE}')
+    args = parser.parse_args()
+
+    names = args.entry_points or [name for name, command in ENTRY_POINTS.items() if os.path.exists(command[0])]
+    unknown = [name for name in names if name not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"unknown entry point(s): {', '.join(unknown)}")
+
+    previous = load_previous()
+    revision = git_revision()
+    for name in names:
+        command = ENTRY_POINTS[name]
+        times = wall_times(command, args.runs)
+        import_ms, heavy = import_profile(command)
+        result = {'entry_point': name, 'ts': time.time(), 'revision': revision, 'best': min(times),
+                  'median': statistics.median(times), 'import_ms': round(import_ms, 1), 'heavy_modules': heavy}
+        print(f"🚀 {name:24} best {result['best'] * 1000:6.0f} ms{change(result['best'], previous.get(name, {}).get('best'))}"
+              f", median {result['median'] * 1000:6.0f} ms, imports {import_ms:6.0f} ms"
+              f" [{', '.join(heavy) or 'no heavy libraries'}]")
+        if not args.no_save:
+            os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+            with open(RESULTS_FILE, 'a') as f:
+                f.write(json.dumps(result) + '\n')
+
+
+if __name__ == "__main__":
+    main()
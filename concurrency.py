@@ -0,0 +1,140 @@
+import os
+import time
+import threading
+
+import psutil
+
+from metrics import metrics
+
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = max(2, os.cpu_count() or 2)
+DEFAULT_START_CONCURRENCY = 2
+
+# Completed fetches between adjustments (at least one per slot in flight)
+MIN_WINDOW = 4
+# Cut the limit in half when more than this share of a window failed or timed out...
+ERROR_THRESHOLD = 0.25
+# ...or when the window's median latency exceeds the baseline by this factor
+LATENCY_FACTOR = 2.0
+# The baseline is the best window median, allowed to creep up so a slower mix of sites is relearnt
+BASELINE_DRIFT = 1.1
+DECREASE_FACTOR = 0.5
+# Memory one more Chrome session needs, and memory to always leave free
+DRIVER_MEMORY_MB = 350
+MEMORY_RESERVE_MB = 512
+
+
+def available_memory_mb():
+    return psutil.virtual_memory().available / 2 ** 20
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on the number of fetches in flight.
+
+    After every window of completed fetches the limit grows by one if the
+    window was healthy and there is memory for another Chrome session, and is
+    halved if too many fetches failed or timed out, the median latency rose
+    well above the baseline, or free memory ran low. The limit stays between
+    `minimum` and `maximum`; a fixed value disables adjustments.
+
+    Callers wrap each fetch in acquire() / release(seconds, ok).
+    """
+
+    def __init__(self, minimum=DEFAULT_MIN_CONCURRENCY, maximum=DEFAULT_MAX_CONCURRENCY,
+                 start=DEFAULT_START_CONCURRENCY, fixed=None, on_low_memory=None):
+        """
+        Args:
+            minimum (int): Floor of the limit
+            maximum (int): Ceiling of the limit
+            start (int): Initial limit, clamped to the floor and ceiling
+            fixed (int): Pin the limit to this value, e.g. for reproducible benchmarks
+            on_low_memory (callable): Optional callback(limit) after a decrease caused by low
+                memory, e.g. to quit idle Chrome sessions
+        """
+        if fixed:
+            minimum = maximum = start = fixed
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(start, self.minimum), self.maximum)
+        self.fixed = bool(fixed)
+        self.on_low_memory = on_low_memory
+        self.inflight = 0
+        self.history = []
+        self._started = time.time()
+        self._window = []
+        self._stale = 0
+        self._baseline = None
+        self._cond = threading.Condition()
+        self._log('fixed' if self.fixed else 'start')
+
+    def _log(self, reason, **stats):
+        self.history.append(dict(t=round(time.time() - self._started, 2), limit=self.limit, reason=reason, **stats))
+
+    def acquire(self):
+        """Block until a slot is free under the current limit and take it."""
+        with self._cond:
+            while self.inflight >= self.limit:
+                self._cond.wait()
+            self.inflight += 1
+
+    def release(self, seconds, ok=True):
+        """
+        Give a slot back, reporting how long the fetch took and whether it succeeded.
+
+        `ok=None` is for fetches that failed for reasons of their own, like a
+        domain that does not resolve: they say nothing about load and are left
+        out of the window.
+        """
+        low_memory = False
+        with self._cond:
+            self.inflight -= 1
+            if self._stale:
+                # Started before the last decrease, so it says nothing about the new limit
+                self._stale -= 1
+            elif ok is not None:
+                self._window.append((seconds, ok))
+            if not self.fixed and len(self._window) >= max(self.limit, MIN_WINDOW):
+                low_memory = self._adjust() == 'memory'
+            self._cond.notify_all()
+        if low_memory and self.on_low_memory:
+            self.on_low_memory(self.limit)
+
+    def _adjust(self):
+        latencies = sorted(seconds for seconds, _ in self._window)
+        median = latencies[len(latencies) // 2]
+        error_rate = sum(1 for _, ok in self._window if not ok) / len(self._window)
+        free_mb = available_memory_mb()
+        self._window = []
+
+        if error_rate > ERROR_THRESHOLD:
+            reason = 'errors'
+        elif free_mb < MEMORY_RESERVE_MB:
+            reason = 'memory'
+        elif self._baseline is not None and median > LATENCY_FACTOR * self._baseline:
+            reason = 'latency'
+        elif free_mb > MEMORY_RESERVE_MB + DRIVER_MEMORY_MB:
+            reason = 'increase'
+        else:
+            reason = None
+        if reason != 'latency':
+            # A window slowed down by overload must not become the new normal
+            self._baseline = median if self._baseline is None else min(self._baseline * BASELINE_DRIFT, median)
+
+        previous = self.limit
+        if reason == 'increase':
+            self.limit = min(self.limit + 1, self.maximum)
+        elif reason:
+            self.limit = max(int(self.limit * DECREASE_FACTOR), self.minimum)
+            self._stale = self.inflight
+        if self.limit == previous:
+            return None
+        metrics.incr('concurrency_increases' if self.limit > previous else 'concurrency_decreases')
+        self._log(reason, p50=round(median, 3), error_rate=round(error_rate, 2), free_mb=int(free_mb))
+        return reason
+
+    def summary(self):
+        """Floor, ceiling and the limit over time, for the run report."""
+        limits = [entry['limit'] for entry in self.history]
+        return {'min': self.minimum, 'max': self.maximum, 'fixed': self.fixed, 'final': self.limit,
+                'peak': max(limits), 'history': self.history}
@@ -0,0 +1,200 @@
+import os
+import re
+import time
+import heapq
+import contextvars
+from urllib.parse import urljoin, urlparse, unquote
+
+from email_cache import registrable_domain
+from email_scanner import best_email
+
+DEFAULT_MAX_PAGES = 4
+DEFAULT_MAX_TIME = 30
+
+# Fetch business websites from a replay server instead of the internet, e.g. http://127.0.0.1:8000.
+# Crawling, caching and domain checks keep using the real URLs; only the fetch goes to
+# <base>/sites/<host>/<path>.
+SITES_BASE_URL = os.environ.get('GMS_SITES_BASE_URL', '').rstrip('/')
+
+# Seconds the current task or thread has spent waiting for host_scheduler slots. Crawl budgets
+# leave that time out: sites queued behind others of the same domain would otherwise time out unfetched.
+host_waited = contextvars.ContextVar('host_waited', default=0.0)
+
+# Guesses from the old fixed-path strategy, tried when the homepage links nowhere better
+FALLBACK_PATHS = ['/contact', '/contact-us', '/kontakt']
+
+# Keyword -> score, matched against the link text and URL path
+LINK_KEYWORDS = {
+    'contact': 10, 'kontakt': 10, 'contacto': 10, 'contatti': 10, 'contactez': 10,
+    'impressum': 9, 'imprint': 9, 'mentions-legales': 8, 'legal-notice': 8,
+    'reach-us': 8, 'reach us': 8, 'get-in-touch': 8, 'get in touch': 8, 'write to us': 7,
+    'about': 5, 'ueber-uns': 5, 'uber-uns': 5, 'über uns': 5, 'chi-siamo': 5, 'quienes-somos': 5,
+    'team': 3, 'reservation': 3, 'booking': 2, 'legal': 2, 'privacy': 1,
+}
+SKIP_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.zip', '.mp4', '.mp3', '.css', '.js')
+SKIP_WORDS = ('login', 'signin', 'cart', 'checkout', 'wp-admin', 'feed', '/tag/', '/category/')
+
+STRIP_REGEX = re.compile(r'<(script|style|noscript)\b.*?</\1>|<[^>]+>', re.S | re.I)
+LINK_REGEX = re.compile(r'<a\s[^>]*?href\s*=\s*["\']([^"\']+)["\'][^>]*>(.*?)</a>', re.I | re.S)
+TAG_REGEX = re.compile(r'<[^>]+>')
+
+
+def visible_text(html):
+    """Crude tag stripper, good enough to judge how much text a page has."""
+    return ' '.join(STRIP_REGEX.sub(' ', html).split())
+
+
+def replay_url(url):
+    """The URL to fetch for a website page: unchanged, or its path on the replay server."""
+    if not SITES_BASE_URL:
+        return url
+    parsed = urlparse(url)
+    query = f'?{parsed.query}' if parsed.query else ''
+    return f'{SITES_BASE_URL}/sites/{parsed.netloc}{parsed.path or "/"}{query}'
+
+
+def original_url(url):
+    """Map a URL on the replay server back to the website URL it stands for."""
+    prefix = f'{SITES_BASE_URL}/sites/'
+    if not SITES_BASE_URL or not url.startswith(prefix):
+        return url
+    host, _, rest = url[len(prefix):].partition('/')
+    return f'https://{host}/{rest}'
+
+
+def extract_links(html, base_url):
+    """
+    Pull (absolute url, link text) pairs out of a page.
+
+    Returns:
+        list: (url, text) tuples
+    """
+    links = []
+    for href, inner in LINK_REGEX.findall(html):
+        href = href.strip()
+        if href.lower().startswith(('mailto:', 'javascript:', 'tel:', '#')):
+            continue
+        text = ' '.join(TAG_REGEX.sub(' ', inner).split()).lower()
+        links.append((urljoin(base_url, href).split('#')[0], text))
+    return links
+
+
+def score_link(url, text):
+    """Rank a link by how likely it leads to contact details. 0 means not worth visiting."""
+    path = unquote(urlparse(url).path).lower()
+    if path.endswith(SKIP_EXTENSIONS) or any(word in path for word in SKIP_WORDS):
+        return 0
+    score = 0
+    for keyword, weight in LINK_KEYWORDS.items():
+        if keyword in text:
+            score = max(score, weight + 1)
+        if keyword.replace(' ', '-') in path:
+            score = max(score, weight)
+    if score:
+        # Prefer short, top-level pages over deep ones
+        score -= min(path.count('/') - 1, 3) * 0.5
+        if urlparse(url).query:
+            score -= 1
+    return max(score, 0)
+
+
+class ContactCrawl:
+    """
+    Crawl state for one website: a same-domain frontier ranked by score_link.
+
+    Drive it with next_url() and feed(url, html) from any fetcher. The crawl
+    ends when email_scanner finds an email, the page or time budget runs out, or there
+    is nothing worth visiting left. Time spent waiting for a host slot does not count
+    against the time budget.
+    """
+
+    def __init__(self, website, max_pages=DEFAULT_MAX_PAGES, max_time=DEFAULT_MAX_TIME):
+        self.website = website
+        self.domain = registrable_domain(website)
+        self.max_pages = max_pages
+        self.deadline = time.monotonic() + max_time
+        self._waited_at_start = host_waited.get()
+        self.pages = 0
+        self.loaded = 0
+        self.out_of_time = False
+        self.email = None
+        self._seen = {website.rstrip('/')}
+        self._frontier = [(-float('inf'), 0, website)]
+        self._order = 1
+        self._fallbacks_added = False
+
+    def _push(self, url, score):
+        key = url.rstrip('/')
+        if key in self._seen or not score:
+            return
+        self._seen.add(key)
+        heapq.heappush(self._frontier, (-score, self._order, url))
+        self._order += 1
+
+    def _add_fallbacks(self):
+        if self._fallbacks_added:
+            return
+        self._fallbacks_added = True
+        for path in FALLBACK_PATHS:
+            self._push(self.website.rstrip('/') + path, 0.5)
+
+    def next_url(self):
+        """The best URL left to visit, or None when the crawl is over."""
+        if self.email or self.pages >= self.max_pages:
+            return None
+        if time.monotonic() - (host_waited.get() - self._waited_at_start) > self.deadline:
+            self.out_of_time = True
+            return None
+        if not self._frontier:
+            return None
+        self.pages += 1
+        return heapq.heappop(self._frontier)[2]
+
+    def feed(self, url, html):
+        """
+        Scan a fetched page for an email and queue its promising same-domain links.
+
+        Args:
+            url (str): Final URL of the page, after redirects
+            html (str): Page HTML, or None if the fetch failed
+
+        Returns:
+            str: The email found on this page, or None
+        """
+        if html:
+            self.loaded += 1
+            self.email = best_email(html, self.website)
+            if self.email:
+                return self.email
+            for link, text in extract_links(html, url):
+                if registrable_domain(link) == self.domain and urlparse(link).scheme in ('http', 'https'):
+                    self._push(link, score_link(link, text))
+        # Nothing promising linked (or the homepage failed): fall back to the usual guesses
+        if not any(-score >= 1 for score, _, _ in self._frontier):
+            self._add_fallbacks()
+        return None
+
+
+def crawl_site(website, fetch, max_pages=DEFAULT_MAX_PAGES, max_time=DEFAULT_MAX_TIME):
+    """
+    Crawl a site with a blocking fetcher until an email turns up.
+
+    Args:
+        website (str): Normalized homepage URL
+        fetch (callable): fetch(url) -> (final url, html); may raise on failure
+        max_pages (int): Maximum pages to load
+        max_time (float): Maximum seconds to spend on the site
+
+    Returns:
+        tuple: (email or None, pages fetched, whether the time budget ran out before any page loaded)
+    """
+    crawl = ContactCrawl(website, max_pages, max_time)
+    while True:
+        url = crawl.next_url()
+        if url is None:
+            return crawl.email, crawl.pages, crawl.out_of_time and not crawl.loaded
+        try:
+            final_url, html = fetch(url)
+        except Exception:
+            final_url, html = url, None
+        crawl.feed(final_url, html)
@@ -0,0 +1,112 @@
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from rate_limit import throttle
+from metrics import metrics
+from resource_policy import record_network
+
+DETAIL_WAIT = 10
+INFO_WAIT = 3
+DEFAULT_DETAIL_CONCURRENCY = 4
+
+# Reads every detail field in one round trip. Works for the place page and the detail pane.
+DETAILS_JS = """
+const label = (selector, prefix) => {
+    const el = document.querySelector(selector);
+    if (!el) return null;
+    const value = (el.getAttribute('aria-label') || '').split(prefix).pop().trim();
+    return value || null;
+};
+const text = (selector) => {
+    const el = document.querySelector(selector);
+    return el ? el.innerText.trim() || null : null;
+};
+return {
+    name: text('h1.DUwDvf'),
+    website: label("[aria-label^='Website']", 'Website:'),
+    phone: label("[aria-label^='Phone']", 'Phone:'),
+    address: label("button[data-item-id='address']", 'Address:'),
+    plus_code: label("button[data-item-id='oloc']", 'Plus code:'),
+    category: text('button.DkEaL'),
+};
+"""
+
+
+def rebase_url(url, base_url):
+    """Point a Maps URL at another scheme and host, e.g. a local fixture server."""
+    if not base_url:
+        return url
+    parsed = urlparse(url)
+    base = urlparse(base_url)
+    return parsed._replace(scheme=base.scheme, netloc=base.netloc).geturl()
+
+
+def read_details(driver):
+    """Read the detail fields of the place currently shown in the browser."""
+    return driver.execute_script(DETAILS_JS)
+
+
+def fetch_place_details(driver, url):
+    """
+    Open a place URL directly and read its details.
+
+    Args:
+        driver (WebDriver): Browser session to use
+        url (str): Maps place URL
+
+    Returns:
+        dict: name, website, phone, address, plus_code and category (None when missing)
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    throttle()
+    with metrics.timer('detail_wait'):
+        driver.get(url)
+        WebDriverWait(driver, DETAIL_WAIT).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "h1.DUwDvf"))
+        )
+        try:
+            # The info rows render a moment after the title
+            WebDriverWait(driver, INFO_WAIT).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "[data-item-id]"))
+            )
+        except TimeoutException:
+            pass
+        details = read_details(driver)
+    record_network(driver)
+    return details
+
+
+def fetch_details(place_urls, pool, concurrency=DEFAULT_DETAIL_CONCURRENCY, base_url=None, on_result=None):
+    """
+    Fetch the detail pages of many places at once across pooled browser sessions.
+
+    Args:
+        place_urls (list): Maps place URLs, in listing order
+        pool (DriverPool): Pool of Maps browser sessions
+        concurrency (int): Maximum number of pages loading at the same time
+        base_url (str): Optional scheme and host to load the pages from instead of Google
+        on_result (callable): Optional callback(index, details) called as soon as each page is read
+
+    Returns:
+        list: One details dict per URL in the same order, or None where the page failed
+    """
+    def fetch(index, url):
+        try:
+            with pool.session() as driver:
+                driver.note_page()
+                details = fetch_place_details(driver, rebase_url(url, base_url))
+        except (TimeoutException, WebDriverException, TimeoutError) as e:
+            if isinstance(e, (TimeoutException, TimeoutError)):
+                metrics.incr('detail_timeouts')
+            print(f"⚠️ Could not load details from {url}: {e}")
+            return None
+        if on_result:
+            on_result(index, details)
+        return details
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(fetch, range(len(place_urls)), place_urls))
@@ -0,0 +1,274 @@
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+import psutil
+from selenium.common.exceptions import WebDriverException
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_RECYCLE_PAGES = 50
+DEFAULT_RECYCLE_MEMORY_MB = 1024
+DEFAULT_CHECKOUT_TIMEOUT = 120
+
+
+class DriverPool:
+    """
+    Bounded pool of long-lived Chrome sessions.
+
+    Workers check a driver out with `with pool.session() as driver:` and it is
+    returned automatically. Returned drivers get their cookies and storage
+    cleared; drivers that crashed, served too many pages or grew past the
+    memory limit are quit and replaced lazily on the next checkout.
+    """
+
+    def __init__(self, factory, size=DEFAULT_POOL_SIZE, recycle_pages=DEFAULT_RECYCLE_PAGES,
+                 recycle_memory_mb=DEFAULT_RECYCLE_MEMORY_MB, checkout_timeout=DEFAULT_CHECKOUT_TIMEOUT,
+                 reset=True):
+        """
+        Args:
+            factory (callable): Creates a new WebDriver
+            size (int): Maximum number of live drivers
+            recycle_pages (int): Quit a driver after this many page loads (0 to disable)
+            recycle_memory_mb (int): Quit a driver once Chrome uses more than this (0 to disable)
+            checkout_timeout (float): Seconds to wait for a free driver before raising TimeoutError
+            reset (bool): Clear cookies and storage when a driver is returned
+        """
+        self.factory = factory
+        self.size = size
+        self.recycle_pages = recycle_pages
+        self.recycle_memory_mb = recycle_memory_mb
+        self.checkout_timeout = checkout_timeout
+        self.reset = reset
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._live = 0
+        self._pages = {}
+        self._closed = False
+        self._stats = {
+            'created': 0,
+            'recycled_pages': 0,
+            'recycled_memory': 0,
+            'replaced_crashed': 0,
+            'checkouts': 0,
+            'checkout_wait_total': 0.0,
+            'checkout_wait_max': 0.0,
+            'pages': 0,
+        }
+
+    def _create(self):
+        driver = self.factory()
+        with self._lock:
+            self._pages[id(driver)] = 0
+            self._stats['created'] += 1
+        return driver
+
+    def _discard(self, driver):
+        with self._lock:
+            self._pages.pop(id(driver), None)
+            self._live -= 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _reserve_slot(self):
+        with self._lock:
+            if self._live < self.size:
+                self._live += 1
+                return True
+        return False
+
+    def checkout(self):
+        """Take a healthy driver from the pool, starting one if there is free capacity."""
+        if self._closed:
+            raise RuntimeError("DriverPool is closed")
+        start = time.perf_counter()
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                if self._reserve_slot():
+                    try:
+                        driver = self._create()
+                    except Exception:
+                        with self._lock:
+                            self._live -= 1
+                        raise
+                else:
+                    remaining = self.checkout_timeout - (time.perf_counter() - start)
+                    try:
+                        driver = self._idle.get(timeout=max(remaining, 0))
+                    except queue.Empty:
+                        raise TimeoutError(f"No driver available after {self.checkout_timeout}s")
+
+            if is_healthy(driver):
+                break
+            with self._lock:
+                self._stats['replaced_crashed'] += 1
+            self._discard(driver)
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['checkout_wait_total'] += waited
+            self._stats['checkout_wait_max'] = max(self._stats['checkout_wait_max'], waited)
+        return driver
+
+    def checkin(self, driver, pages=0):
+        """Return a driver after use, recording how many pages it loaded."""
+        with self._lock:
+            self._pages[id(driver)] = self._pages.get(id(driver), 0) + pages
+            self._stats['pages'] += pages
+            used = self._pages[id(driver)]
+
+        if self._closed:
+            self._discard(driver)
+            return
+        if not is_healthy(driver):
+            with self._lock:
+                self._stats['replaced_crashed'] += 1
+            self._discard(driver)
+            return
+        if self.recycle_pages and used >= self.recycle_pages:
+            with self._lock:
+                self._stats['recycled_pages'] += 1
+            self._discard(driver)
+            return
+        if self.recycle_memory_mb and driver_memory_mb(driver) > self.recycle_memory_mb:
+            with self._lock:
+                self._stats['recycled_memory'] += 1
+            self._discard(driver)
+            return
+
+        try:
+            if self.reset:
+                reset_driver(driver)
+        except WebDriverException:
+            self._discard(driver)
+            return
+        self._idle.put(driver)
+
+    @contextmanager
+    def session(self):
+        """
+        Check out a driver for the duration of a with-block.
+
+        Yields a PooledDriver; call `note_page()` after each page load so the
+        recycle policy can count pages.
+        """
+        driver = self.checkout()
+        handle = PooledDriver(driver)
+        try:
+            yield handle
+        finally:
+            self.checkin(driver, handle.pages)
+
+    def metrics(self):
+        """Snapshot of the pool configuration and counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['live'] = self._live
+        stats['idle'] = self._idle.qsize()
+        stats['size'] = self.size
+        stats['recycle_pages'] = self.recycle_pages
+        stats['recycle_memory_mb'] = self.recycle_memory_mb
+        stats['checkout_timeout'] = self.checkout_timeout
+        checkouts = stats['checkouts'] or 1
+        stats['checkout_wait_avg'] = stats['checkout_wait_total'] / checkouts
+        return stats
+
+    def warm(self, count):
+        """Start up to `count` sessions now, so the first checkouts do not wait for Chrome to launch."""
+        drivers = []
+        try:
+            for _ in range(min(count, self.size)):
+                drivers.append(self.checkout())
+        finally:
+            for driver in drivers:
+                self.checkin(driver)
+        return len(drivers)
+
+    def trim(self, keep):
+        """Quit idle drivers until at most `keep` are alive, e.g. when memory runs low."""
+        while True:
+            with self._lock:
+                if self._live <= keep:
+                    return
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(driver)
+
+    def close(self):
+        """Quit every idle driver. Drivers still checked out are quit on checkin."""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PooledDriver:
+    """Thin wrapper that forwards to the WebDriver and counts page loads."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+    def note_page(self):
+        self.pages += 1
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+
+def is_healthy(driver):
+    """Check that the browser session still answers commands."""
+    try:
+        driver.execute_script("return 1")
+        return True
+    except Exception:
+        return False
+
+
+def reset_driver(driver):
+    """Clear cookies, web storage and extra tabs so the next site starts clean."""
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+    driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+    try:
+        driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+    except WebDriverException:
+        # about:blank and error pages have no storage
+        pass
+    driver.get('about:blank')
+
+
+def driver_memory_mb(driver):
+    """Resident memory of chromedriver and all of its Chrome child processes, in MB."""
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+        total = 0
+        for proc in processes:
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+    except (AttributeError, psutil.Error):
+        return 0
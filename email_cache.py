@@ -0,0 +1,254 @@
+import os
+import time
+import sqlite3
+import argparse
+import threading
+from functools import lru_cache
+from collections import namedtuple
+from urllib.parse import urlparse
+
+from metrics import metrics
+
+# Create data directory if it doesn't exist
+DATA_DIR = 'data'
+os.makedirs(DATA_DIR, exist_ok=True)
+
+DEFAULT_CACHE_PATH = os.path.join(DATA_DIR, 'email_cache.sqlite')
+DAY = 24 * 60 * 60
+DEFAULT_TTL_FOUND = 30 * DAY
+DEFAULT_TTL_NOT_FOUND = 7 * DAY
+DEFAULT_TTL_ERROR = 1 * DAY
+
+# Cached result statuses
+FOUND = 'found'
+NOT_FOUND = 'not_found'
+ERROR = 'error'
+
+# Platforms whose sites share one registered domain but are not on the public suffix list:
+# the whole host names the business
+SHARED_HOSTS = {'business.site'}
+# Platforms that host every business under one host name: host -> path segments that name the site
+PATH_PLATFORMS = {'sites.google.com': 2, 'linktr.ee': 1}
+
+CacheEntry = namedtuple('CacheEntry', ['domain', 'email', 'status', 'reason', 'website', 'fetched_at'])
+
+
+@lru_cache(maxsize=1)
+def _suffix_extractor():
+    import tldextract
+    # The bundled public suffix list, including private suffixes like wixsite.com and github.io; no network
+    return tldextract.TLDExtract(cache_dir=None, suffix_list_urls=(), include_psl_private_domains=True)
+
+
+def registrable_domain(url):
+    """
+    Reduce a URL to the domain a business registered, using the public suffix list, e.g.
+    https://www.shop.chain.co.th/patong -> chain.co.th, https://pizzabar.wixsite.com/menu -> pizzabar.wixsite.com
+
+    Sites on shared hosting platforms keep their own host or path, e.g.
+    https://sites.google.com/view/thaicafe/menu -> sites.google.com/view/thaicafe
+
+    Returns None for empty or unparsable URLs.
+    """
+    if not url or not isinstance(url, str):
+        return None
+    if '://' not in url:
+        url = 'https://' + url.strip()
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower().rstrip('.')
+    if not host:
+        return None
+    if host.startswith('www.'):
+        host = host[len('www.'):]
+    if host in PATH_PLATFORMS:
+        segments = [segment for segment in parsed.path.split('/') if segment][:PATH_PLATFORMS[host]]
+        return '/'.join([host] + segments)
+    if host.replace('.', '').isdigit():
+        return host
+    extracted = _suffix_extractor()(host)
+    domain = extracted.top_domain_under_public_suffix
+    if not domain:
+        # localhost, intranet names and unknown TLDs
+        return host
+    if domain in SHARED_HOSTS:
+        return host
+    return domain
+
+
+def site_key(url):
+    """
+    Key of the rows one fetch can answer: the host without "www.", or the site
+    on a path-hosted platform like Google Sites.
+
+    Hosts of one registered domain are fetched and cached separately, since
+    chains often run a site per branch.
+    """
+    domain = registrable_domain(url)
+    if not domain or '/' in domain:
+        return domain
+    host = (urlparse(url if '://' in url else 'https://' + url).hostname or '').lower().rstrip('.')
+    return host[len('www.'):] if host.startswith('www.') else host or None
+
+
+class EmailCache:
+    """
+    On-disk cache of email extraction results keyed by site_key.
+
+    Found emails, "no email" results and failures are stored with a timestamp
+    and each kind has its own time-to-live. Safe to share between threads.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_found=DEFAULT_TTL_FOUND,
+                 ttl_not_found=DEFAULT_TTL_NOT_FOUND, ttl_error=DEFAULT_TTL_ERROR):
+        """
+        Args:
+            path (str): SQLite database file
+            ttl_found (float): Seconds a found email stays fresh
+            ttl_not_found (float): Seconds a "no email" result stays fresh
+            ttl_error (float): Seconds a failure stays fresh
+        """
+        self.path = path
+        self.ttls = {FOUND: ttl_found, NOT_FOUND: ttl_not_found, ERROR: ttl_error}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                domain TEXT PRIMARY KEY,
+                email TEXT,
+                status TEXT NOT NULL,
+                reason TEXT,
+                website TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def is_fresh(self, entry, now=None):
+        ttl = self.ttls.get(entry.status, 0)
+        return (now or time.time()) - entry.fetched_at < ttl
+
+    def lookup(self, domain):
+        """Return the stored entry for a domain, fresh or not, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT domain, email, status, reason, website, fetched_at FROM results WHERE domain = ?",
+                (domain,)
+            ).fetchone()
+        return CacheEntry(*row) if row else None
+
+    def get(self, website):
+        """Return the fresh entry for a website's site and count the hit or miss."""
+        domain = site_key(website)
+        entry = self.lookup(domain) if domain else None
+        with self._lock:
+            if entry and self.is_fresh(entry):
+                self.hits += 1
+                metrics.incr('email_cache_hits')
+                return entry
+            self.misses += 1
+        metrics.incr('email_cache_misses')
+        return None
+
+    def put(self, website, email, status, reason=None):
+        """Store the result for a website's site, replacing any older entry."""
+        domain = site_key(website)
+        if not domain:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (domain, email, status, reason, website, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (domain, email, status, reason, website, time.time())
+            )
+            self._conn.commit()
+
+    def entries(self, status=None):
+        query = "SELECT domain, email, status, reason, website, fetched_at FROM results"
+        params = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY fetched_at DESC", params).fetchall()
+        return [CacheEntry(*row) for row in rows]
+
+    def stats(self):
+        """Entry counts per status, split into fresh and expired."""
+        now = time.time()
+        stats = {}
+        for entry in self.entries():
+            bucket = stats.setdefault(entry.status, {'fresh': 0, 'expired': 0})
+            bucket['fresh' if self.is_fresh(entry, now) else 'expired'] += 1
+        return stats
+
+    def prune(self, status=None, expired_only=True):
+        """
+        Delete cache entries.
+
+        Args:
+            status (str): Only delete entries with this status
+            expired_only (bool): Keep entries that are still fresh
+
+        Returns:
+            int: Number of deleted entries
+        """
+        now = time.time()
+        doomed = [
+            entry.domain for entry in self.entries(status)
+            if not (expired_only and self.is_fresh(entry, now))
+        ]
+        with self._lock:
+            self._conn.executemany("DELETE FROM results WHERE domain = ?", [(domain,) for domain in doomed])
+            self._conn.commit()
+        return len(doomed)
+
+    def close(self):
+        self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and prune the email result cache')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help=f'Cache file (default: {DEFAULT_CACHE_PATH})')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('stats', help='Show entry counts per status')
+
+    show = commands.add_parser('show', help='Show cached entries')
+    show.add_argument('domain', nargs='?', help='Host or URL to look up (default: list everything)')
+    show.add_argument('--status', choices=[FOUND, NOT_FOUND, ERROR], help='Only list entries with this status')
+
+    prune = commands.add_parser('prune', help='Delete expired entries')
+    prune.add_argument('--status', choices=[FOUND, NOT_FOUND, ERROR], help='Only prune entries with this status')
+    prune.add_argument('--all', action='store_true', help='Delete fresh entries too')
+    args = parser.parse_args()
+
+    cache = EmailCache(args.cache)
+    if args.command == 'stats':
+        stats = cache.stats()
+        if not stats:
+            print("📭 Cache is empty")
+        for status, counts in sorted(stats.items()):
+            print(f"{status:10} {counts['fresh']:6} fresh {counts['expired']:6} expired")
+    elif args.command == 'show':
+        if args.domain:
+            entries = [cache.lookup(site_key(args.domain))]
+            entries = [entry for entry in entries if entry]
+        else:
+            entries = cache.entries(args.status)
+        for entry in entries:
+            fetched = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.fetched_at))
+            state = 'fresh' if cache.is_fresh(entry) else 'expired'
+            print(f"{entry.domain:40} {entry.status:10} {entry.email or entry.reason or '':40} {fetched} ({state})")
+        if not entries:
+            print("📭 No matching entries")
+    elif args.command == 'prune':
+        removed = cache.prune(args.status, expired_only=not args.all)
+        print(f"🧹 Removed {removed} entries")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
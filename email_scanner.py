@@ -0,0 +1,180 @@
+import re
+import html
+from urllib.parse import unquote
+
+from email_cache import registrable_domain
+
+# A single pass finds anchors: an @ (plain, entity- or percent-encoded) or a bracketed
+# "(at)". Each anchor is then grown into a full address with the short regexes below,
+# looking only at the bytes around it. The lookahead keeps the scan on the rare bytes
+# that can start an anchor. Cloudflare-protected addresses carry no @ and get their
+# own pass, only on pages that use the protection.
+ANCHOR_REGEX = re.compile(
+    rb'(?=[@&%\[\(\{])(?:(?P<at>@|&#0*64;|&#[xX]0*40;|&commat;|%40)'
+    rb'|(?P<spelled>[\[\(\{]\s*(?:at|AT)\s*[\]\)\}]))'
+)
+CF_REGEX = re.compile(rb'(?:data-cfemail="|email-protection#)([0-9a-fA-F]{4,256})')
+_ENTITY = rb'&#[xX]?[0-9a-fA-F]{1,6};'
+LOCAL_BYTES = frozenset(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789._%+-&#;')
+LOCAL_TAIL = re.compile(rb'(?:[A-Za-z0-9._%+-]|' + _ENTITY + rb')+\Z')
+DOMAIN_AFTER = re.compile(
+    rb'(?:[A-Za-z0-9-]|' + _ENTITY + rb')+(?:(?:\.|&#0*46;|&#[xX]0*2[eE];|&period;)(?:[A-Za-z0-9-]|' +
+    _ENTITY + rb')+)+'
+)
+SPELLED_DOMAIN_AFTER = re.compile(
+    rb'\s*[A-Za-z0-9-]{1,63}(?:(?:\s*[\[\(\{]\s*(?:dot|DOT|\.)\s*[\]\)\}]\s*|\.)[A-Za-z0-9-]{1,63})+'
+)
+LOOKBEHIND = 400  # bytes; room for a fully entity-encoded local part
+VALID_EMAIL = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,24}')
+SPELLED_DOT = re.compile(r'\s*[\[\(\{]\s*(?:dot|\.)\s*[\]\)\}]\s*', re.I)
+HASH_LOCAL = re.compile(r'[0-9a-f]{16,}')
+
+# Addresses that look like emails but never are a business contact
+ASSET_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.avif', '.ico', '.css', '.js',
+                    '.woff', '.woff2', '.ttf', '.mp4', '.pdf')
+JUNK_DOMAINS = ('sentry.io', 'sentry-next.wixpress.com', 'wixpress.com', 'sentry.wixpress.com',
+                'example.com', 'example.org', 'example.net', 'domain.com', 'yourdomain.com',
+                'mysite.com', 'yoursite.com', 'test.com')
+JUNK_LOCALS = ('noreply', 'no-reply', 'donotreply', 'do-not-reply', 'mailer-daemon', 'postmaster',
+               'yourname', 'your-name', 'username', 'john.doe', 'johndoe')
+# email.com is a real provider and name@, user@ or email@ can be real mailboxes; only these form placeholders are junk
+JUNK_ADDRESSES = ('you@email.com', 'your@email.com', 'youremail@email.com', 'your.email@email.com',
+                  'name@email.com', 'user@email.com', 'email@email.com', 'example@email.com', 'someone@email.com')
+ROLE_LOCALS = ('info', 'contact', 'hello', 'office', 'kontakt', 'mail', 'reservations', 'reservation',
+               'booking', 'bookings', 'enquiries', 'enquiry', 'inquiries', 'sales', 'reception', 'team',
+               'admin', 'hola', 'ciao', 'bonjour', 'service', 'support')
+
+
+def _decode_cfemail(encoded):
+    """Undo Cloudflare's XOR obfuscation: the first byte is the key for the rest."""
+    try:
+        data = bytes.fromhex(encoded)
+    except ValueError:
+        return None
+    if len(data) < 2:
+        return None
+    return ''.join(chr(b ^ data[0]) for b in data[1:])
+
+
+def _clean(candidate):
+    """Normalize a raw candidate, or return None if it is not a plausible address."""
+    candidate = candidate.strip().strip('.').rstrip('.,;:')
+    match = VALID_EMAIL.fullmatch(candidate)
+    if not match:
+        return None
+    local, domain = candidate.rsplit('@', 1)
+    domain = domain.lower()
+    lowered = local.lower()
+    if domain.endswith(ASSET_EXTENSIONS) or '@2x' in candidate.lower() or lowered.endswith(('@2x', '@3x')):
+        return None
+    if any(domain == junk or domain.endswith('.' + junk) for junk in JUNK_DOMAINS) or 'sentry' in domain:
+        return None
+    if lowered in JUNK_LOCALS or HASH_LOCAL.fullmatch(lowered) or f'{lowered}@{domain}' in JUNK_ADDRESSES:
+        return None
+    return f'{local}@{domain}'
+
+
+def _local_before(page, end, skip_space=False):
+    """Match the local part that ends at `end` by walking back over the bytes it may contain."""
+    if skip_space:
+        while end > 0 and page[end - 1] in b' \t\r\n':
+            end -= 1
+    start = end
+    limit = max(0, end - LOOKBEHIND)
+    while start > limit and page[start - 1] in LOCAL_BYTES:
+        start -= 1
+    return LOCAL_TAIL.search(page, start, end) if start < end else None
+
+
+def _grow(page, anchor):
+    """
+    Turn an anchor match into a raw candidate.
+
+    Returns:
+        tuple: (raw candidate or None, end offset, whether it is a mailto: target)
+    """
+    kind = anchor.lastgroup
+    local = _local_before(page, anchor.start(), skip_space=kind == 'spelled')
+    if not local:
+        return None, anchor.end(), False
+    mailto = page[max(0, local.start() - 7):local.start()].lower() == b'mailto:'
+    if anchor.group() == b'%40' and not mailto:
+        return None, anchor.end(), False
+    domain = (SPELLED_DOMAIN_AFTER if kind == 'spelled' else DOMAIN_AFTER).match(page, anchor.end())
+    if not domain:
+        return None, anchor.end(), False
+    raw = (local.group().strip() + b'@' + domain.group().strip()).decode('utf-8', 'replace')
+    if kind == 'spelled':
+        raw = SPELLED_DOT.sub('.', raw)
+    if mailto:
+        raw = unquote(raw)
+    if '&' in raw:
+        raw = html.unescape(raw)
+    return raw, domain.end(), mailto
+
+
+def scan_candidates(page):
+    """
+    Every plausible email on a page, decoded, in order of first appearance.
+
+    Args:
+        page (bytes | str): Raw page HTML
+
+    Returns:
+        dict: email -> {'email': str, 'count': int, 'first': int, 'mailto': bool}
+    """
+    if isinstance(page, str):
+        page = page.encode('utf-8', 'replace')
+    found = {}
+
+    def add(raw, position, mailto=False):
+        email = _clean(raw) if raw else None
+        if not email:
+            return
+        entry = found.get(email.lower())
+        if entry is None:
+            entry = found[email.lower()] = {'email': email, 'count': 0, 'first': position, 'mailto': False}
+        entry['count'] += 1
+        entry['mailto'] = entry['mailto'] or mailto
+
+    consumed = 0
+    for anchor in ANCHOR_REGEX.finditer(page):
+        if anchor.start() < consumed:
+            # Inside an address already read
+            continue
+        raw, consumed, mailto = _grow(page, anchor)
+        add(raw, anchor.start(), mailto)
+
+    if b'cfemail' in page or b'email-protection' in page:
+        for match in CF_REGEX.finditer(page):
+            add(_decode_cfemail(match.group(1).decode()), match.start())
+
+    entries = sorted(found.values(), key=lambda entry: entry['first'])
+    return {entry['email']: entry for entry in entries}
+
+
+def rank_emails(candidates, website=None):
+    """
+    Order candidates best first: the website's own domain, then role addresses
+    like info@ or contact@, then mailto links, then how often and how early they appear.
+    """
+    site_domain = registrable_domain(website) if website else None
+
+    def score(item):
+        email, entry = item
+        local, domain = email.lower().rsplit('@', 1)
+        same_domain = bool(site_domain) and registrable_domain('http://' + domain) == site_domain
+        return (-same_domain, -(local in ROLE_LOCALS), -entry['mailto'], -entry['count'], entry['first'])
+
+    return [email for email, _ in sorted(candidates.items(), key=score)]
+
+
+def scan_emails(page, website=None):
+    """All plausible emails on a page, best first."""
+    return rank_emails(scan_candidates(page), website)
+
+
+def best_email(page, website=None):
+    """The most likely contact email on a page, or None."""
+    emails = scan_emails(page, website)
+    return emails[0] if emails else None
@@ -0,0 +1,88 @@
+import re
+from collections import namedtuple
+
+from lxml import html as lxml_html
+
+PLACE_ID_REGEX = re.compile(r'!1s(0x[0-9a-fA-F]+:0x[0-9a-fA-F]+)')
+COORDS_REGEX = re.compile(r'!3d(-?\d+(?:\.\d+)?)!4d(-?\d+(?:\.\d+)?)')
+
+Listing = namedtuple('Listing', ['name', 'stars', 'reviews', 'address', 'place_url', 'place_id', 'lat', 'lng'])
+
+
+def format_stars(value):
+    """A rating as the one-decimal text both backends report ("4.0"), or "N/A"; accepts "4,5" and numbers."""
+    try:
+        return f"{float(str(value).replace(',', '.')):.1f}"
+    except (TypeError, ValueError):
+        return "N/A"
+
+
+def has_class(name):
+    """XPath predicate matching elements whose class list contains `name`."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+CARDS_XPATH = f"//div[{has_class('Nv2PK')}]"
+NAME_XPATH = f".//div[{has_class('qBF1Pd')}]"
+# The rating's own span; cards of older layouts used class "c"
+STARS_XPATH = f".//span[{has_class('MW4etd')}] | .//span[{has_class('c')}]"
+REVIEWS_XPATH = f".//span[{has_class('UY7F9')}]"
+ADDRESS_XPATH = f".//div[{has_class('W4Efsd')}]//span"
+
+
+def element_text(element):
+    """Same result as BeautifulSoup's get_text(strip=True)."""
+    return ''.join(part.strip() for part in element.itertext())
+
+
+def first_text(card, xpath):
+    found = card.xpath(xpath)
+    return element_text(found[0]) if found else None
+
+
+def parse_place_url(url):
+    """
+    Pull the place ID and coordinates out of a Maps place URL.
+
+    Returns:
+        tuple: (place_id, lat, lng), with None for anything missing
+    """
+    if not url:
+        return None, None, None
+    match = PLACE_ID_REGEX.search(url)
+    place_id = match.group(1) if match else None
+    coords = COORDS_REGEX.search(url)
+    lat, lng = (float(coords.group(1)), float(coords.group(2))) if coords else (None, None)
+    return place_id, lat, lng
+
+
+def parse_card(card):
+    """Turn one div.Nv2PK element into a Listing."""
+    name = first_text(card, NAME_XPATH) or "N/A"
+    stars = format_stars(first_text(card, STARS_XPATH))
+    reviews = first_text(card, REVIEWS_XPATH)
+    reviews = reviews.strip("()") if reviews is not None else "N/A"
+
+    spans = (element_text(span) for span in card.xpath(ADDRESS_XPATH))
+    address = " / ".join(text for text in spans if text) or "N/A"
+
+    links = card.xpath(".//a[@href]")
+    place_url = links[0].get('href') if links else None
+    place_id, lat, lng = parse_place_url(place_url)
+    return Listing(name, stars, reviews, address, place_url, place_id, lat, lng)
+
+
+def parse_feed_html(feed_html):
+    """
+    Parse every listing card of a results feed in a single pass.
+
+    Args:
+        feed_html (str): outerHTML of the div[role='feed'] container (or a whole page)
+
+    Returns:
+        list: Listing records in feed order
+    """
+    if not feed_html or not feed_html.strip():
+        return []
+    root = lxml_html.fromstring(feed_html)
+    return [parse_card(card) for card in root.xpath(CARDS_XPATH)]
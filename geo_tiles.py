@@ -0,0 +1,240 @@
+import os
+import json
+import math
+import time
+import threading
+import urllib.request
+from urllib.parse import urlencode
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from journal import listing_key
+from metrics import metrics
+
+# Create data directory if it doesn't exist
+DATA_DIR = 'data'
+os.makedirs(DATA_DIR, exist_ok=True)
+
+# Maps stops a single search at about this many results
+RESULT_CAP = 120
+DEFAULT_TILE_KM = 2.0
+DEFAULT_MAX_DEPTH = 5
+DEFAULT_TILE_WORKERS = 3
+
+# Size in pixels of the map the search viewport is fitted to (headless Chrome's default window)
+VIEWPORT = (800, 600)
+MIN_ZOOM = 3
+MAX_ZOOM = 21
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LNG = 111.320
+
+GEOCODER_URL = os.environ.get('GMS_GEOCODER_URL', 'https://nominatim.openstreetmap.org/search')
+GEOCODE_CACHE = os.path.join(DATA_DIR, 'geocode.json')
+USER_AGENT = 'google-maps-scraper/1.0 (tiling geocoder)'
+
+# Serializes geocode cache updates of the locations scraped in parallel threads
+_cache_lock = threading.Lock()
+
+# name is the position in the initial grid ("r2c3") followed by one quadrant digit per split ("r2c3.1.0")
+Tile = namedtuple('Tile', ['south', 'west', 'north', 'east', 'depth', 'name'])
+
+
+def parse_bbox(text):
+    """Parse "south,west,north,east" in degrees into a tuple of floats."""
+    try:
+        south, west, north, east = (float(part) for part in text.split(','))
+    except ValueError:
+        raise ValueError(f"Bounding box must be south,west,north,east in degrees, got {text!r}")
+    if south >= north or west >= east:
+        raise ValueError(f"Bounding box {text!r} is empty: south must be below north and west left of east")
+    return south, west, north, east
+
+
+def geocode(location):
+    """
+    Bounding box of a place name, looked up once and cached in data/geocode.json.
+
+    Returns:
+        tuple: (south, west, north, east) in degrees
+    """
+    cache = read_geocode_cache()
+    if location in cache:
+        return tuple(cache[location])
+
+    query = urlencode({'q': location, 'format': 'jsonv2', 'limit': 1})
+    request = urllib.request.Request(f'{GEOCODER_URL}?{query}', headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=15) as response:
+        results = json.load(response)
+    if not results:
+        raise ValueError(f"Could not geocode {location!r}")
+    south, north, west, east = (float(value) for value in results[0]['boundingbox'])
+
+    # Re-read so lookups finished by other locations meanwhile are kept; a crash mid-write
+    # must not truncate the cache, so it is written to a file of this process and swapped in whole
+    with _cache_lock:
+        cache = read_geocode_cache()
+        cache[location] = [south, west, north, east]
+        temp_file = f'{GEOCODE_CACHE}.{os.getpid()}.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(temp_file, GEOCODE_CACHE)
+    return south, west, north, east
+
+
+def read_geocode_cache():
+    """The saved lookups; a missing or unreadable cache (e.g. cut short by a crash) counts as empty."""
+    try:
+        with open(GEOCODE_CACHE) as f:
+            cache = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError:
+        print(f"⚠️ {GEOCODE_CACHE} is not valid JSON, geocoding again")
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def grid_tiles(bbox, tile_km=DEFAULT_TILE_KM):
+    """Cover a bounding box with a grid of tiles about `tile_km` kilometres on a side."""
+    south, west, north, east = bbox
+    mid_lat = math.radians((south + north) / 2)
+    rows = max(1, math.ceil((north - south) * KM_PER_DEGREE_LAT / tile_km))
+    cols = max(1, math.ceil((east - west) * KM_PER_DEGREE_LNG * math.cos(mid_lat) / tile_km))
+    height = (north - south) / rows
+    width = (east - west) / cols
+    return [Tile(south + row * height, west + col * width, south + (row + 1) * height, west + (col + 1) * width,
+                 0, f'r{row}c{col}')
+            for row in range(rows) for col in range(cols)]
+
+
+def split_tile(tile):
+    """The four quadrants of a tile, one level deeper."""
+    mid_lat = (tile.south + tile.north) / 2
+    mid_lng = (tile.west + tile.east) / 2
+    quadrants = [
+        (tile.south, tile.west, mid_lat, mid_lng),
+        (tile.south, mid_lng, mid_lat, tile.east),
+        (mid_lat, tile.west, tile.north, mid_lng),
+        (mid_lat, mid_lng, tile.north, tile.east),
+    ]
+    return [Tile(*bounds, tile.depth + 1, f'{tile.name}.{i}') for i, bounds in enumerate(quadrants)]
+
+
+def tile_zoom(tile, viewport=VIEWPORT):
+    """Highest Maps zoom level whose viewport still shows the whole tile."""
+    width, height = viewport
+    lng_span = max(tile.east - tile.west, 1e-9)
+    # Web Mercator stretches latitude by 1 / cos(lat)
+    lat_span = max((tile.north - tile.south) / math.cos(math.radians((tile.south + tile.north) / 2)), 1e-9)
+    zoom = math.floor(math.log2(min(width * 360 / (256 * lng_span), height * 360 / (256 * lat_span))))
+    return min(max(zoom, MIN_ZOOM), MAX_ZOOM)
+
+
+def tile_url(base_url, service, tile):
+    """Maps search URL for a service restricted to the viewport of a tile."""
+    lat = (tile.south + tile.north) / 2
+    lng = (tile.west + tile.east) / 2
+    return f"{base_url}/maps/search/{service.replace(' ', '+')}/@{lat:.6f},{lng:.6f},{tile_zoom(tile)}z?hl=en"
+
+
+def in_tile(tile, lat, lng):
+    """Whether a listing's coordinates fall inside a tile. Listings without coordinates are kept."""
+    if lat is None or lng is None:
+        return True
+    return tile.south <= lat <= tile.north and tile.west <= lng <= tile.east
+
+
+def _search(search, tile):
+    start = time.perf_counter()
+    with metrics.timer('tile'):
+        listings, scroll_stats = search(tile)
+    return listings, scroll_stats, time.perf_counter() - start
+
+
+def scrape_tiles(bbox, search, workers=DEFAULT_TILE_WORKERS, tile_km=DEFAULT_TILE_KM,
+                 max_depth=DEFAULT_MAX_DEPTH, cap=RESULT_CAP):
+    """
+    Search every tile of a bounding box and merge the results by place ID.
+
+    Tiles are searched `workers` at a time. A tile whose feed reaches the
+    result cap may have been cut short, so it is split into four quadrants
+    that are searched in turn, down to `max_depth` splits.
+
+    Args:
+        bbox (tuple): (south, west, north, east) in degrees
+        search (callable): search(tile) -> (list of Listing, scroll stats dict) for one tile
+        workers (int): Tiles searched at the same time
+        tile_km (float): Side of the initial grid tiles in kilometres
+        max_depth (int): Maximum number of times a tile is split
+        cap (int): Result count at which a tile is considered truncated
+
+    Returns:
+        tuple: (merged listings in discovery order, coverage: one dict per searched tile)
+    """
+    tiles = grid_tiles(bbox, tile_km)
+    print(f"🗺️ Searching {len(tiles)} tiles of about {tile_km:g} km, {workers} at a time...")
+    merged = {}
+    coverage = []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {executor.submit(_search, search, tile): tile for tile in tiles}
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                tile = running.pop(future)
+                entry = {
+                    'tile': tile.name,
+                    'depth': tile.depth,
+                    'bounds': [round(value, 6) for value in tile[:4]],
+                    'zoom': tile_zoom(tile),
+                }
+                coverage.append(entry)
+                metrics.incr('tiles')
+                try:
+                    listings, scroll_stats, seconds = future.result()
+                except Exception as e:
+                    metrics.incr('tile_failures')
+                    entry['error'] = str(e)
+                    print(f"⚠️ Tile {tile.name} failed: {e}")
+                    continue
+
+                inside = [listing for listing in listings if in_tile(tile, listing.lat, listing.lng)]
+                new = 0
+                for listing in inside:
+                    key = listing_key(listing)
+                    if key not in merged:
+                        merged[key] = listing
+                        new += 1
+                metrics.incr('tile_duplicates', len(inside) - new)
+
+                capped = len(listings) >= cap
+                split = capped and tile.depth < max_depth
+                entry.update(cards=len(listings), in_bounds=len(inside), new=new, capped=capped, split=split,
+                             stopped_by=scroll_stats['stopped_by'], seconds=round(seconds, 2))
+                if split:
+                    metrics.incr('tile_splits')
+                    for child in split_tile(tile):
+                        running[executor.submit(_search, search, child)] = child
+                elif capped:
+                    metrics.incr('tiles_capped')
+                    print(f"⚠️ Tile {tile.name} still hits the {cap}-result cap at the maximum depth; "
+                          "some of its places may be missing")
+                print(f"🗺️ Tile {tile.name}: {len(listings)} cards, {new} new, {len(merged)} total"
+                      f"{', splitting' if split else ''} | running: {len(running)}")
+
+    return list(merged.values()), coverage
+
+
+def coverage_summary(coverage):
+    """Per-depth tile counts and the densest tiles, for printing after a tiled run."""
+    by_depth = {}
+    for entry in coverage:
+        by_depth[entry['depth']] = by_depth.get(entry['depth'], 0) + 1
+    lines = [f"Depth {depth}: {count} tiles" for depth, count in sorted(by_depth.items())]
+    split = [entry['tile'] for entry in coverage if entry.get('split')]
+    if split:
+        lines.append(f"Split for density: {', '.join(split[:10])}{' ...' if len(split) > 10 else ''}")
+    failed = [entry['tile'] for entry in coverage if 'error' in entry]
+    if failed:
+        lines.append(f"Failed: {', '.join(failed)}")
+    return '\n'.join(lines)
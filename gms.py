@@ -1,134 +1,600 @@
 import subprocess
-import pandas as pd
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from selenium.webdriver.chrome.options import Options
 import time
 import json
 import os
+import argparse
+from functools import partial
+
+from feed_parser import parse_feed_html
+from maps_payload import enable_capture, read_payloads, parse_payloads, BACKENDS
+from journal import Journal, listing_key
+from place_index import PlaceIndex, DEFAULT_INDEX_TTL_DAYS
+from pipeline import EmailStream, DEFAULT_EMAIL_WORKERS, DEFAULT_QUEUE_SIZE
+from email_cache import EmailCache
+from output_store import open_store, partition_name, STORE_KINDS, DEFAULT_STORE_KIND
+from driver_pool import DriverPool
+from rate_limit import throttle
+from detail_fetcher import fetch_details, read_details, DEFAULT_DETAIL_CONCURRENCY
+from metrics import metrics, profiled, PROFILE_MODES
+from refresh import (load_snapshot, diff_listings, diff_counts, full_run_seconds, needs_email,
+                     CHANGE_COLUMN, CHANGED, UNCHANGED, REMOVED)
+from geo_tiles import (scrape_tiles, tile_url, geocode, parse_bbox, coverage_summary, DEFAULT_TILE_WORKERS,
+                       DEFAULT_TILE_KM, DEFAULT_MAX_DEPTH)
+import resource_policy
+from resource_policy import configure_options, apply_policy, record_network, POLICIES
+from service import run_remote, add_service_arguments, ServiceError, FAILED
 
 # Create data directory if it doesn't exist
 DATA_DIR = 'data'
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def scrape_location(location, service="restaurants"):
+# Point the scraper at a local fixture server instead of Google, e.g. http://127.0.0.1:8000
+MAPS_BASE_URL = os.environ.get('GMS_MAPS_BASE_URL', 'https://www.google.com').rstrip('/')
+
+CARD_SELECTOR = "div.Nv2PK"
+
+# Clicks the card link with the given href in a single round trip
+CLICK_CARD_JS = """
+for (const link of document.querySelectorAll('div.Nv2PK a')) {
+    if (link.getAttribute('href') === arguments[0]) { link.click(); return true; }
+}
+return false;
+"""
+SCROLL_IDLE_TIMEOUT = 8
+SCROLL_MAX_STALLS = 2
+
+# Scrolls the feed once and resolves as soon as more cards are rendered, the
+# "end of list" marker shows up, or the timeout passes.
+WAIT_FOR_MORE_CARDS_JS = """
+const [feed, previous, timeoutMs, done] = arguments;
+const count = () => feed.querySelectorAll('div.Nv2PK').length;
+const atEnd = () => !!feed.querySelector('span.HlvSq') ||
+    feed.innerText.includes("You've reached the end of the list");
+let finished = false;
+let observer = null;
+let timer = null;
+const finish = () => {
+    if (finished) return;
+    finished = true;
+    if (observer) observer.disconnect();
+    clearTimeout(timer);
+    done([count(), atEnd()]);
+};
+if (count() > previous || atEnd()) { finish(); return; }
+observer = new MutationObserver(() => { if (count() > previous || atEnd()) finish(); });
+observer.observe(feed, {childList: true, subtree: true});
+timer = setTimeout(finish, timeoutMs);
+feed.scrollTop = feed.scrollHeight;
+"""
+
+
+def scroll_results_feed(driver, feed, max_results=None, max_time=None, idle_timeout=SCROLL_IDLE_TIMEOUT):
     """
-    Scrape Google Maps data for a specific location and service type.
-    
+    Scroll the results feed until every card is loaded or a budget runs out.
+
+    Each step scrolls once and waits in the page for the card count to grow,
+    so fast responses are picked up immediately and slow ones get up to
+    `idle_timeout` seconds (retried SCROLL_MAX_STALLS times) before giving up.
+
     Args:
-        location (str): The location to search for
-        service (str): The type of service to search for (default: restaurants)
-    
+        driver (WebDriver): Browser showing a Maps search
+        feed (WebElement): The div[role='feed'] results container
+        max_results (int): Stop once this many cards are loaded
+        max_time (float): Stop after this many seconds of scrolling
+        idle_timeout (float): Seconds to wait for new cards after each scroll
+
     Returns:
-        str: Path to the generated Excel file
+        dict: cards loaded, seconds spent, scroll steps and the reason scrolling stopped
     """
-    print(f"\nScraping {service} in {location}...")
-    
-    URL = f"https://www.google.com/maps/search/{service.replace(' ', '+')}+{location.replace(' ', '+')}/?hl=en"
+    from selenium.webdriver.common.by import By
+    start = time.perf_counter()
+    driver.set_script_timeout(idle_timeout + 5)
+    cards = len(driver.find_elements(By.CSS_SELECTOR, CARD_SELECTOR))
+    steps = 0
+    stalls = 0
+    while True:
+        elapsed = time.perf_counter() - start
+        if max_results and cards >= max_results:
+            reason = 'max_results'
+            break
+        if max_time and elapsed >= max_time:
+            reason = 'max_time'
+            break
+
+        wait = idle_timeout if not max_time else max(min(idle_timeout, max_time - elapsed), 0.1)
+        new_cards, at_end = driver.execute_async_script(WAIT_FOR_MORE_CARDS_JS, feed, cards, int(wait * 1000))
+        steps += 1
+        if at_end:
+            cards = new_cards
+            reason = 'end_of_list'
+            break
+        if new_cards > cards:
+            cards = new_cards
+            stalls = 0
+        else:
+            stalls += 1
+            if stalls > SCROLL_MAX_STALLS:
+                reason = 'stalled'
+                break
 
+    return {
+        'cards': cards,
+        'seconds': round(time.perf_counter() - start, 2),
+        'steps': steps,
+        'stopped_by': reason,
+    }
+
+def get_maps_driver(stage='maps', capture=False):
+    """
+    Start a Maps browser with the process's resource policy for `stage` ('maps' or 'place').
+
+    `capture` keeps response bodies readable for the network backend.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
     options = Options()
     options.add_argument("--lang=en")  # force English UI
     options.add_argument('--headless=new')
-    driver = webdriver.Chrome(options=options)
-    driver.get(URL)
-
-    # Wait for the sidebar to load
-    print("Waiting for the sidebar to load...")
-    sidebar = WebDriverWait(driver, 15).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "div[role='feed']"))
-    )
-
-    # Scroll through the results
-    print("Scrolling the sidebar to load all of the results...")
-    prev_height = driver.execute_script("return arguments[0].scrollHeight", sidebar)
-    while True:
-        driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", sidebar)
-        time.sleep(2)
-        new_height = driver.execute_script("return arguments[0].scrollHeight", sidebar)
-        if new_height == prev_height:
-            break
-        prev_height = new_height
-    print("Finished scrolling.")
-
-    # Collect data
-    data = []
-    boxes = driver.find_elements(By.CSS_SELECTOR, "div.Nv2PK")
-    count = len(boxes)
-    print(f"Found {count} results, extracting details...")
-
-    for idx in range(count):
-        boxes = driver.find_elements(By.CSS_SELECTOR, "div.Nv2PK")
-        box = boxes[idx]
-
-        # Parse static info with BeautifulSoup
-        html = box.get_attribute("outerHTML")
-        mini = BeautifulSoup(html, "html.parser")
-        name = mini.find('div', class_='qBF1Pd').get_text(strip=True) if mini.find('div', 'qBF1Pd') else "N/A"
-        stars = mini.find('span', class_='c').get_text(strip=True) if mini.find('span', 'c') else "N/A"
-        reviews = mini.find('span', class_='UY7F9').get_text(strip=True).strip("()") if mini.find('span', 'UY7F9') else "N/A"
-        addr = " / ".join(span.get_text(strip=True) for span in mini.select("div.W4Efsd span") if span.get_text(strip=True)) or "N/A"
-
-        # Click the listing to open detail pane
-        link = box.find_element(By.TAG_NAME, "a")
-        driver.execute_script("arguments[0].click();", link)
-
-        # Wait for the detail pane to show the correct name
+    configure_options(options, capture)
+    with metrics.timer('driver_startup'):
+        driver = webdriver.Chrome(options=options)
+    apply_policy(driver, stage)
+    if capture:
+        enable_capture(driver)
+    return driver
+
+
+def click_details(driver, listing, idx):
+    """
+    Open a listing's detail pane from the results feed, read it and go back.
+
+    Args:
+        driver (WebDriver): Browser showing the results feed
+        listing (Listing): Parsed card to open
+        idx (int): Position of the card in the feed, used when it has no place URL
+
+    Returns:
+        tuple: (detail fields as returned by read_details, whether the pane showed this listing; after a
+            timeout the fields may belong to the place opened before)
+    """
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    name = listing.name
+
+    # Click the listing to open detail pane
+    throttle()
+    clicked = listing.place_url and driver.execute_script(CLICK_CARD_JS, listing.place_url)
+    if not clicked:
+        box = driver.find_elements(By.CSS_SELECTOR, CARD_SELECTOR)[idx]
+        driver.execute_script("arguments[0].click();", box.find_element(By.TAG_NAME, "a"))
+
+    # Wait for the detail pane to show the correct name
+    with metrics.timer('detail_wait'):
+        loaded = True
         try:
             WebDriverWait(driver, 10).until(
                 EC.text_to_be_present_in_element((By.CLASS_NAME, "DUwDvf"), name)
             )
         except TimeoutException:
+            loaded = False
+            metrics.incr('detail_timeouts')
             print(f"⚠️ Timeout waiting for detail pane for {name}")
 
         time.sleep(1.5)  # let rest of details load
+        details = read_details(driver)
+    record_network(driver)
 
-        # Extract Website
-        try:
-            website_el = driver.find_element(By.CSS_SELECTOR, "[aria-label^='Website']")
-            website = website_el.get_attribute("aria-label").split("Website:")[-1].strip()
-        except:
-            website = "N/A"
-
-        # Extract Phone
-        try:
-            phone_el = driver.find_element(By.CSS_SELECTOR, "[aria-label^='Phone']")
-            phone = phone_el.get_attribute("aria-label").split("Phone:")[-1].strip()
-        except:
-            phone = "N/A"
-
-        # Go back to list view
+    # Go back to list view
+    with metrics.timer('back_navigation'):
         try:
             back_btn = driver.find_element(By.CSS_SELECTOR, "button[jsaction='pane.homeBack']")
             back_btn.click()
         except:
             webdriver.ActionChains(driver).send_keys(Keys.ESCAPE).perform()
 
-        data.append({
-            'Business Name': name,
-            'Address': addr,
-            'Stars': stars,
-            'Number of Reviews': reviews,
-            'Phone Number': phone,
-            'Website': website,
-            'Email': '',
-        })
-
         time.sleep(1)
+    return details, loaded
+
+
+def listing_row(listing, details, source='fresh'):
+    """
+    Combine a parsed card and its detail fields into one output row.
+
+    `source` is 'fresh' when the details were scraped in this run and
+    'reused' when they came from the place index.
+    """
+    return {
+        'Business Name': listing.name,
+        'Address': listing.address,
+        'Stars': listing.stars,
+        'Number of Reviews': listing.reviews,
+        'Phone Number': details.get('phone') or 'N/A',
+        'Website': details.get('website') or 'N/A',
+        'Email': '',
+        'Place ID': listing.place_id or 'N/A',
+        'Category': details.get('category') or 'N/A',
+        'Full Address': details.get('address') or 'N/A',
+        'Plus Code': details.get('plus_code') or 'N/A',
+        'Source': source,
+    }
+
+
+def open_feed(driver, url, max_results=None, max_scroll_time=None, backend='dom'):
+    """
+    Load a Maps search URL and scroll its results feed.
+
+    With the network backend the driver must come from get_maps_driver(capture=True).
+
+    Returns:
+        tuple: (feed element, scroll stats as returned by scroll_results_feed,
+            (listings, details by place ID) parsed from the search responses, or None for the dom backend)
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    with metrics.timer('feed_load'):
+        throttle()
+        driver.get(url)
+        sidebar = WebDriverWait(driver, 15).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "div[role='feed']"))
+        )
+
+    with metrics.timer('scroll'):
+        scroll_stats = scroll_results_feed(driver, sidebar, max_results, max_scroll_time)
+    metrics.incr('scroll_steps', scroll_stats['steps'])
+    if backend == 'dom':
+        record_network(driver)
+        return sidebar, scroll_stats, None
+
+    # One read of the log serves both the payloads and the network counters
+    entries = driver.get_log('performance')
+    with metrics.timer('payload_parse'):
+        captured = parse_payloads(read_payloads(driver, entries), MAPS_BASE_URL)
+    record_network(driver, entries)
+    return sidebar, scroll_stats, captured
+
+
+def feed_listings(sidebar, scroll_stats, captured):
+    """
+    The listings of a scrolled feed, and their details by place ID when the network backend captured them.
+
+    Captured listings are completed from the feed HTML when the feed shows more
+    cards than the search responses carried, e.g. the first results, which are
+    embedded in the page rather than fetched.
+
+    Returns:
+        tuple: (list of Listing in feed order, dict of place ID -> details)
+    """
+    if captured is None:
+        # Parse every card in one pass from a single copy of the feed HTML
+        return parse_feed_html(sidebar.get_attribute("outerHTML")), {}
+    listings, details = captured
+    if len(listings) >= scroll_stats['cards']:
+        return listings, details
 
-    # Save to Excel
-    excel_file = os.path.join(DATA_DIR, f'{location.replace(" ", "_")}_{service}.xlsx')
-    pd.DataFrame(data).to_excel(excel_file, index=False)
-    print(f"✅ Data has been saved to {excel_file}")
+    # Listings without a place ID cannot be matched to a card and are kept as they are
+    by_place = {listing.place_id: listing for listing in listings if listing.place_id}
+    cards = parse_feed_html(sidebar.get_attribute("outerHTML"))
+    merged = [by_place.pop(card.place_id, card) if card.place_id else card for card in cards]
+    merged.extend(by_place.values())
+    merged.extend(listing for listing in listings if not listing.place_id)
+    metrics.incr('payload_missed_cards', len(merged) - len(listings))
+    return merged, details
 
-    # Call email extraction script
+
+def load_feed(location, service, max_results=None, max_scroll_time=None, backend='dom'):
+    """
+    Open the Maps search for a location and scroll its results feed.
+
+    Returns:
+        tuple: (driver, feed element, listings and details by place ID as returned by feed_listings)
+    """
+    URL = f"{MAPS_BASE_URL}/maps/search/{service.replace(' ', '+')}+{location.replace(' ', '+')}/?hl=en"
+
+    driver = get_maps_driver(capture=backend == 'network')
+    print("Loading the results feed and scrolling it to load all of the results...")
+    sidebar, scroll_stats, captured = open_feed(driver, URL, max_results, max_scroll_time, backend)
+    print(f"Finished scrolling: {scroll_stats['cards']} cards in {scroll_stats['seconds']}s "
+          f"({scroll_stats['steps']} steps, stopped by {scroll_stats['stopped_by']}).")
+    if captured is not None:
+        print(f"📦 Captured {len(captured[0])} listings from the search responses")
+    listings, details = feed_listings(sidebar, scroll_stats, captured)
+    return driver, sidebar, listings, details
+
+
+def search_tiles(service, bbox, workers=DEFAULT_TILE_WORKERS, tile_km=DEFAULT_TILE_KM,
+                 max_depth=DEFAULT_MAX_DEPTH, max_scroll_time=None, backend='dom'):
+    """
+    Search a bounding box tile by tile, splitting tiles that hit the result cap.
+
+    Returns:
+        tuple: (listings merged by place ID, per-tile coverage) as returned by scrape_tiles,
+            and the details captured by the network backend by place ID
+    """
+    pool = DriverPool(partial(get_maps_driver, capture=backend == 'network'), size=workers, reset=False)
+    details = {}
+
+    def search(tile):
+        with pool.session() as driver:
+            driver.note_page()
+            sidebar, scroll_stats, captured = open_feed(driver, tile_url(MAPS_BASE_URL, service, tile),
+                                                        max_scroll_time=max_scroll_time, backend=backend)
+            listings, tile_details = feed_listings(sidebar, scroll_stats, captured)
+            details.update(tile_details)
+            return listings, scroll_stats
+
+    try:
+        listings, coverage = scrape_tiles(bbox, search, workers, tile_km, max_depth)
+        return listings, coverage, details
+    finally:
+        pool.close()
+
+
+def scrape_location(location, service="restaurants", max_results=None, max_scroll_time=None,
+                    detail_mode='direct', detail_concurrency=DEFAULT_DETAIL_CONCURRENCY, resume=False,
+                    email_mode='stream', email_workers=DEFAULT_EMAIL_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                    store_kind=DEFAULT_STORE_KIND, store_path=None, export_excel=False, use_index=True,
+                    profile=None, tiled=False, bbox=None, tile_workers=DEFAULT_TILE_WORKERS,
+                    tile_km=DEFAULT_TILE_KM, max_tile_depth=DEFAULT_MAX_DEPTH, refresh=False, backend='dom',
+                    detail_pool=None, email_pool=None, index_ttl=DEFAULT_INDEX_TTL_DAYS):
+    """
+    Scrape Google Maps data for a specific location and service type.
+
+    Every finished listing is appended to a journal in data/journal/ right
+    away, and the output store partition is built from the journal at the end.
+    
+    Args:
+        location (str): The location to search for
+        service (str): The type of service to search for (default: restaurants)
+        max_results (int): Stop loading results after this many listings (default: all)
+        max_scroll_time (float): Stop scrolling the results after this many seconds (default: no limit)
+        detail_mode (str): 'direct' opens place URLs in parallel sessions, 'click' uses the detail pane
+        detail_concurrency (int): Number of place pages loading at once in direct mode
+        resume (bool): Reuse the feed and listings journaled by a previous, interrupted run
+        email_mode (str): 'stream' extracts emails in-process while scraping and writes one
+            _updated.xlsx, 'subprocess' runs new_email_ext.py afterwards, 'none' skips emails
+        email_workers (int): Websites processed at the same time in stream mode
+        queue_size (int): Websites waiting for extraction before scraping is held back in stream mode
+        store_kind (str): Output store backend: 'csv', 'parquet' or 'sqlite'
+        store_path (str): Output store location (default: depends on the backend)
+        export_excel (bool): Also write the results to an Excel file
+        use_index (bool): Reuse details of places already scraped for any location from the place index
+        profile (str): Profile the detail stage with 'cprofile' or 'sample' and print the hottest functions
+        tiled (bool): Search the area tile by tile instead of with one query, to get past the
+            ~120-result cap of a single search. The area is `bbox`, or `location` geocoded once
+        bbox (tuple): (south, west, north, east) to tile; implies tiled
+        tile_workers (int): Tiles searched at the same time in tiled mode
+        tile_km (float): Side of the initial tiles in kilometres
+        max_tile_depth (int): How many times a tile that hits the cap may be split into quadrants
+        refresh (bool): Compare the feed with the rows this location/service last saved to the store and
+            only fetch details and emails of new or changed listings; unchanged rows are carried forward
+            and vanished ones kept with Change set to 'removed'. The subprocess email step still
+            processes every row, relying on the email cache
+        backend (str): 'dom' parses the feed cards, 'network' parses the search responses Maps fetches
+            while scrolling; those carry phone, website and category too, so their listings skip the
+            detail stage. Cards the responses missed are parsed from the feed and get detail pages
+        detail_pool (DriverPool): Warm Chrome sessions for the place pages, kept open afterwards
+            (default: a pool of detail_concurrency sessions for this run)
+        email_pool (DriverPool): Warm Chrome sessions for the stream mode's browser fallback
+        index_ttl (float): Scrape places again when their place index entry is older than this many days
+            (0 to reuse entries of any age)
+    
+    Returns:
+        str: Path to the Excel file if one was written, else the location of the store partition
+    """
+    import pandas as pd
+    print(f"\nScraping {service} in {location}...")
+    metrics.start_run()
+    start = time.perf_counter()
+    partition = partition_name(location, service)
+    report_file = os.path.join(DATA_DIR, f'{partition}_metrics.json')
+
+    journal = Journal(location, service)
+    if not resume:
+        journal.reset()
+    listings, done = journal.load()
+
+    tiled = tiled or bbox is not None
+    if tiled and detail_mode == 'click':
+        print("⚠️ Tiled searches have no single feed to click through, opening place pages directly")
+        detail_mode = 'direct'
+
+    driver = sidebar = None
+    coverage = None
+    captured = {}
+    if listings is not None:
+        print(f"Resuming from {journal.path}: {len(done)} of {len(listings)} listings already scraped")
+    elif tiled:
+        if bbox is None:
+            bbox = geocode(location)
+        listings, coverage, captured = search_tiles(service, bbox, tile_workers, tile_km, max_tile_depth,
+                                                    max_scroll_time, backend)
+        print(coverage_summary(coverage))
+        if max_results:
+            listings = listings[:max_results]
+        journal.save_feed(listings)
+    else:
+        driver, sidebar, listings, captured = load_feed(location, service, max_results, max_scroll_time, backend)
+        if max_results:
+            listings = listings[:max_results]
+        journal.save_feed(listings)
+
+    pending = [idx for idx, listing in enumerate(listings) if listing_key(listing) not in done]
+    print(f"Found {len(listings)} results, extracting details for {len(pending)}...")
+
+    diff = None
+    if refresh:
+        diff = diff_listings(listings, load_snapshot(open_store(store_kind, store_path), partition))
+        counts = diff_counts(diff)
+        print(f"🔄 Since the last run: {counts['added']} added, {counts['changed']} changed, "
+              f"{counts['removed']} removed, {counts['unchanged']} unchanged")
+
+    stream = None
+    if email_mode == 'stream':
+        stream = EmailStream(workers=email_workers, queue_size=queue_size, cache=EmailCache(), pool=email_pool)
+        for key, row in done.items():
+            change = row.get(CHANGE_COLUMN)
+            if change not in (UNCHANGED, REMOVED) or (change == UNCHANGED and needs_email(row)):
+                stream.submit(key, row.get('Website'))
+
+    index = PlaceIndex(ttl_days=index_ttl) if use_index else None
+
+    def finish(idx, details, source='fresh', confirmed=True):
+        listing = listings[idx]
+        key = listing_key(listing)
+        row = listing_row(listing, details, source)
+        if diff is not None:
+            row[CHANGE_COLUMN] = diff.changes[idx]
+        journal.append(key, row)
+        # Details from a pane that never showed this listing must not be reused for other locations
+        if index is not None and source == 'fresh' and confirmed:
+            index.put(listing.place_id, details, location, service)
+        if stream is not None:
+            stream.submit(key, row['Website'])
+
+    # Unchanged listings keep last run's row, email included, and only retry a missing or failed email;
+    # vanished ones are kept and marked
+    if diff is not None:
+        for idx in pending:
+            if idx in diff.carried:
+                key = listing_key(listings[idx])
+                row = dict(diff.carried[idx], **{CHANGE_COLUMN: UNCHANGED})
+                journal.append(key, row)
+                if stream is not None and needs_email(row):
+                    stream.submit(key, row.get('Website'))
+        for row in diff.removed:
+            key = f"{REMOVED}|{row.get('Place ID')}|{row.get('Business Name')}|{row.get('Address')}"
+            if key not in done:
+                journal.append(key, dict(row, **{CHANGE_COLUMN: REMOVED}))
+        pending = [idx for idx in pending if idx not in diff.carried]
+        metrics.incr('refresh_carried', len(diff.carried))
+
+    # Listings whose details came with the search responses skip the detail stage
+    if captured:
+        fresh = []
+        for idx in pending:
+            details = captured.get(listings[idx].place_id)
+            if details is None:
+                fresh.append(idx)
+            else:
+                finish(idx, details)
+        print(f"📦 {len(pending) - len(fresh)} listings came with their details in the search responses")
+        metrics.incr('payload_details', len(pending) - len(fresh))
+        pending = fresh
+
+    # Places already scraped for this or another location skip the detail stage
+    if index is not None:
+        fresh = []
+        for idx in pending:
+            # A changed card means the place page may have changed too
+            details = None if diff is not None and diff.changes[idx] == CHANGED else index.get(listings[idx].place_id)
+            if details is None:
+                fresh.append(idx)
+            else:
+                finish(idx, details, 'reused')
+        print(f"♻️ Reused {len(pending) - len(fresh)} listings from the place index")
+        pending = fresh
+
+    remaining = pending
+    profile_file = os.path.join(DATA_DIR, f'{partition}_profile.' + ('prof' if profile == 'cprofile' else 'txt'))
+    with profiled(profile, profile_file):
+        if detail_mode == 'direct':
+            direct = [idx for idx in pending if listings[idx].place_url]
+            print(f"Opening {len(direct)} place pages, {detail_concurrency} at a time...")
+            # Keep cookies between place pages so the consent screen is only answered once per session
+            pool = detail_pool or DriverPool(partial(get_maps_driver, 'place'), size=detail_concurrency, reset=False)
+            try:
+                fetched = fetch_details([listings[idx].place_url for idx in direct], pool, detail_concurrency,
+                                        MAPS_BASE_URL, on_result=lambda i, details: finish(direct[i], details))
+            finally:
+                if pool is not detail_pool:
+                    pool.close()
+            failed = {idx for idx, details in zip(direct, fetched) if details is None}
+            remaining = [idx for idx in pending if idx in failed or not listings[idx].place_url]
+            metrics.incr('detail_retries', len(failed))
+
+        if tiled:
+            # No feed to fall back on: keep the card data of listings without a place page and
+            # leave failed pages out of the journal so --resume tries them again
+            for idx in remaining:
+                if not listings[idx].place_url:
+                    finish(idx, {})
+            failed = sum(1 for idx in remaining if listings[idx].place_url)
+            if failed:
+                print(f"⚠️ {failed} place pages failed to load; run again with --resume to retry them")
+            remaining = []
+
+        # Listings without a place URL, or whose page failed, go through the detail pane
+        if remaining and driver is None:
+            driver, sidebar, _, _ = load_feed(location, service, max_results, max_scroll_time)
+        for idx in remaining:
+            details, loaded = click_details(driver, listings[idx], idx)
+            finish(idx, details, confirmed=loaded)
+
+    # Close browser
+    if driver is not None:
+        driver.quit()
+        driver = None
+
+    items = journal.items(listings)
+    data = [row for _, row in items]
+    excel_file = os.path.join(DATA_DIR, f'{partition}.xlsx')
+
+    if stream is not None:
+        print("📨 Waiting for email extraction to finish...")
+        emails = stream.close()
+        for key, row in items:
+            row['Email'] = emails.get(key) or row.get('Email') or ''
+        print(f"📨 Email queue peaked at {stream.max_depth}, scraping waited on it {stream.blocked_puts} times")
+        excel_file = excel_file.replace(".xlsx", "_updated.xlsx")
+
+    store = open_store(store_kind, store_path)
+    with metrics.timer('store_write'):
+        store.write_partition(partition, data)
+    print(f"✅ Data has been saved to {store.location(partition)}")
+
+    refresh_summary = None
+    if diff is not None:
+        seconds = time.perf_counter() - start
+        full = full_run_seconds(report_file, len(listings))
+        refresh_summary = dict(diff_counts(diff), seconds=round(seconds, 1),
+                               full_run_seconds=round(full, 1) if full else None,
+                               saved_seconds=round(full - seconds, 1) if full else None)
+        if full:
+            print(f"⏱️ Refresh took {seconds:.0f}s, about {full - seconds:.0f}s less than a full run ({full:.0f}s)")
+
+    if not (export_excel or email_mode == 'subprocess'):
+        # The subprocess email step reads its input from Excel
+        metrics.write_report(report_file, location=location, service=service, listings=len(listings),
+                             tiles=coverage, refresh=refresh_summary)
+        print(f"📈 Run report saved to {report_file}")
+        return store.location(partition)
+
+    with metrics.timer('excel_write'):
+        pd.DataFrame(data).to_excel(excel_file, index=False)
+    print(f"✅ Excel export saved to {excel_file}")
+    metrics.write_report(report_file, location=location, service=service, listings=len(listings),
+                         tiles=coverage, refresh=refresh_summary)
+    print(f"📈 Run report saved to {report_file}")
+
+    if email_mode == 'subprocess':
+        run_email_extraction(excel_file, store_kind, store_path)
+
+    return excel_file
+
+
+def run_email_extraction(excel_file, store_kind=DEFAULT_STORE_KIND, store_path=None):
+    """Run new_email_ext.py on a finished Excel file in a separate process."""
     print("📨 Calling the email extraction script...")
+    command = ['python', 'new_email_ext.py', '--excel', excel_file, '--store', store_kind]
+    if store_path:
+        command += ['--store-path', store_path]
     try:
-        result = subprocess.run(['python', 'new_email_ext.py', '--excel', excel_file], check=True, capture_output=True, text=True)
+        result = subprocess.run(command, check=True, capture_output=True, text=True)
         print(result.stdout)
         if result.stderr:
             print("⚠️ Email extraction warnings:", result.stderr)
@@ -140,11 +606,83 @@ def scrape_location(location, service="restaurants"):
     else:
         print("✅ Email extraction script completed successfully.")
 
-    # Close browser
-    driver.quit()
-    
-    return excel_file
-
 if __name__ == "__main__":
-    # For backward compatibility when running directly
-    scrape_location("patong beach")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Scrape Google Maps data for a location')
+    parser.add_argument('--location', default='patong beach', help='Location to search (default: patong beach)')
+    parser.add_argument('--service', default='restaurants', help='Type of service to search for (default: restaurants)')
+    parser.add_argument('--max-results', type=int, help='Stop after this many listings')
+    parser.add_argument('--max-scroll-time', type=float, help='Stop scrolling the results after this many seconds')
+    parser.add_argument('--detail-mode', choices=['direct', 'click'], default='direct',
+                        help='direct: open place pages in parallel sessions, click: use the detail pane (default: direct)')
+    parser.add_argument('--detail-concurrency', type=int, default=DEFAULT_DETAIL_CONCURRENCY,
+                        help=f'Place pages loaded at once in direct mode (default: {DEFAULT_DETAIL_CONCURRENCY})')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted run, skipping listings already in its journal')
+    parser.add_argument('--email-mode', choices=['stream', 'subprocess', 'none'], default='stream',
+                        help='stream: extract emails while scraping, subprocess: run new_email_ext.py afterwards, '
+                             'none: skip emails (default: stream)')
+    parser.add_argument('--email-workers', type=int, default=DEFAULT_EMAIL_WORKERS,
+                        help=f'Websites processed at once in stream mode (default: {DEFAULT_EMAIL_WORKERS})')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f'Websites queued before scraping waits for email extraction (default: {DEFAULT_QUEUE_SIZE})')
+    parser.add_argument('--store', choices=STORE_KINDS, default=DEFAULT_STORE_KIND,
+                        help=f'Output store backend (default: {DEFAULT_STORE_KIND})')
+    parser.add_argument('--store-path', help='Output store location (default: depends on the backend)')
+    parser.add_argument('--excel', action='store_true', help='Also export the results to an Excel file')
+    parser.add_argument('--no-index', action='store_true',
+                        help='Scrape every listing even if its place was already scraped for another location')
+    parser.add_argument('--index-ttl', type=float, default=DEFAULT_INDEX_TTL_DAYS,
+                        help=f'Days a place index entry is reused before the place is scraped again, 0 for no limit '
+                             f'(default: {DEFAULT_INDEX_TTL_DAYS})')
+    parser.add_argument('--profile', nargs='?', const='sample', choices=PROFILE_MODES,
+                        help='Profile the detail stage: sample (all threads, default) or cprofile')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Serve live timers and counters in Prometheus format on this port')
+    parser.add_argument('--resource-policy', choices=list(POLICIES), default=resource_policy.policy,
+                        help='Resources Chrome skips: off, lean (images, media, fonts, trackers) or strict '
+                             f'(also stylesheets where the page works without them) (default: {resource_policy.policy})')
+    parser.add_argument('--tiles', action='store_true',
+                        help='Geocode the location and search it tile by tile to get past the ~120-result cap')
+    parser.add_argument('--bbox', type=parse_bbox,
+                        help='Tile this area instead of the geocoded location: south,west,north,east in degrees')
+    parser.add_argument('--tile-workers', type=int, default=DEFAULT_TILE_WORKERS,
+                        help=f'Tiles searched in parallel (default: {DEFAULT_TILE_WORKERS})')
+    parser.add_argument('--tile-km', type=float, default=DEFAULT_TILE_KM,
+                        help=f'Side of the initial tiles in kilometres (default: {DEFAULT_TILE_KM})')
+    parser.add_argument('--max-tile-depth', type=int, default=DEFAULT_MAX_DEPTH,
+                        help=f'Times a tile hitting the result cap may be split (default: {DEFAULT_MAX_DEPTH})')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Only fetch details and emails of listings that are new or changed since the last run')
+    parser.add_argument('--backend', choices=BACKENDS, default='dom',
+                        help='Read listings from the feed HTML (dom) or from the search responses Maps fetches, '
+                             'which include phone and website and skip most detail pages (network) (default: dom)')
+    add_service_arguments(parser)
+    args = parser.parse_args()
+
+    if args.remote:
+        # The service runs the scrape with its warm Chrome sessions; its own options apply to the rest
+        try:
+            job = run_remote(args.remote, 'scrape', {
+                'location': args.location, 'service': args.service, 'max_results': args.max_results,
+                'max_scroll_time': args.max_scroll_time, 'detail_mode': args.detail_mode,
+                'detail_concurrency': args.detail_concurrency, 'resume': args.resume, 'email_mode': args.email_mode,
+                'email_workers': args.email_workers, 'queue_size': args.queue_size, 'store_kind': args.store,
+                'store_path': args.store_path, 'export_excel': args.excel, 'use_index': not args.no_index,
+                'tiled': args.tiles, 'bbox': args.bbox, 'tile_workers': args.tile_workers, 'tile_km': args.tile_km,
+                'max_tile_depth': args.max_tile_depth, 'refresh': args.refresh, 'backend': args.backend,
+                'index_ttl': args.index_ttl})
+        except ServiceError as e:
+            print(f"❌ {e}")
+            exit(1)
+        exit(1 if job['state'] == FAILED else 0)
+
+    resource_policy.set_policy(args.resource_policy)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    scrape_location(args.location, args.service, args.max_results, args.max_scroll_time,
+                    args.detail_mode, args.detail_concurrency, args.resume,
+                    args.email_mode, args.email_workers, args.queue_size,
+                    args.store, args.store_path, args.excel, not args.no_index, args.profile,
+                    args.tiles, args.bbox, args.tile_workers, args.tile_km, args.max_tile_depth, args.refresh,
+                    args.backend, index_ttl=args.index_ttl)
\ No newline at end of file
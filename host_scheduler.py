@@ -0,0 +1,225 @@
+import time
+import socket
+import asyncio
+import threading
+from urllib.parse import urlparse
+from contextlib import contextmanager, asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import contact_crawler
+from metrics import metrics
+from email_cache import registrable_domain
+
+DEFAULT_PER_HOST = 2
+DEFAULT_HOST_DELAY = 0.25
+# Shared hosting and CDNs put thousands of unrelated sites on one address; this only stops a flood of one IP
+DEFAULT_PER_IP = 16
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN = 600
+DNS_TTL = 600
+NEGATIVE_DNS_TTL = 3600
+DNS_WORKERS = 32
+
+
+class HostUnavailable(Exception):
+    """A host that cannot be resolved or whose circuit breaker is open; raised before any request is made."""
+
+
+class HostScheduler:
+    """
+    Politeness and fail-fast rules for the website fetches of both email engines.
+
+    Every fetch runs in a slot for its site: at most `per_host` requests at
+    once and `delay` seconds between request starts. Sites are keyed by
+    registrable domain from the public suffix list, so www.chain.com and
+    shop.chain.com wait for each other while unrelated stores on one Shopify
+    or Cloudflare address do not. A much looser `per_ip` cap bounds the
+    requests in flight to one address. Host names are resolved once and
+    failures are remembered for NEGATIVE_DNS_TTL seconds.
+    After `failure_threshold` connection failures in a row a host's circuit
+    breaker opens and its fetches fail immediately for `cooldown` seconds; the
+    first fetch after that decides whether it closes again.
+    """
+
+    def __init__(self, per_host=DEFAULT_PER_HOST, delay=DEFAULT_HOST_DELAY,
+                 failure_threshold=DEFAULT_FAILURE_THRESHOLD, cooldown=DEFAULT_COOLDOWN, per_ip=DEFAULT_PER_IP):
+        """
+        Args:
+            per_host (int): Requests to one site (registrable domain) at the same time
+            delay (float): Minimum seconds between two requests to one site
+            failure_threshold (int): Connection failures in a row that open a host's breaker
+            cooldown (float): Seconds an open breaker rejects fetches
+            per_ip (int): Requests to one IP address at the same time, across all of its sites
+        """
+        self.per_host = per_host
+        self.delay = delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.per_ip = per_ip
+        self._lock = threading.Lock()
+        self._dns = {}        # host -> (address or None, expires)
+        self._active = {}     # site -> requests in flight
+        self._ip_active = {}  # address -> requests in flight
+        self._next_start = {}  # site -> earliest time of the next request
+        self._failures = {}   # host -> connection failures in a row
+        self._open_until = {}  # host -> time the breaker stops rejecting
+
+    def resolve(self, host):
+        """
+        IP address of a host, from the cache when possible.
+
+        Raises:
+            HostUnavailable: If the name does not resolve (now or within NEGATIVE_DNS_TTL)
+        """
+        if contact_crawler.SITES_BASE_URL:
+            # Replayed sites are all served locally; their names are not real
+            return host
+        now = time.time()
+        with self._lock:
+            cached = self._dns.get(host)
+        if cached and cached[1] > now:
+            metrics.incr('dns_cache_hits')
+            address = cached[0]
+        else:
+            with metrics.timer('dns_lookup'):
+                try:
+                    address = socket.getaddrinfo(host, 443, type=socket.SOCK_STREAM)[0][4][0]
+                except (socket.gaierror, UnicodeError):
+                    address = None
+            ttl = DNS_TTL if address else NEGATIVE_DNS_TTL
+            with self._lock:
+                self._dns[host] = (address, now + ttl)
+            if address is None:
+                metrics.incr('dns_failures')
+        if address is None:
+            raise HostUnavailable(f"{host} does not resolve")
+        return address
+
+    def prefetch(self, urls, workers=DNS_WORKERS):
+        """Resolve the hosts of many URLs at once so dead domains are known before the first fetch."""
+        hosts = {urlparse(url).hostname for url in urls if url}
+        hosts.discard(None)
+
+        def lookup(host):
+            try:
+                self.resolve(host)
+            except HostUnavailable:
+                pass
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lookup, hosts))
+        with self._lock:
+            dead = sum(1 for host in hosts if host in self._dns and self._dns[host][0] is None)
+        if dead:
+            print(f"🪦 {dead} of {len(hosts)} website hosts do not resolve and will be skipped")
+
+    def _check(self, host):
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return
+            if time.time() < open_until:
+                metrics.incr('circuit_rejections')
+                raise HostUnavailable(f"{host} failed {self._failures[host]} times, skipping it for now")
+            # Half-open: let this fetch through; another failure reopens the breaker at once
+            del self._open_until[host]
+            self._failures[host] = self.failure_threshold - 1
+
+    def _try_start(self, site, server):
+        """Take a slot for the site on its server, or return how long to wait before trying again."""
+        with self._lock:
+            now = time.time()
+            wait = self._next_start.get(site, 0) - now
+            if self._active.get(site, 0) >= self.per_host or self._ip_active.get(server, 0) >= self.per_ip:
+                wait = max(wait, 0.05)
+            if wait > 0:
+                return wait
+            self._active[site] = self._active.get(site, 0) + 1
+            self._ip_active[server] = self._ip_active.get(server, 0) + 1
+            self._next_start[site] = now + self.delay
+            return 0
+
+    def _finish(self, host, site, server, seconds, ok):
+        with self._lock:
+            self._active[site] -= 1
+            self._ip_active[server] -= 1
+            if ok:
+                self._failures.pop(host, None)
+                return
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            tripped = failures >= self.failure_threshold and host not in self._open_until
+            if tripped:
+                self._open_until[host] = time.time() + self.cooldown
+        metrics.observe('dead_host', seconds)
+        if tripped:
+            metrics.incr('circuit_trips')
+
+    @contextmanager
+    def slot(self, url):
+        """
+        Run one blocking fetch of `url` under the host's limits.
+
+        Any exception raised inside the block counts as a connection failure of
+        the host; HTTP error statuses do not.
+
+        Raises:
+            HostUnavailable: Without waiting, if the host is dead or its breaker is open
+        """
+        host = urlparse(url).hostname or ''
+        self._check(host)
+        waiting = time.monotonic()
+        server = self.resolve(host)
+        site = registrable_domain(url) or host
+        with metrics.timer('host_wait'):
+            while True:
+                wait = self._try_start(site, server)
+                if not wait:
+                    break
+                time.sleep(wait)
+        _add_wait(waiting)
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self._finish(host, site, server, time.perf_counter() - start, ok)
+
+    @asynccontextmanager
+    async def aslot(self, url):
+        """slot() for coroutines: waits with asyncio.sleep and resolves names in the default executor."""
+        host = urlparse(url).hostname or ''
+        self._check(host)
+        waiting = time.monotonic()
+        server = await asyncio.get_running_loop().run_in_executor(None, self.resolve, host)
+        site = registrable_domain(url) or host
+        with metrics.timer('host_wait'):
+            while True:
+                wait = self._try_start(site, server)
+                if not wait:
+                    break
+                await asyncio.sleep(wait)
+        _add_wait(waiting)
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self._finish(host, site, server, time.perf_counter() - start, ok)
+
+
+def _add_wait(since):
+    # Credit the wait to the crawl running in this task or thread, so it is left out of its time budget
+    contact_crawler.host_waited.set(contact_crawler.host_waited.get() + time.monotonic() - since)
+
+
+# Process-wide scheduler shared by the HTTP and browser engines
+scheduler = HostScheduler()
+
+
+def install(new_scheduler):
+    """Make `new_scheduler` the scheduler used by every website fetch in this process."""
+    global scheduler
+    scheduler = new_scheduler
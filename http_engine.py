@@ -0,0 +1,163 @@
+import re
+import asyncio
+
+import contact_crawler
+import host_scheduler
+from contact_crawler import ContactCrawl, visible_text, replay_url, original_url, DEFAULT_MAX_PAGES, DEFAULT_MAX_TIME
+from metrics import metrics
+
+# Result statuses returned by extract_emails_http
+FOUND = 'found'
+NOT_FOUND = 'not_found'
+NEEDS_BROWSER = 'needs_browser'
+ERROR = 'error'
+
+DEFAULT_CONCURRENCY = 50
+DEFAULT_PER_HOST = 4
+REQUEST_TIMEOUT = 15
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/124.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en',
+}
+
+# Markers of pages that only render their content with JavaScript
+JS_MARKERS = [
+    'enable javascript',
+    'javascript is required',
+    'javascript is disabled',
+    'requires javascript',
+    'cf-browser-verification',
+    'challenge-platform',
+]
+APP_SHELL_REGEX = re.compile(r'<div[^>]+id=["\'](root|app|__next|___gatsby)["\'][^>]*>\s*</div>', re.I)
+MIN_VISIBLE_TEXT = 200
+
+
+def needs_javascript(html, status=200):
+    """
+    Decide whether a page has to be rendered in a browser to be useful.
+
+    Args:
+        html (str): Raw HTML returned over plain HTTP
+        status (int): HTTP status code of the response
+
+    Returns:
+        bool: True if the page is an empty app shell, a JS challenge or asks for JavaScript
+    """
+    lowered = html[:50000].lower()
+    if any(marker in lowered for marker in JS_MARKERS):
+        return True
+    too_little_text = len(visible_text(html)) < MIN_VISIBLE_TEXT
+    if status in (403, 503) and too_little_text:
+        # Bot protection usually answers plain clients with an empty challenge page
+        return True
+    if APP_SHELL_REGEX.search(html) and too_little_text:
+        return True
+    return '<script' in lowered and too_little_text
+
+
+async def fetch_page(session, url):
+    """
+    Fetch a URL and return (status, html, final url). Non-HTML responses return empty text.
+
+    Waits for a slot of the host scheduler first; raises HostUnavailable for dead hosts.
+    """
+    async with host_scheduler.scheduler.aslot(url):
+        async with session.get(replay_url(url), allow_redirects=True) as response:
+            final_url = original_url(str(response.url))
+            content_type = response.headers.get('Content-Type', '')
+            if 'html' not in content_type and 'text' not in content_type:
+                return response.status, '', final_url
+            return response.status, await response.text(errors='replace'), final_url
+
+
+def make_session(concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST):
+    """Create the shared keep-alive ClientSession. Must be called inside a running event loop."""
+    import aiohttp
+    if contact_crawler.SITES_BASE_URL:
+        # Every site is served by the replay server; the per-host limit is meant for the real hosts
+        per_host = 0
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HEADERS)
+
+
+async def extract_one(session, website, max_pages=DEFAULT_MAX_PAGES, max_time=DEFAULT_MAX_TIME):
+    """
+    Crawl the homepage and its best-ranked contact links until an email turns up.
+
+    Returns:
+        tuple: (email or None, status)
+    """
+    with metrics.timer('email_http'):
+        email, status = await _crawl(session, website, max_pages, max_time)
+    metrics.incr(f'email_http_{status}')
+    return email, status
+
+
+async def _crawl(session, website, max_pages, max_time):
+    crawl = ContactCrawl(website, max_pages, max_time)
+    failures = 0
+    while True:
+        url = crawl.next_url()
+        if url is None:
+            break
+        try:
+            status, html, final_url = await fetch_page(session, url)
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                metrics.incr('http_timeouts')
+            failures += 1
+            crawl.feed(url, None)
+            continue
+        crawl.feed(final_url, html if status < 400 else None)
+        if crawl.pages == 1 and not crawl.email and needs_javascript(html, status):
+            return None, NEEDS_BROWSER
+
+    if crawl.email:
+        return crawl.email, FOUND
+    # Nothing loaded: every page failed, or the budget ran out before one could be fetched
+    if failures == crawl.pages or (crawl.out_of_time and not crawl.loaded):
+        return None, ERROR
+    return None, NOT_FOUND
+
+
+async def _extract_all(websites, concurrency, per_host, on_result):
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {}
+
+    async with make_session(concurrency, per_host) as session:
+        async def run(website):
+            async with semaphore:
+                try:
+                    result = await extract_one(session, website)
+                except Exception as e:
+                    print(f"Error while processing {website}: {e}")
+                    result = (None, ERROR)
+            results[website] = result
+            if on_result:
+                on_result(website, *result)
+
+        await asyncio.gather(*(run(website) for website in websites))
+    return results
+
+
+def extract_emails_http(websites, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST, on_result=None):
+    """
+    Extract emails from many websites over plain HTTP with a shared keep-alive pool.
+
+    Args:
+        websites (list): Normalized website URLs
+        concurrency (int): Maximum number of sites in flight
+        per_host (int): Maximum open connections per host (0 for no limit)
+        on_result (callable): Optional callback(website, email, status) called as sites finish
+
+    Returns:
+        dict: website -> (email or None, status)
+    """
+    unique = list(dict.fromkeys(websites))
+    if not unique:
+        return {}
+    return asyncio.run(_extract_all(unique, concurrency, per_host, on_result))
@@ -0,0 +1,534 @@
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+# Create data directory if it doesn't exist
+DATA_DIR = 'data'
+os.makedirs(DATA_DIR, exist_ok=True)
+
+QUEUE_KINDS = ['sqlite', 'redis']
+DEFAULT_QUEUE_KIND = 'sqlite'
+DEFAULT_QUEUE_PATHS = {
+    'sqlite': os.path.join(DATA_DIR, 'jobs.sqlite'),
+    'redis': 'redis://localhost:6379/0',
+}
+
+# Queue names used by the producers and worker.py
+LOCATION_QUEUE = 'locations'
+WEBSITE_QUEUE = 'websites'
+
+DEFAULT_VISIBILITY = 300
+DEFAULT_MAX_ATTEMPTS = 3
+# Finished jobs older than this are redone when their key is enqueued again, e.g. weekly re-scrapes
+DEFAULT_REQUEUE_DAYS = 7
+DAY = 24 * 3600
+
+# Job states
+READY = 'ready'
+LEASED = 'leased'
+DONE = 'done'
+DEAD = 'dead'
+STATES = [READY, LEASED, DONE, DEAD]
+
+Job = namedtuple('Job', ['id', 'queue', 'key', 'payload', 'attempts', 'max_attempts'])
+
+
+def job_key(payload):
+    """Default job key: the payload itself, so enqueueing the same work twice adds one job."""
+    return json.dumps(payload, sort_keys=True, ensure_ascii=False)
+
+
+class SqliteQueue:
+    """
+    Jobs in one SQLite file, for workers on one machine (or a shared disk with working locks).
+
+    Each job key is added once per queue; enqueueing a key whose job finished
+    or died more than `requeue_after` seconds ago puts that job back. Leases are taken inside an IMMEDIATE
+    transaction, so two processes never lease the same job; a lease that is not
+    renewed with heartbeat() before it expires puts the job back in the queue,
+    or in the dead-letter state once it used up its attempts.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATHS['sqlite']):
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit mode: transactions are started explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                queue TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                owner TEXT,
+                lease_expires REAL,
+                error TEXT,
+                result TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                UNIQUE (queue, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (queue, status, available_at)")
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def put(self, queue, items, max_attempts=DEFAULT_MAX_ATTEMPTS, requeue_after=None):
+        """
+        Add jobs, skipping keys the queue already has, unless their job is done or
+        dead and was last updated more than `requeue_after` seconds ago; those jobs
+        are made ready again with the new payload and fresh attempts.
+
+        Args:
+            queue (str): Queue name
+            items (list): (key, payload) pairs; payloads must be JSON-serializable
+            max_attempts (int): Leases a job gets before it is dead-lettered
+            requeue_after (float): Age in seconds after which finished jobs are redone (default: never)
+
+        Returns:
+            int: Number of jobs added or put back
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            if requeue_after is not None:
+                conn.executemany(
+                    "UPDATE jobs SET status = ?, payload = ?, attempts = 0, max_attempts = ?, available_at = ?, "
+                    "owner = NULL, lease_expires = NULL, error = NULL, result = NULL, updated_at = ? "
+                    "WHERE queue = ? AND key = ? AND status IN (?, ?) AND updated_at < ?",
+                    [(READY, json.dumps(payload, ensure_ascii=False), max_attempts, now, now, queue, key, DONE, DEAD,
+                      now - requeue_after) for key, payload in items]
+                )
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (queue, key, payload, status, max_attempts, available_at, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(queue, key, json.dumps(payload, ensure_ascii=False), READY, max_attempts, now, now, now)
+                 for key, payload in items]
+            )
+            return conn.total_changes - before
+
+    def lease(self, queue, owner, limit=1, visibility=DEFAULT_VISIBILITY):
+        """
+        Take up to `limit` ready jobs for `visibility` seconds.
+
+        Returns:
+            list: Job records, each with its attempt number already counted
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            # Jobs whose worker stopped sending heartbeats become available again
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, owner = NULL, "
+                "error = 'lease expired', available_at = ?, updated_at = ? "
+                "WHERE queue = ? AND status = ? AND lease_expires < ?",
+                (DEAD, READY, now, now, queue, LEASED, now)
+            )
+            rows = conn.execute(
+                "SELECT id, key, payload, attempts, max_attempts FROM jobs "
+                "WHERE queue = ? AND status = ? AND available_at <= ? ORDER BY available_at, id LIMIT ?",
+                (queue, READY, now, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET status = ?, owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ?",
+                [(LEASED, owner, now + visibility, now, row[0]) for row in rows]
+            )
+        return [Job(job_id, queue, key, json.loads(payload), attempts + 1, max_attempts)
+                for job_id, key, payload, attempts, max_attempts in rows]
+
+    def heartbeat(self, jobs, owner, visibility=DEFAULT_VISIBILITY):
+        """Extend the leases of jobs this owner still holds. Returns the ids of those jobs."""
+        now = time.time()
+        held = set()
+        with self._transaction() as conn:
+            for job in jobs:
+                cursor = conn.execute(
+                    "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND owner = ? AND status = ?",
+                    (now + visibility, now, job.id, owner, LEASED)
+                )
+                if cursor.rowcount:
+                    held.add(job.id)
+        return held
+
+    def complete(self, job, owner, result=None):
+        """Mark a leased job done with an optional JSON-serializable result. False if the lease was lost."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, owner = NULL, error = NULL, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = ?",
+                (DONE, json.dumps(result, ensure_ascii=False), time.time(), job.id, owner, LEASED)
+            )
+            return bool(cursor.rowcount)
+
+    def fail(self, job, owner, error, delay=0):
+        """
+        Give a failed job back: retried after `delay` seconds, or dead-lettered once out of attempts.
+
+        Returns:
+            str: READY or DEAD, or None if the lease was lost
+        """
+        status = DEAD if job.attempts >= job.max_attempts else READY
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, owner = NULL, available_at = ?, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = ?",
+                (status, str(error), now + delay, now, job.id, owner, LEASED)
+            )
+            return status if cursor.rowcount else None
+
+    def release(self, job, owner):
+        """Hand a job back without counting the attempt, e.g. when a worker shuts down."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, attempts = attempts - 1, available_at = ?, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = ?",
+                (READY, time.time(), time.time(), job.id, owner, LEASED)
+            )
+
+    def counts(self):
+        """queue -> {state: number of jobs}"""
+        with self._lock:
+            rows = self._conn.execute("SELECT queue, status, COUNT(*) FROM jobs GROUP BY queue, status").fetchall()
+        counts = {}
+        for queue, status, count in rows:
+            counts.setdefault(queue, dict.fromkeys(STATES, 0))[status] = count
+        return counts
+
+    def results(self, queue, keys):
+        """key -> (state, result, error) for the given keys that are in the queue."""
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, status, result, error FROM jobs WHERE queue = ? AND key IN "
+                    f"({', '.join('?' * len(chunk))})", [queue] + chunk
+                ).fetchall()
+                for key, status, result, error in rows:
+                    found[key] = (status, json.loads(result) if result else None, error)
+        return found
+
+    def dead_letters(self, queue):
+        """(Job, last error) for every dead-lettered job of a queue."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, key, payload, attempts, max_attempts, error FROM jobs WHERE queue = ? AND status = ? "
+                "ORDER BY updated_at", (queue, DEAD)
+            ).fetchall()
+        return [(Job(job_id, queue, key, json.loads(payload), attempts, max_attempts), error)
+                for job_id, key, payload, attempts, max_attempts, error in rows]
+
+    def retry_dead(self, queue):
+        """Put every dead-lettered job of a queue back with fresh attempts. Returns how many."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, available_at = ?, updated_at = ? WHERE queue = ? AND status = ?",
+                (READY, now, now, queue, DEAD)
+            )
+            return cursor.rowcount
+
+    def purge(self, queue, states=(DONE, DEAD)):
+        """Delete a queue's jobs in the given states, so their keys can be enqueued again. Returns how many."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                f"DELETE FROM jobs WHERE queue = ? AND status IN ({', '.join('?' * len(states))})",
+                [queue] + list(states)
+            )
+            return cursor.rowcount
+
+    def close(self):
+        self._conn.close()
+
+
+# Redis layout, under a key prefix:
+#   <prefix>:id                   job id counter
+#   <prefix>:job:<id>             hash: queue, key, payload, status, attempts, max_attempts, owner, error, result
+#   <prefix>:<queue>:keys         hash: job key -> id
+#   <prefix>:<queue>:<state>      sorted set of ids; scored by availability (ready), lease expiry (leased)
+#                                 or finish time (done, dead)
+# KEYS: id counter, keys hash, ready set, job prefix, done set, dead set.
+# ARGV: key, payload pairs, then queue, max attempts, now and the finish time before which jobs are redone
+_REDIS_PUT = """
+local n = #ARGV - 4
+local queue, max_attempts, now, cutoff = ARGV[n + 1], ARGV[n + 2], ARGV[n + 3], tonumber(ARGV[n + 4])
+local added = 0
+for i = 1, n, 2 do
+    if redis.call('HSETNX', KEYS[2], ARGV[i], '') == 1 then
+        local id = redis.call('INCR', KEYS[1])
+        redis.call('HSET', KEYS[2], ARGV[i], id)
+        redis.call('HSET', KEYS[4] .. id, 'queue', queue, 'key', ARGV[i], 'payload', ARGV[i + 1],
+                   'status', 'ready', 'attempts', 0, 'max_attempts', max_attempts)
+        redis.call('ZADD', KEYS[3], now, id)
+        added = added + 1
+    else
+        local id = redis.call('HGET', KEYS[2], ARGV[i])
+        local job = KEYS[4] .. id
+        local status = redis.call('HGET', job, 'status')
+        local finished = (status == 'done' and KEYS[5]) or (status == 'dead' and KEYS[6]) or nil
+        local score = finished and redis.call('ZSCORE', finished, id)
+        if score and tonumber(score) < cutoff then
+            redis.call('ZREM', finished, id)
+            redis.call('HDEL', job, 'result', 'error')
+            redis.call('HSET', job, 'payload', ARGV[i + 1], 'status', 'ready', 'attempts', 0,
+                       'max_attempts', max_attempts, 'owner', '')
+            redis.call('ZADD', KEYS[3], now, id)
+            added = added + 1
+        end
+    end
+end
+return added
+"""
+_REDIS_LEASE = """
+local now, visibility, limit, owner = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), ARGV[4]
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)) do
+    local job = KEYS[4] .. id
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('HSET', job, 'owner', '', 'error', 'lease expired')
+    if tonumber(redis.call('HGET', job, 'attempts')) >= tonumber(redis.call('HGET', job, 'max_attempts')) then
+        redis.call('HSET', job, 'status', 'dead')
+        redis.call('ZADD', KEYS[3], now, id)
+    else
+        redis.call('HSET', job, 'status', 'ready')
+        redis.call('ZADD', KEYS[1], now, id)
+    end
+end
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, limit)
+for _, id in ipairs(ids) do
+    local job = KEYS[4] .. id
+    redis.call('ZREM', KEYS[1], id)
+    redis.call('ZADD', KEYS[2], now + visibility, id)
+    redis.call('HINCRBY', job, 'attempts', 1)
+    redis.call('HSET', job, 'status', 'leased', 'owner', owner)
+end
+return ids
+"""
+# KEYS: job hash, leased set, target set. ARGV: owner, new status, score, field, value, attempts change
+_REDIS_SETTLE = """
+if redis.call('HGET', KEYS[1], 'owner') ~= ARGV[1] or redis.call('HGET', KEYS[1], 'status') ~= 'leased' then
+    return 0
+end
+local id = string.match(KEYS[1], '(%d+)$')
+redis.call('ZREM', KEYS[2], id)
+redis.call('HSET', KEYS[1], 'status', ARGV[2], 'owner', '', ARGV[4], ARGV[5])
+redis.call('HINCRBY', KEYS[1], 'attempts', ARGV[6])
+redis.call('ZADD', KEYS[3], ARGV[3], id)
+return 1
+"""
+_REDIS_HEARTBEAT = """
+if redis.call('HGET', KEYS[1], 'owner') ~= ARGV[1] or redis.call('HGET', KEYS[1], 'status') ~= 'leased' then
+    return 0
+end
+redis.call('ZADD', KEYS[2], 'XX', ARGV[2], ARGV[3])
+return 1
+"""
+
+
+class RedisQueue:
+    """
+    Jobs in Redis, for workers spread over several machines. Needs the redis package.
+
+    Same behaviour as SqliteQueue; every state change runs as a Lua script so
+    it is atomic across workers.
+    """
+
+    def __init__(self, url=DEFAULT_QUEUE_PATHS['redis'], prefix='gms:jobs'):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The redis queue backend needs the redis package: pip install redis")
+        self.path = url
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._put = self._redis.register_script(_REDIS_PUT)
+        self._lease = self._redis.register_script(_REDIS_LEASE)
+        self._settle = self._redis.register_script(_REDIS_SETTLE)
+        self._heartbeat = self._redis.register_script(_REDIS_HEARTBEAT)
+
+    def _key(self, *parts):
+        return ':'.join((self.prefix,) + parts)
+
+    def _job_key(self, job_id):
+        return self._key('job', str(job_id))
+
+    def _read(self, queue, job_id):
+        data = self._redis.hgetall(self._job_key(job_id))
+        return Job(int(job_id), queue, data['key'], json.loads(data['payload']), int(data['attempts']),
+                   int(data['max_attempts']))
+
+    def put(self, queue, items, max_attempts=DEFAULT_MAX_ATTEMPTS, requeue_after=None):
+        args = []
+        for key, payload in items:
+            args += [key, json.dumps(payload, ensure_ascii=False)]
+        if not args:
+            return 0
+        now = time.time()
+        # Finish times are positive, so a cutoff of 0 never redoes a job
+        cutoff = now - requeue_after if requeue_after is not None else 0
+        return self._put(keys=[self._key('id'), self._key(queue, 'keys'), self._key(queue, READY), self._key('job', ''),
+                               self._key(queue, DONE), self._key(queue, DEAD)],
+                         args=args + [queue, max_attempts, now, cutoff])
+
+    def lease(self, queue, owner, limit=1, visibility=DEFAULT_VISIBILITY):
+        ids = self._lease(keys=[self._key(queue, READY), self._key(queue, LEASED), self._key(queue, DEAD),
+                                self._key('job', '')],
+                          args=[time.time(), visibility, limit, owner])
+        return [self._read(queue, job_id) for job_id in ids]
+
+    def heartbeat(self, jobs, owner, visibility=DEFAULT_VISIBILITY):
+        expires = time.time() + visibility
+        return {job.id for job in jobs
+                if self._heartbeat(keys=[self._job_key(job.id), self._key(job.queue, LEASED)],
+                                   args=[owner, expires, job.id])}
+
+    def _settle_job(self, job, owner, status, score, field, value, attempts=0):
+        return bool(self._settle(keys=[self._job_key(job.id), self._key(job.queue, LEASED), self._key(job.queue, status)],
+                                 args=[owner, status, score, field, value, attempts]))
+
+    def complete(self, job, owner, result=None):
+        return self._settle_job(job, owner, DONE, time.time(), 'result', json.dumps(result, ensure_ascii=False))
+
+    def fail(self, job, owner, error, delay=0):
+        status = DEAD if job.attempts >= job.max_attempts else READY
+        score = time.time() + (delay if status == READY else 0)
+        return status if self._settle_job(job, owner, status, score, 'error', str(error)) else None
+
+    def release(self, job, owner):
+        self._settle_job(job, owner, READY, time.time(), 'error', '', attempts=-1)
+
+    def queues(self):
+        return sorted({key.split(':')[-2] for key in self._redis.scan_iter(self._key('*', 'keys'))})
+
+    def counts(self):
+        return {queue: {state: self._redis.zcard(self._key(queue, state)) for state in STATES}
+                for queue in self.queues()}
+
+    def results(self, queue, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        found = {}
+        ids = self._redis.hmget(self._key(queue, 'keys'), keys)
+        for key, job_id in zip(keys, ids):
+            if not job_id:
+                continue
+            status, result, error = self._redis.hmget(self._job_key(job_id), ['status', 'result', 'error'])
+            found[key] = (status, json.loads(result) if result else None, error or None)
+        return found
+
+    def dead_letters(self, queue):
+        return [(self._read(queue, job_id), self._redis.hget(self._job_key(job_id), 'error'))
+                for job_id in self._redis.zrange(self._key(queue, DEAD), 0, -1)]
+
+    def retry_dead(self, queue):
+        ids = self._redis.zrange(self._key(queue, DEAD), 0, -1)
+        now = time.time()
+        with self._redis.pipeline() as pipe:
+            for job_id in ids:
+                pipe.zrem(self._key(queue, DEAD), job_id)
+                pipe.hset(self._job_key(job_id), mapping={'status': READY, 'attempts': 0})
+                pipe.zadd(self._key(queue, READY), {job_id: now})
+            pipe.execute()
+        return len(ids)
+
+    def purge(self, queue, states=(DONE, DEAD)):
+        removed = 0
+        for state in states:
+            for job_id in self._redis.zrange(self._key(queue, state), 0, -1):
+                key = self._redis.hget(self._job_key(job_id), 'key')
+                with self._redis.pipeline() as pipe:
+                    pipe.zrem(self._key(queue, state), job_id)
+                    pipe.hdel(self._key(queue, 'keys'), key)
+                    pipe.delete(self._job_key(job_id))
+                    pipe.execute()
+                removed += 1
+        return removed
+
+    def close(self):
+        self._redis.close()
+
+
+QUEUES = {'sqlite': SqliteQueue, 'redis': RedisQueue}
+
+
+def open_queue(kind=DEFAULT_QUEUE_KIND, path=None):
+    """Open a job queue of the given kind at `path` (a file for sqlite, a URL for redis)."""
+    return QUEUES[kind](path or DEFAULT_QUEUE_PATHS[kind])
+
+
+def add_queue_arguments(parser):
+    """Add the job queue options shared by the producers and worker.py."""
+    parser.add_argument('--queue-backend', choices=QUEUE_KINDS, default=DEFAULT_QUEUE_KIND,
+                        help=f'Job queue backend (default: {DEFAULT_QUEUE_KIND})')
+    parser.add_argument('--queue-path', help='Job queue file for sqlite or URL for redis (default: depends on the backend)')
+
+
+def add_requeue_arguments(parser):
+    """Add the option of the producers that decides when finished jobs are redone."""
+    parser.add_argument('--requeue-days', type=float, default=DEFAULT_REQUEUE_DAYS,
+                        help=f'Redo jobs that finished or died more than this many days ago when enqueued again; '
+                             f'newer ones are skipped (default: {DEFAULT_REQUEUE_DAYS})')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and manage the job queue')
+    add_queue_arguments(parser)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('stats', help='Show job counts per queue and state')
+
+    dead = commands.add_parser('dead', help='List dead-lettered jobs with their last error')
+    dead.add_argument('queue', help='Queue name, e.g. locations or websites')
+
+    retry = commands.add_parser('retry', help='Put dead-lettered jobs back in the queue')
+    retry.add_argument('queue', help='Queue name')
+
+    purge = commands.add_parser('purge', help='Delete finished jobs so the same work can be enqueued again')
+    purge.add_argument('queue', help='Queue name')
+    purge.add_argument('--state', action='append', choices=STATES,
+                       help='Only delete jobs in this state (repeatable, default: done and dead)')
+    args = parser.parse_args()
+
+    queue = open_queue(args.queue_backend, args.queue_path)
+    if args.command == 'stats':
+        counts = queue.counts()
+        if not counts:
+            print("📭 No jobs")
+        for name, states in sorted(counts.items()):
+            print(f"{name:12} " + ' '.join(f"{state} {states[state]:6}" for state in STATES))
+    elif args.command == 'dead':
+        letters = queue.dead_letters(args.queue)
+        for job, error in letters:
+            print(f"{job.key:50} {job.attempts} attempts  {error}")
+        if not letters:
+            print("📭 No dead-lettered jobs")
+    elif args.command == 'retry':
+        print(f"🔁 Requeued {queue.retry_dead(args.queue)} jobs")
+    elif args.command == 'purge':
+        print(f"🧹 Removed {queue.purge(args.queue, args.state or (DONE, DEAD))} jobs")
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
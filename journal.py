@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import threading
+
+from feed_parser import Listing
+
+# Create data directory if it doesn't exist
+DATA_DIR = 'data'
+JOURNAL_DIR = os.path.join(DATA_DIR, 'journal')
+os.makedirs(JOURNAL_DIR, exist_ok=True)
+
+
+def listing_key(listing):
+    """Stable key for a listing: its place ID, else its place URL, else name and address."""
+    return listing.place_id or listing.place_url or f"{listing.name}|{listing.address}"
+
+
+class Journal:
+    """
+    Append-only JSONL record of a scrape_location run.
+
+    The first record holds the parsed feed, every later record one finished
+    listing. Each record is flushed and fsynced as it is written, so a crash
+    loses at most the listing in progress. A torn last line is ignored on load.
+    """
+
+    def __init__(self, location, service, directory=JOURNAL_DIR):
+        self.path = os.path.join(directory, f'{location.replace(" ", "_")}_{service}.jsonl')
+        self._lock = threading.Lock()
+
+    def _write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def reset(self):
+        """Start a fresh journal, discarding any previous run."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def load(self):
+        """
+        Read the journal back.
+
+        Returns:
+            tuple: (list of Listing from the saved feed or None, dict of key -> row in journal order)
+        """
+        listings = None
+        rows = {}
+        if not os.path.exists(self.path):
+            return listings, rows
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Partial line from a crash mid-write
+                    continue
+                if record.get('type') == 'feed':
+                    listings = [Listing(**item) for item in record['listings']]
+                elif record.get('type') == 'listing':
+                    rows[record['key']] = record['row']
+        return listings, rows
+
+    def save_feed(self, listings):
+        self._write({'type': 'feed', 'ts': time.time(), 'listings': [listing._asdict() for listing in listings]})
+
+    def append(self, key, row):
+        self._write({'type': 'listing', 'ts': time.time(), 'key': key, 'row': row})
+
+    def items(self, listings=None):
+        """
+        (key, row) pairs of the journal, ordered like `listings`, followed by any rows not in it.
+
+        The journal is read once, and a key listed twice yields its row once.
+        """
+        _, rows = self.load()
+        ordered = []
+        seen = set()
+        for key in [listing_key(listing) for listing in listings or []] + list(rows):
+            if key in rows and key not in seen:
+                seen.add(key)
+                ordered.append((key, rows[key]))
+        return ordered
+
+    def keys(self, listings=None):
+        """Journal keys in the order rows() returns their rows."""
+        return [key for key, _ in self.items(listings)]
+
+    def rows(self, listings=None):
+        """Journal rows ordered like `listings`, followed by any rows not in it."""
+        return [row for _, row in self.items(listings)]
@@ -0,0 +1,213 @@
+import json
+import base64
+from urllib.parse import quote_plus
+
+from feed_parser import Listing, format_stars
+from journal import listing_key
+from metrics import metrics
+
+# 'dom' parses the feed HTML, 'network' the search responses Maps fetches while the feed scrolls
+BACKENDS = ['dom', 'network']
+
+XSSI_PREFIX = ")]}'"
+XSSI_SUFFIX = '/*""*/'
+# Requests that return search results while the feed scrolls
+SEARCH_URL_MARKERS = ('tbm=map',)
+# Keep response bodies in Chrome until they are read after scrolling
+NETWORK_BUFFER = {'maxTotalBufferSize': 100 * 2 ** 20, 'maxResourceBufferSize': 20 * 2 ** 20}
+
+# Results list inside a decoded search payload, and the place array inside one result
+RESULTS_PATH = (0, 1)
+PLACE_INDEX = 14
+# Positions of the fields inside a place array. Google moves these from time to
+# time; they are kept here so a layout change is fixed in one place.
+PLACE_FIELDS = {
+    'name': (11,),
+    'place_id': (10,),
+    'lat': (9, 2),
+    'lng': (9, 3),
+    'stars': (4, 7),
+    'reviews': (4, 8),
+    'address': (39,),
+    'category': (13, 0),
+    'website': (7, 0),
+    'phone': (178, 0, 0),
+    'plus_code': (183, 2, 2, 0),
+}
+
+
+def _get(data, path):
+    for position in path:
+        if not isinstance(data, list) or position >= len(data):
+            return None
+        data = data[position]
+    return data
+
+
+def decode_payload(text):
+    """
+    Turn a search response body into JSON.
+
+    Bodies are either the JSON behind an XSSI guard (")]}'") or an object whose
+    "d" field holds that guarded JSON as a string, followed by a '/*""*/' trailer.
+    """
+    text = text.strip()
+    if text.endswith(XSSI_SUFFIX):
+        text = text[:-len(XSSI_SUFFIX)]
+    if text.startswith('{'):
+        text = json.loads(text).get('d', '')
+    if text.startswith(XSSI_PREFIX):
+        text = text[len(XSSI_PREFIX):]
+    return json.loads(text)
+
+
+def parse_place(place, base_url):
+    """
+    Turn one place array into a Listing and its detail fields.
+
+    Returns:
+        tuple: (Listing, details dict as returned by read_details), or None without a name
+    """
+    fields = {name: _get(place, path) for name, path in PLACE_FIELDS.items()}
+    if not fields['name']:
+        return None
+    place_id = fields['place_id']
+    place_url = f"{base_url}/maps/place/{quote_plus(fields['name'])}/data=!4m2!3m1!1s{place_id}" if place_id else None
+    stars = fields['stars']
+    reviews = fields['reviews']
+    listing = Listing(
+        name=fields['name'],
+        stars=format_stars(stars) if isinstance(stars, (int, float)) else 'N/A',
+        # Same "1,234" format as the review count on a feed card
+        reviews=f'{reviews:,}' if isinstance(reviews, int) else 'N/A',
+        address=fields['address'] or 'N/A',
+        place_url=place_url,
+        place_id=place_id,
+        lat=fields['lat'],
+        lng=fields['lng'],
+    )
+    details = {
+        'phone': fields['phone'],
+        'website': fields['website'],
+        'category': fields['category'],
+        'address': fields['address'],
+        'plus_code': fields['plus_code'],
+    }
+    return listing, details
+
+
+def parse_search_payload(text, base_url='https://www.google.com'):
+    """
+    Parse one search response body.
+
+    Returns:
+        list: (Listing, details) pairs in result order
+    """
+    try:
+        results = _get(decode_payload(text), RESULTS_PATH) or []
+    except (ValueError, AttributeError):
+        metrics.incr('payload_parse_errors')
+        return []
+    parsed = []
+    for result in results:
+        place = _get(result, (PLACE_INDEX,))
+        record = parse_place(place, base_url) if isinstance(place, list) else None
+        if record:
+            parsed.append(record)
+    return parsed
+
+
+def parse_payloads(texts, base_url='https://www.google.com'):
+    """
+    Parse every search response of a feed, dropping places repeated across responses.
+
+    Places are matched by journal.listing_key, so places without a place ID
+    are kept; their details are left out and come from the detail stage.
+
+    Returns:
+        tuple: (list of Listing in result order, dict of place ID -> details)
+    """
+    listings = []
+    details = {}
+    seen = set()
+    for text in texts:
+        for listing, place_details in parse_search_payload(text, base_url):
+            key = listing_key(listing)
+            if key in seen:
+                continue
+            seen.add(key)
+            if listing.place_id:
+                details[listing.place_id] = place_details
+            listings.append(listing)
+    return listings, details
+
+
+def enable_capture(driver):
+    """Let Chrome keep response bodies so read_payloads() can fetch them. Needs the performance log."""
+    driver.execute_cdp_cmd('Network.enable', NETWORK_BUFFER)
+
+
+def read_payloads(driver, entries, markers=SEARCH_URL_MARKERS):
+    """
+    Bodies of the search responses found in a batch of performance log entries.
+
+    Args:
+        driver: The Chrome session the entries were read from
+        entries (list): Entries of driver.get_log('performance')
+        markers (tuple): URL fragments identifying search requests
+
+    Returns:
+        list: Response bodies as text, in the order they arrived
+    """
+    request_ids = []
+    for entry in entries:
+        message = json.loads(entry['message'])['message']
+        if message.get('method') != 'Network.responseReceived':
+            continue
+        url = message['params']['response'].get('url', '')
+        if any(marker in url for marker in markers):
+            request_ids.append(message['params']['requestId'])
+
+    bodies = []
+    for request_id in request_ids:
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception:
+            # Evicted from the buffer or still loading
+            metrics.incr('payload_missing')
+            continue
+        text = body['body']
+        if body.get('base64Encoded'):
+            text = base64.b64decode(text).decode('utf-8', errors='replace')
+        bodies.append(text)
+    metrics.incr('payloads', len(bodies))
+    return bodies
+
+
+def place_array(listing, details):
+    """
+    Inverse of parse_place: a place array holding a listing's fields, for building payload fixtures.
+
+    Stars and reviews are taken as numbers.
+    """
+    place = []
+    values = dict(details, name=listing.name, place_id=listing.place_id, lat=listing.lat, lng=listing.lng,
+                  stars=listing.stars, reviews=listing.reviews, address=details.get('address') or listing.address)
+    for name, path in PLACE_FIELDS.items():
+        if values.get(name) is None:
+            continue
+        target = place
+        for position in path[:-1]:
+            target.extend([None] * (position + 1 - len(target)))
+            if target[position] is None:
+                target[position] = []
+            target = target[position]
+        target.extend([None] * (path[-1] + 1 - len(target)))
+        target[path[-1]] = values[name]
+    return place
+
+
+def build_payload(records):
+    """A search response body, in the XSSI-guarded wire format, for (Listing, details) records."""
+    results = [[None] * PLACE_INDEX + [place_array(listing, details)] for listing, details in records]
+    return XSSI_PREFIX + '\n' + json.dumps([[None, results]], ensure_ascii=False)
@@ -0,0 +1,323 @@
+import os
+import sys
+import json
+import time
+import random
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import psutil
+
+PROMETHEUS_PREFIX = 'gms'
+MAX_SAMPLES = 10000
+PROFILE_MODES = ['cprofile', 'sample']
+SAMPLE_INTERVAL = 0.005
+
+
+class Timer:
+    """Count, total, extremes and a bounded reservoir of durations for one phase."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.samples = []
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(seconds)
+        else:
+            # Reservoir sampling keeps the percentiles honest on long runs
+            slot = random.randrange(self.count)
+            if slot < MAX_SAMPLES:
+                self.samples[slot] = seconds
+
+    def quantile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total': round(self.total, 4),
+            'mean': round(self.total / self.count, 4) if self.count else None,
+            'min': round(self.min, 4) if self.min is not None else None,
+            'max': round(self.max, 4) if self.max is not None else None,
+            'p50': round(self.quantile(0.5), 4) if self.samples else None,
+            'p95': round(self.quantile(0.95), 4) if self.samples else None,
+        }
+
+
+class Metrics:
+    """
+    Per-phase timers and counters for one process.
+
+    Timers measure phases such as feed loading or a single email fetch,
+    counters track events such as timeouts, retries and cache hits. Both are
+    safe to update from threads and from the email stream's event loop.
+
+    Everything is recorded twice: for the current run, which start_run()
+    begins and the run reports cover, and for the life of the process, which
+    /metrics serves so Prometheus counters never go backwards between the
+    runs of one service.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._total_timers = {}
+        self._total_counters = Counter()
+        self.start_run()
+
+    def start_run(self):
+        """Begin a new run: the run's timers and counters start from zero, the process totals are kept."""
+        with self._lock:
+            self.started = time.time()
+            self._timers = {}
+            self._counters = Counter()
+
+    def observe(self, name, seconds):
+        """Record one duration for a phase."""
+        with self._lock:
+            self._timers.setdefault(name, Timer()).add(seconds)
+            self._total_timers.setdefault(name, Timer()).add(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        """Time the enclosed block as one occurrence of phase `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def incr(self, name, value=1):
+        """Add to a counter."""
+        with self._lock:
+            self._counters[name] += value
+            self._total_counters[name] += value
+
+    def snapshot(self, cumulative=False):
+        """Timers and counters of the current run, or of the whole process, as a JSON-friendly dict."""
+        with self._lock:
+            timers = self._total_timers if cumulative else self._timers
+            counters = self._total_counters if cumulative else self._counters
+            return {
+                'started': self.started,
+                'elapsed': round(time.time() - self.started, 3),
+                'timers': {name: timer.summary() for name, timer in sorted(timers.items())},
+                'counters': dict(sorted(counters.items())),
+            }
+
+    def write_report(self, path, **extra):
+        """Write the snapshot, plus any extra fields, as a JSON run report."""
+        report = dict(extra, **self.snapshot())
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        return path
+
+    def prometheus(self):
+        """The process totals in the Prometheus text exposition format, with the current run's elapsed time."""
+        snapshot = self.snapshot(cumulative=True)
+        lines = []
+        for name, summary in snapshot['timers'].items():
+            metric = f'{PROMETHEUS_PREFIX}_{name}_seconds'
+            lines.append(f'# TYPE {metric} summary')
+            for key, quantile in (('p50', '0.5'), ('p95', '0.95')):
+                if summary[key] is not None:
+                    lines.append(f'{metric}{{quantile="{quantile}"}} {summary[key]}')
+            lines.append(f'{metric}_sum {summary["total"]}')
+            lines.append(f'{metric}_count {summary["count"]}')
+        for name, value in snapshot['counters'].items():
+            metric = f'{PROMETHEUS_PREFIX}_{name}_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {value}')
+        lines.append(f'# TYPE {PROMETHEUS_PREFIX}_run_seconds gauge')
+        lines.append(f'{PROMETHEUS_PREFIX}_run_seconds {snapshot["elapsed"]}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve /metrics in Prometheus format from a background thread. Returns the server."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"📈 Metrics served at http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+
+# Process-wide registry used by every module
+metrics = Metrics()
+
+
+class RssMonitor:
+    """Peak resident memory of this process and optionally its children, sampled in a background thread."""
+
+    def __init__(self, exclude=(), interval=0.1, children=True):
+        """
+        Args:
+            exclude (list): Child process ids to leave out, e.g. a fixture server
+            interval (float): Seconds between samples
+            children (bool): Add the memory of child processes such as Chrome
+        """
+        self.exclude = set(exclude)
+        self.interval = interval
+        self.children = children
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True) if self.children else ():
+            if child.pid in self.exclude:
+                continue
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak = max(self.peak, total)
+
+    @property
+    def peak_mb(self):
+        return round(self.peak / 2 ** 20, 1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def report_path(output):
+    """Run report file next to an output file: data/x_updated.xlsx -> data/x_updated_metrics.json"""
+    return os.path.splitext(output)[0] + '_metrics.json'
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread at a fixed interval.
+
+    Unlike cProfile it also sees the detail-fetch and email worker threads,
+    and adds little overhead to the code being measured.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self.own = Counter()
+        self.inclusive = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                self.samples += 1
+                self.own[self._label(frame)] += 1
+                seen = set()
+                while frame is not None:
+                    label = self._label(frame)
+                    if label not in seen:
+                        seen.add(label)
+                        self.inclusive[label] += 1
+                    frame = frame.f_back
+
+    @staticmethod
+    def _label(frame):
+        code = frame.f_code
+        return f'{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})'
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def format(self, top=25):
+        if not self.samples:
+            return 'No samples collected'
+        lines = [f'{self.samples} samples every {self.interval * 1000:.0f} ms across all threads',
+                 f'{"own %":>7} {"total %":>8}  function']
+        for label, count in self.inclusive.most_common(top):
+            lines.append(f'{100 * self.own[label] / self.samples:7.1f} {100 * count / self.samples:8.1f}  {label}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def profiled(mode, path=None, top=25):
+    """
+    Profile the enclosed block and print the hottest functions.
+
+    Args:
+        mode (str): 'cprofile' (this thread only, exact call counts), 'sample'
+            (every thread, statistical) or None to do nothing
+        path (str): Optional file for the full results (.prof for cProfile, text for samples)
+        top (int): Number of functions to print
+    """
+    if not mode:
+        yield
+        return
+    if mode == 'cprofile':
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            if path:
+                profile.dump_stats(path)
+            pstats.Stats(profile).sort_stats('cumulative').print_stats(top)
+    else:
+        sampler = SamplingProfiler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            text = sampler.format(top)
+            if path:
+                with open(path, 'w') as f:
+                    f.write(sampler.format(top=None) + '\n')
+            print(text)
+    if path:
+        print(f"📈 Profile saved to {path}")
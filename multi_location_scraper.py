@@ -1,43 +1,149 @@
 import argparse
 import json
-import pandas as pd
+import random
 import time
-from gms import scrape_location
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
-def scrape_multiple_locations(locations, service="restaurants"):
+import rate_limit
+import resource_policy
+from rate_limit import TokenBucket, DEFAULT_RATE, DEFAULT_BURST
+from metrics import metrics, report_path
+from job_queue import open_queue, add_queue_arguments, add_requeue_arguments, LOCATION_QUEUE, DEFAULT_REQUEUE_DAYS, DAY
+from maps_payload import BACKENDS
+from service import run_remote, add_service_arguments, ServiceError, FAILED
+
+DEFAULT_WORKERS = 3
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 30
+
+
+def init_worker(bucket, policy=resource_policy.DEFAULT_POLICY):
+    """Share the parent's token bucket and resource policy with every scrape_location call in this worker."""
+    rate_limit.install(bucket)
+    resource_policy.set_policy(policy)
+
+
+def run_location(location, service, resume=False, tiled=False, refresh=False, backend='dom'):
+    """Scrape one location in a worker process and time it."""
+    from gms import scrape_location
+
+    start = time.perf_counter()
+    excel_file = scrape_location(location, service, resume=resume, tiled=tiled, refresh=refresh, backend=backend)
+    return excel_file, time.perf_counter() - start
+
+
+def scrape_remote(locations, address, service="restaurants", tiled=False, refresh=False, backend='dom'):
+    """
+    Scrape the locations one after another on a running service.py, which keeps its Chrome sessions warm.
+
+    Returns:
+        list: The locations whose job failed
     """
-    Scrape Google Maps data for multiple locations.
-    
+    failed = []
+    for i, location in enumerate(locations, 1):
+        print(f"\n[{i}/{len(locations)}] {location}")
+        job = run_remote(address, 'scrape', {'location': location, 'service': service, 'tiled': tiled,
+                                             'refresh': refresh, 'backend': backend})
+        if job['state'] == FAILED:
+            failed.append(location)
+    print(f"\n✅ {len(locations) - len(failed)}/{len(locations)} locations scraped on {address}")
+    if failed:
+        print(f"❌ Failed: {', '.join(failed)}")
+    return failed
+
+
+def backoff_delay(attempt, base=DEFAULT_BACKOFF):
+    """Exponential backoff of base * 2^(attempt - 1), jittered by ±50%."""
+    return base * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+
+
+def scrape_multiple_locations(locations, service="restaurants", workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+                              burst=DEFAULT_BURST, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                              policy=None, tiled=False, refresh=False, backend='dom'):
+    """
+    Scrape Google Maps data for multiple locations in parallel worker processes.
+
     Args:
         locations (list): List of location names to scrape
         service (str): Type of service to search for (default: restaurants)
+        workers (int): Number of locations scraped at the same time
+        rate (float): Maps page loads per second allowed across all workers
+        burst (int): Page loads that may happen back to back before the rate applies
+        retries (int): Extra attempts for a failed location
+        backoff (float): Base delay in seconds before retrying a failed location
+        policy (str): Resource policy for the workers' Chrome sessions (default: this process's policy)
+        tiled (bool): Geocode each location and search it tile by tile (see gms.scrape_location)
+        refresh (bool): Only fetch listings that are new or changed since the last run (see gms.scrape_location)
+        backend (str): 'dom' or 'network' listing extraction (see gms.scrape_location)
     """
-    results = []
-    
-    print(f"Starting scraping for {len(locations)} locations...")
-    
-    for location in locations:
-        try:
-            excel_file = scrape_location(location, service)
-            results.append({
-                'location': location,
-                'status': 'success',
-                'file': excel_file
-            })
-        except Exception as e:
-            print(f"❌ Error scraping {location}: {str(e)}")
-            results.append({
-                'location': location,
-                'status': 'failed',
-                'error': str(e)
-            })
-        time.sleep(30)
-    
+    import pandas as pd
+    print(f"Starting scraping for {len(locations)} locations with {workers} workers...")
+
+    bucket = TokenBucket(rate, burst)
+    state = {
+        location: {'location': location, 'attempts': 0, 'duration': 0.0}
+        for location in locations
+    }
+    queued = [(0.0, location) for location in locations]
+    running = {}
+    done = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(bucket, policy or resource_policy.policy)) as executor:
+        while queued or running:
+            # Start every queued location whose backoff has passed, up to the worker count
+            now = time.time()
+            ready = [item for item in queued if item[0] <= now]
+            for item in ready[:max(workers - len(running), 0)]:
+                queued.remove(item)
+                location = item[1]
+                state[location]['attempts'] += 1
+                # Retries pick up from the failed attempt's journal
+                resume = state[location]['attempts'] > 1
+                running[executor.submit(run_location, location, service, resume, tiled, refresh,
+                                        backend)] = (location, time.perf_counter())
+
+            if not running:
+                time.sleep(max(min(ready_at for ready_at, _ in queued) - time.time(), 0.1))
+                continue
+
+            finished, _ = wait(running, timeout=5, return_when=FIRST_COMPLETED)
+            for future in finished:
+                location, started = running.pop(future)
+                result = state[location]
+                result['duration'] += time.perf_counter() - started
+                try:
+                    excel_file, seconds = future.result()
+                    metrics.observe('location', seconds)
+                    result.update(status='success', file=excel_file)
+                    result.pop('error', None)
+                except Exception as e:
+                    result.update(status='failed', error=str(e))
+                    if result['attempts'] <= retries:
+                        delay = backoff_delay(result['attempts'], backoff)
+                        metrics.incr('location_retries')
+                        print(f"⚠️ {location} failed on attempt {result['attempts']}: {e}. Retrying in {delay:.0f}s")
+                        queued.append((time.time() + delay, location))
+                        continue
+                    metrics.incr('location_failures')
+                    print(f"❌ Error scraping {location}: {str(e)}")
+
+                done += 1
+                icon = '✅' if result['status'] == 'success' else '❌'
+                print(f"[{done}/{len(locations)}] {icon} {location} in {result['duration']:.0f}s "
+                      f"({result['attempts']} attempts) | running: {len(running)}, queued: {len(queued)}")
+
+    results = [state[location] for location in locations]
+    for result in results:
+        result['duration'] = round(result['duration'], 1)
+
     # Save summary report
     summary_file = 'scraping_summary.xlsx'
-    pd.DataFrame(results).to_excel(summary_file, index=False)
+    columns = ['location', 'status', 'file', 'error', 'duration', 'attempts']
+    pd.DataFrame(results, columns=columns).to_excel(summary_file, index=False)
     print(f"\n✅ Summary report saved to {summary_file}")
-    
+    metrics.write_report(report_path(summary_file), service=service, locations=len(locations), workers=workers)
+
     # Print final summary
     successful = sum(1 for r in results if r['status'] == 'success')
     print(f"\nScraping completed:")
@@ -45,13 +151,62 @@ def scrape_multiple_locations(locations, service="restaurants"):
     print(f"- Successful: {successful}")
     print(f"- Failed: {len(locations) - successful}")
 
+def enqueue_locations(locations, service="restaurants", tiled=False, retries=DEFAULT_RETRIES,
+                      queue_kind='sqlite', queue_path=None, refresh=False, backend='dom',
+                      requeue_days=DEFAULT_REQUEUE_DAYS):
+    """
+    Add one job per location to the job queue for worker.py instead of scraping here.
+
+    A location already in the queue is skipped unless its job finished or died
+    more than `requeue_days` days ago; purge the queue with job_queue.py to
+    scrape newer ones again.
+
+    Returns:
+        int: Number of jobs added
+    """
+    queue = open_queue(queue_kind, queue_path)
+    items = [(f"{location}|{service}", {'location': location, 'service': service, 'tiled': tiled, 'refresh': refresh,
+                                        'backend': backend})
+             for location in locations]
+    added = queue.put(LOCATION_QUEUE, items, max_attempts=retries + 1, requeue_after=requeue_days * DAY)
+    print(f"📥 Queued {added} locations at {queue.path}")
+    if len(items) > added:
+        print(f"⏭️ Skipped {len(items) - added} locations queued or finished in the last {requeue_days:g} days; "
+              f"run 'python job_queue.py purge {LOCATION_QUEUE}' to scrape them again")
+    queue.close()
+    return added
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Scrape Google Maps data for multiple locations')
     parser.add_argument('--locations', type=str, help='Comma-separated list of locations or path to JSON file with locations array')
     parser.add_argument('--service', type=str, default='restaurants', help='Type of service to search for (default: restaurants)')
-    
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Locations scraped in parallel (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help=f'Maps page loads per second across all workers (default: {DEFAULT_RATE})')
+    parser.add_argument('--burst', type=int, default=DEFAULT_BURST,
+                        help=f'Page loads allowed back to back (default: {DEFAULT_BURST})')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help=f'Retries for a failed location (default: {DEFAULT_RETRIES})')
+    parser.add_argument('--backoff', type=float, default=DEFAULT_BACKOFF,
+                        help=f'Base retry delay in seconds, jittered and doubled per attempt (default: {DEFAULT_BACKOFF})')
+    parser.add_argument('--resource-policy', choices=list(resource_policy.POLICIES), default=resource_policy.policy,
+                        help=f'Resources Chrome skips: off, lean or strict (default: {resource_policy.policy})')
+    parser.add_argument('--tiles', action='store_true',
+                        help='Search each location tile by tile to get past the ~120-result cap per search')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Only fetch listings that are new or changed since the last run of each location')
+    parser.add_argument('--backend', choices=BACKENDS, default='dom',
+                        help='Read listings from the feed HTML (dom) or the captured search responses (network)')
+    parser.add_argument('--enqueue', action='store_true',
+                        help='Add the locations to the job queue for worker.py instead of scraping them here')
+    add_queue_arguments(parser)
+    add_requeue_arguments(parser)
+    add_service_arguments(parser)
+
     args = parser.parse_args()
-    
+
     if args.locations.endswith('.json'):
         # Read locations from JSON file
         with open(args.locations, 'r') as f:
@@ -61,5 +216,17 @@ if __name__ == "__main__":
     else:
         # Parse comma-separated locations
         locations = [loc.strip() for loc in args.locations.split(',')]
-    
-    scrape_multiple_locations(locations, args.service) 
\ No newline at end of file
+
+    if args.remote:
+        try:
+            scrape_remote(locations, args.remote, args.service, args.tiles, args.refresh, args.backend)
+        except ServiceError as e:
+            print(f"❌ {e}")
+            exit(1)
+    elif args.enqueue:
+        enqueue_locations(locations, args.service, args.tiles, args.retries, args.queue_backend, args.queue_path,
+                          args.refresh, args.backend, args.requeue_days)
+    else:
+        scrape_multiple_locations(locations, args.service, args.workers, args.rate, args.burst,
+                                  args.retries, args.backoff, args.resource_policy, args.tiles, args.refresh,
+                                  args.backend)
@@ -1,15 +1,27 @@
 import re
 import time
 import json
-import pandas as pd
 import os
 import argparse
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import NoSuchElementException, WebDriverException
+from selenium.common.exceptions import NoSuchElementException, WebDriverException, TimeoutException
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from email_cache import (EmailCache, site_key, FOUND, NOT_FOUND, ERROR, DEFAULT_CACHE_PATH,
+                         DEFAULT_TTL_FOUND, DEFAULT_TTL_NOT_FOUND, DEFAULT_TTL_ERROR, DAY)
+from output_store import (read_table, write_table, read_chunks, TableWriter, open_store, STORE_KINDS,
+                          DEFAULT_STORE_KIND, DEFAULT_CHUNK_ROWS)
+from metrics import metrics, report_path, profiled, RssMonitor, PROFILE_MODES
+import resource_policy
+from resource_policy import configure_options, apply_policy, record_network, POLICIES
+from driver_pool import (DriverPool, PooledDriver, DEFAULT_POOL_SIZE, DEFAULT_RECYCLE_PAGES,
+                         DEFAULT_RECYCLE_MEMORY_MB, DEFAULT_CHECKOUT_TIMEOUT)
+import host_scheduler
+from host_scheduler import (HostScheduler, HostUnavailable, DEFAULT_PER_HOST, DEFAULT_HOST_DELAY,
+                            DEFAULT_FAILURE_THRESHOLD, DEFAULT_COOLDOWN, DEFAULT_PER_IP)
+from concurrency import (AdaptiveConcurrency, DEFAULT_MIN_CONCURRENCY, DEFAULT_MAX_CONCURRENCY,
+                         DEFAULT_START_CONCURRENCY)
+
+from service import run_remote, add_service_arguments, FAILED
 from urllib.parse import urlparse
 EMAIL_REGEX = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
 
@@ -17,6 +29,12 @@ EMAIL_REGEX = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
 DATA_DIR = 'data'
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# Chrome errors caused by the site itself rather than by load on this machine or the server
+HOST_ERRORS = ('ERR_NAME_NOT_RESOLVED', 'ERR_NAME_RESOLUTION_FAILED', 'ERR_CONNECTION_REFUSED',
+               'ERR_ADDRESS_UNREACHABLE', 'ERR_CERT_')
+# HTTP status of the page Chrome loaded (0 when unknown)
+RESPONSE_STATUS_JS = "const e = performance.getEntriesByType('navigation')[0]; return e ? e.responseStatus || 0 : 0;"
+
 
 def normalize_url(website):
     if any(domain in website.lower() for domain in ["facebook.com", "instagram.com", "tripadvisor.com", "wolt.com"]):
@@ -35,52 +53,116 @@ def find_email_in_text(text):
     return emails[0] if emails else None
 
 
-def get_driver() -> webdriver.Chrome:
+def get_driver() -> "webdriver.Chrome":
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
     options = Options()
     options.add_argument('--headless=new')
     options.add_argument('--disable-gpu')
     options.add_argument('--no-sandbox')
     options.add_argument("--window-size=1920,1080")
     options.add_argument("user-agent=Mozilla/5.0")
-    return webdriver.Chrome(options=options)
+    configure_options(options)
+    with metrics.timer('driver_startup'):
+        driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(15)
+    apply_policy(driver, 'email')
+    return driver
+
+
+def scrape_with_driver(driver, website):
+    """
+    Crawl a site for an email with an open PooledDriver, starting at the homepage.
+
+    Returns:
+        tuple: (email or None, status, overloaded); status is ERROR when no page of the site could be
+            loaded, and overloaded tells whether a page timed out, crashed Chrome or got a 5xx response
+            rather than failing for reasons of the site like DNS or an open circuit breaker
+    """
+    from contact_crawler import crawl_site, replay_url, original_url
+    failures = 0
+    overloaded = False
+
+    def fetch(url):
+        nonlocal failures, overloaded
+        try:
+            with host_scheduler.scheduler.slot(url):
+                driver.note_page()
+                driver.get(replay_url(url))
+        except TimeoutException:
+            metrics.incr('browser_timeouts')
+            failures += 1
+            overloaded = True
+            raise
+        except HostUnavailable:
+            failures += 1
+            raise
+        except WebDriverException as e:
+            failures += 1
+            overloaded = overloaded or not any(error in str(e) for error in HOST_ERRORS)
+            raise
+        if (driver.execute_script(RESPONSE_STATUS_JS) or 0) >= 500:
+            overloaded = True
+        # Scroll once to trigger lazy-loaded footers, then give scripts a moment
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        time.sleep(1)
+        record_network(driver)
+        return original_url(driver.current_url), driver.page_source
+
+    email, pages, starved = crawl_site(website, fetch)
+    if email:
+        return email, FOUND, overloaded
+    return None, ERROR if starved or (pages and failures == pages) else NOT_FOUND, overloaded
 
 
-def extract_email_from_website(website):
+def extract_email_from_website(website, pool=None):
+    return extract_with_status(website, pool)[0]
+
+
+def extract_with_status(website, pool=None):
+    """
+    Crawl a website in Chrome for an email.
+
+    Returns:
+        tuple: (email or None, FOUND, NOT_FOUND or ERROR)
+    """
+    return extract_with_outcome(website, pool)[:2]
+
+
+def extract_with_outcome(website, pool=None):
+    """
+    extract_with_status, also telling whether the failures looked like overload (see scrape_with_driver).
+
+    Returns:
+        tuple: (email or None, FOUND, NOT_FOUND or ERROR, overloaded)
+    """
     website = normalize_url(website)
 
     if website == None:
-        return None
-    try:
-        driver = get_driver()
-        driver.set_page_load_timeout(15)
-
-        # Try common contact page paths
-        contact_paths = ['/contact', '/contact-us', '/kontakt']
-        for path in contact_paths:
-            try:
-                driver.get(website.rstrip('/') + path)
-                time.sleep(2)
-                text = driver.find_element(By.TAG_NAME, 'body').text
-                email = find_email_in_text(text)
-                if email:
-                    return email
-            except WebDriverException:
-                continue
+        return None, NOT_FOUND, False
+    with metrics.timer('email_browser'):
+        email, status, overloaded = _extract_with_browser(website, pool)
+    metrics.incr(f'email_browser_{status}')
+    return email, status, overloaded
 
-        # Fallback: visit homepage
-        driver.get(website)
-        time.sleep(3)
 
-        # Scroll to load lazy content
-        for _ in range(3):
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1)
+def _extract_with_browser(website, pool):
+    # A failure outside the crawl (no free or no working Chrome session) is this machine's overload
+    if pool is not None:
+        try:
+            with pool.session() as driver:
+                return scrape_with_driver(driver, website)
+        except Exception as e:
+            print(f"Error while processing {website}: {e}")
+            return None, ERROR, True
 
-        text = driver.find_element(By.TAG_NAME, 'body').text
-        return find_email_in_text(text)
+    driver = None
+    try:
+        driver = get_driver()
+        return scrape_with_driver(PooledDriver(driver), website)
     except Exception as e:
         print(f"Error while processing {website}: {e}")
-        return None
+        return None, ERROR, True
     finally:
         try:
             driver.quit()
@@ -88,43 +170,470 @@ def extract_email_from_website(website):
             pass
 
 
+def make_pool(size=DEFAULT_POOL_SIZE, recycle_pages=DEFAULT_RECYCLE_PAGES,
+              recycle_memory_mb=DEFAULT_RECYCLE_MEMORY_MB, checkout_timeout=DEFAULT_CHECKOUT_TIMEOUT):
+    """Create a DriverPool of email-extraction Chrome sessions."""
+    return DriverPool(get_driver, size=size, recycle_pages=recycle_pages,
+                      recycle_memory_mb=recycle_memory_mb, checkout_timeout=checkout_timeout)
+
+
+def make_limiter(args, pool=None):
+    """Create the AdaptiveConcurrency described by parsed CLI arguments; low memory quits idle drivers of `pool`."""
+    return AdaptiveConcurrency(args.min_concurrency, args.max_concurrency, args.start_concurrency,
+                               fixed=args.concurrency, on_low_memory=pool.trim if pool else None)
+
+
+def limited_extract(website, pool, limiter):
+    """
+    Run extract_with_status in one of the limiter's slots, reporting its latency and outcome.
+
+    Only failures that look like overload count against the limit; sites that
+    fail on their own (DNS, refused connections, open circuit breakers) are
+    left out of the limiter's window.
+    """
+    limiter.acquire()
+    start = time.perf_counter()
+    status, overloaded = ERROR, True
+    try:
+        email, status, overloaded = extract_with_outcome(website, pool)
+        return email, status
+    finally:
+        ok = True if status != ERROR else (False if overloaded else None)
+        limiter.release(time.perf_counter() - start, ok)
+
+
+def print_pool_metrics(pool):
+    stats = pool.metrics()
+    print(f"🚗 Driver pool: {stats['created']} started, {stats['pages']} pages, "
+          f"{stats['recycled_pages'] + stats['recycled_memory']} recycled, "
+          f"{stats['replaced_crashed']} crashed, "
+          f"avg wait {stats['checkout_wait_avg']:.2f}s (max {stats['checkout_wait_max']:.2f}s)")
+
+
+def process_http(websites, engine):
+    """
+    Run the HTTP engine over a set of websites.
+
+    Args:
+        websites (dict): key -> website as written in the sheet
+        engine (str): 'http' or 'auto'
+
+    Returns:
+        tuple: (dict of key -> (email, status), list of keys that still need the browser path)
+    """
+    from http_engine import extract_emails_http, NEEDS_BROWSER
+
+    urls = {key: normalize_url(website) for key, website in websites.items()}
+    fetched = extract_emails_http([url for url in urls.values() if url])
+
+    results = {}
+    browser_keys = []
+    for key, url in urls.items():
+        email, status = fetched.get(url, (None, NOT_FOUND))
+        if status == NEEDS_BROWSER:
+            if engine == 'auto':
+                browser_keys.append(key)
+                continue
+            status = NOT_FOUND
+        results[key] = (email, status)
+    return results, browser_keys
+
+
+def extract_websites(websites, engine='auto', pool=None, limiter=None, on_result=None):
+    """
+    Extract emails from many websites: over HTTP first, then in Chrome where needed.
+
+    Args:
+        websites (dict): key -> website as written in the sheet
+        engine (str): 'http', 'browser' or 'auto'
+        pool (DriverPool): Shared Chrome sessions; a private pool is created and closed if needed
+        limiter (AdaptiveConcurrency): Controls how many Chrome fetches run at once; an adaptive
+            one bounded by the pool size is created if omitted
+        on_result (callable): callback(key, email, status, reason) called as each website finishes
+
+    Returns:
+        AdaptiveConcurrency: The limiter used, for the run report
+    """
+    host_scheduler.scheduler.prefetch([normalize_url(website) for website in websites.values()])
+    if engine in ('http', 'auto'):
+        results, browser_keys = process_http(websites, engine)
+        for key, (email, status) in results.items():
+            on_result(key, email, status, 'unreachable over HTTP' if status == ERROR else None)
+        if browser_keys:
+            print(f"🌐 {len(browser_keys)} websites need a browser to render")
+    else:
+        browser_keys = list(websites)
+
+    own_pool = pool is None and bool(browser_keys)
+    if own_pool:
+        pool = make_pool(limiter.maximum if limiter else DEFAULT_MAX_CONCURRENCY)
+    if limiter is None:
+        limiter = AdaptiveConcurrency(maximum=pool.size if pool else DEFAULT_MAX_CONCURRENCY,
+                                      on_low_memory=pool.trim if pool else None)
+
+    # Every fetch waits for a slot, so the executor only needs enough threads for the ceiling
+    with ThreadPoolExecutor(max_workers=limiter.maximum) as executor:
+        future_to_key = {
+            executor.submit(limited_extract, websites[key], pool, limiter): key
+            for key in browser_keys
+        }
+
+        for future in as_completed(future_to_key):
+            key = future_to_key[future]
+            try:
+                email, status = future.result()
+                on_result(key, email, status, 'no page could be loaded in Chrome' if status == ERROR else None)
+            except Exception as e:
+                print(f"❌ Error on {websites[key]}: {e}")
+                on_result(key, 'ERROR: ' + str(e), ERROR, str(e))
+
+    if own_pool:
+        print_pool_metrics(pool)
+        pool.close()
+    if browser_keys:
+        print(f"🎚️ Chrome concurrency: {limiter.minimum}-{limiter.maximum}, peaked at {limiter.summary()['peak']}, "
+              f"ended at {limiter.limit}")
+    return limiter
+
+
+def updated_path(excel_file):
+    """Where the results of a sheet are saved: data/<name>_updated with the same extension."""
+    base, extension = os.path.splitext(os.path.basename(excel_file))
+    return os.path.join(DATA_DIR, f"{base}_updated{extension}")
+
+
+def partial_path(excel_file):
+    """Where a streamed run writes its results until the sheet is done: data/<name>_updated.partial.<ext>"""
+    base, extension = os.path.splitext(updated_path(excel_file))
+    return f"{base}.partial{extension}"
+
+
+def resume_writer(partial):
+    """
+    Open a TableWriter on the partial output of a streamed run, keeping the rows an interrupted run left in it.
+
+    CSV files are appended to in place. Parquet and Excel files cannot be
+    appended to, so their rows are copied into a new file first. An unreadable
+    file (e.g. a Parquet run that was killed before its footer was written) is
+    started over.
+
+    Returns:
+        TableWriter: Positioned after the rows already written; a new one if there is nothing to resume
+    """
+    root, extension = os.path.splitext(partial)
+    previous = f"{root[:-len('.partial')]}.previous{extension}"
+    # A copy interrupted earlier left the original rows in `previous`
+    source = previous if os.path.exists(previous) else partial
+    if not os.path.exists(source):
+        return TableWriter(partial)
+    try:
+        if partial.endswith('.csv') and source == partial:
+            return TableWriter(partial, rows=sum(len(chunk) for chunk in read_chunks(partial)))
+        if source == partial:
+            os.replace(partial, previous)
+        writer = TableWriter(partial)
+        for chunk in read_chunks(previous):
+            writer.append(chunk)
+    except Exception as e:
+        print(f"⚠️ Could not read {source} ({e}), starting over")
+        return TableWriter(partial)
+    os.remove(previous)
+    return writer
+
+
+def save_results(df, excel_file, store=None):
+    """
+    Save a sheet with its Email column filled in as data/<name>_updated with the same extension.
+
+    Args:
+        df (DataFrame): The rows of `excel_file` with emails
+        excel_file (str): Path of the input sheet
+        store: Output store that also receives the rows, partitioned by the input file name
+
+    Returns:
+        str: Path of the _updated file
+    """
+    import pandas as pd
+    base = os.path.splitext(os.path.basename(excel_file))[0]
+    output_file = updated_path(excel_file)
+    with metrics.timer('excel_write'):
+        # An interrupted write must not leave an _updated file that marks the sheet as done
+        write_table(df, partial_path(excel_file))
+        os.replace(partial_path(excel_file), output_file)
+    print(f"\n✅ Done. Results saved to: {output_file}")
+    if store is not None:
+        with metrics.timer('store_write'):
+            store.write_partition(base, df.where(pd.notna(df), None).to_dict('records'))
+        print(f"✅ Rows saved to {store.location(base)}")
+    return output_file
+
+
+def fill_emails(df, engine='auto', pool=None, cache=None, limiter=None, processed=0, total=None):
+    """
+    Fill in the Email column of a DataFrame in place.
+
+    Args:
+        df (DataFrame): Rows with a Website column; a whole sheet or one chunk of it
+        engine, pool, limiter: As for extract_websites
+        cache (EmailCache): Domain-keyed result cache; fresh entries skip the network
+        processed (int): Websites already done in earlier chunks, for the progress lines
+        total (int): Websites in the whole sheet if known, for the progress lines
+
+    Returns:
+        tuple: (the limiter used, websites processed including earlier chunks)
+    """
+    import pandas as pd
+    df['Email'] = df['Email'].astype(object) if 'Email' in df else None
+    progress = (lambda: f"{processed}/{total}") if total else (lambda: f"{processed}")
+
+    # Rows on the same site are fetched once when the cache is on
+    groups = {}
+    for idx, website in df['Website'].items():
+        if pd.isna(website):
+            continue
+        if cache is not None:
+            entry = cache.get(normalize_url(website))
+            if entry:
+                df.at[idx, 'Email'] = entry.email
+                processed += 1
+                print(f"[cache] {'✔️ Found' if entry.email else '❌ No'} email on {website}: {entry.email or 'N/A'}")
+                continue
+            key = site_key(normalize_url(website)) or idx
+        else:
+            key = idx
+        groups.setdefault(key, []).append(idx)
+
+    def record(key, email, status, reason=None):
+        nonlocal processed
+        for idx in groups[key]:
+            df.at[idx, 'Email'] = email
+            processed += 1
+        website = df.at[groups[key][0], 'Website']
+        if cache is not None and normalize_url(website):
+            cache.put(normalize_url(website), email if status != ERROR else None, status, reason)
+        print(f"[{progress()}] {'✔️ Found' if email else '❌ No'} email on {website}: {email or 'N/A'}")
+
+    websites = {key: df.at[rows[0], 'Website'] for key, rows in groups.items()}
+    limiter = extract_websites(websites, engine, pool, limiter, record)
+    return limiter, processed
+
+
+def write_run_report(output_file, excel_file, engine, websites, limiter, rss, rows, **extra):
+    """Write the run report of a sheet, with peak memory next to the input size."""
+    input_mb = round(os.path.getsize(excel_file) / 2 ** 20, 1)
+    metrics.write_report(report_path(output_file), input=excel_file, engine=engine, websites=websites,
+                         concurrency=limiter.summary() if limiter else None, input_rows=rows, input_mb=input_mb,
+                         peak_rss_mb=rss.peak_mb, **extra)
+    print(f"📈 Run report saved to {report_path(output_file)}")
+    print(f"🧠 Peak RSS {rss.peak_mb} MB for {rows} rows ({input_mb} MB input)")
+
+
 # Batch mode using Excel
-def batch_process_from_excel(excel_file):
+def batch_process_from_excel(excel_file, engine='auto', pool=None, cache=None, store=None, limiter=None,
+                             chunk_rows=None):
+    """
+    Fill in the Email column of a sheet and save it as <name>_updated with the same extension.
+
+    Args:
+        excel_file (str): Path to the .xlsx, .csv or .parquet file produced by the Maps scraper
+        engine (str): 'http', 'browser' or 'auto'
+        pool (DriverPool): Shared Chrome sessions; a private pool is created and closed if omitted
+        cache (EmailCache): Domain-keyed result cache; fresh entries skip the network
+        store: Output store that also receives the rows, partitioned by the input file name
+        limiter (AdaptiveConcurrency): Controls how many Chrome fetches run at once; an adaptive
+            one bounded by the pool size is created if omitted
+        chunk_rows (int): Stream the sheet this many rows at a time (see stream_process_from_excel)
+    """
     # Check if Excel file exists
     print("in batch_process_from_excel")
     if not os.path.exists(excel_file):
         raise FileNotFoundError(f"Excel file not found: {excel_file}")
+    if chunk_rows:
+        return stream_process_from_excel(excel_file, engine, pool, cache, store, limiter, chunk_rows)
+
+    metrics.start_run()
+    hits_before = cache.hits if cache else 0
+    misses_before = cache.misses if cache else 0
+
+    # Memory of this process only: Chrome sessions are bounded by the pool
+    with RssMonitor(children=False) as rss:
+        print(f"📊 Loading data from {excel_file}")
+        df = read_table(excel_file)
+        total_websites = int(df['Website'].notna().sum())
+        print(f"🔍 Found {total_websites} websites to process")
+
+        limiter, processed = fill_emails(df, engine, pool, cache, limiter, total=total_websites)
+        output_file = save_results(df, excel_file, store)
 
-    print(f"📊 Loading data from {excel_file}")
-    df = pd.read_excel(excel_file)
-    
-    total_websites = len(df[pd.notna(df['Website'])])
-    print(f"🔍 Found {total_websites} websites to process")
-    
+    write_run_report(output_file, excel_file, engine, total_websites, limiter, rss, len(df))
+    print(f"📊 Summary: Processed {processed} websites")
+    if cache is not None:
+        print(f"💾 Cache: {cache.hits - hits_before} hits, {cache.misses - misses_before} misses")
+
+
+def stream_process_from_excel(excel_file, engine='auto', pool=None, cache=None, store=None, limiter=None,
+                              chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    batch_process_from_excel for sheets too large to hold in memory.
+
+    The sheet is read `chunk_rows` rows at a time and each chunk is written to
+    the _updated file (and appended to the store) as soon as its websites are
+    done, so memory stays flat whatever the sheet size. Until the last chunk is
+    written the output is data/<name>_updated.partial.<ext>, which is renamed to
+    the _updated file only when the sheet is done, so an interrupted sheet is
+    still pending for the batch script. Running the sheet again resumes after
+    the rows the partial file holds. Only rows on the same site within a chunk
+    are fetched once, unless the cache is on.
+    """
+    import pandas as pd
+    metrics.start_run()
+    hits_before = cache.hits if cache else 0
+    misses_before = cache.misses if cache else 0
+    base = os.path.splitext(os.path.basename(excel_file))[0]
+    output_file = updated_path(excel_file)
+    # One pool for every chunk; Chrome only starts if a site needs it
+    own_pool = pool is None and engine != 'http'
+    if own_pool:
+        pool = make_pool(limiter.maximum if limiter else DEFAULT_MAX_CONCURRENCY)
     processed = 0
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_index = {
-            executor.submit(extract_email_from_website, row['Website']): index
-            for index, row in df.iterrows()
-            if pd.notna(row['Website'])
-        }
+    websites = 0
 
-        for future in as_completed(future_to_index):
-            idx = future_to_index[future]
-            website = df.at[idx, 'Website']
-            try:
-                email = future.result()
-                df.at[idx, 'Email'] = email
-                processed += 1
-                print(f"[{processed}/{total_websites}] {'✔️ Found' if email else '❌ No'} email on {website}: {email or 'N/A'}")
-            except Exception as e:
-                print(f"❌ Error on {website}: {e}")
-                df.at[idx, 'Email'] = 'ERROR: ' + str(e)
+    partial = partial_path(excel_file)
+    print(f"📊 Streaming {excel_file} in chunks of {chunk_rows} rows to {output_file}")
+    try:
+        writer = resume_writer(partial)
+        with RssMonitor(children=False) as rss, writer:
+            done = writer.rows
+            if done:
+                print(f"⏩ Resuming after the {done} rows already in {partial}")
+            for chunk in read_chunks(excel_file, chunk_rows):
+                # The index counts rows across chunks
+                chunk = chunk[chunk.index >= done]
+                if chunk.empty:
+                    continue
+                websites += int(chunk['Website'].notna().sum())
+                limiter, processed = fill_emails(chunk, engine, pool, cache, limiter, processed)
+                with metrics.timer('excel_write'):
+                    writer.append(chunk)
+                if store is not None:
+                    records = chunk.where(pd.notna(chunk), None).to_dict('records')
+                    with metrics.timer('store_write'):
+                        if writer.rows == len(chunk):
+                            store.write_partition(base, records)
+                        else:
+                            store.append(base, records)
+                print(f"💾 {writer.rows} rows written to {partial}")
+    finally:
+        if own_pool:
+            print_pool_metrics(pool)
+            pool.close()
+    os.replace(partial, output_file)
 
-    output_file = os.path.join(DATA_DIR, os.path.basename(excel_file).replace(".xlsx", "_updated.xlsx"))
-    df.to_excel(output_file, index=False)
     print(f"\n✅ Done. Results saved to: {output_file}")
+    write_run_report(output_file, excel_file, engine, websites, limiter, rss, writer.rows, chunk_rows=chunk_rows)
     print(f"📊 Summary: Processed {processed} websites")
+    if cache is not None:
+        print(f"💾 Cache: {cache.hits - hits_before} hits, {cache.misses - misses_before} misses")
+
+
+def add_cache_arguments(parser):
+    """Add the result cache options shared by the email extraction CLIs."""
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help=f'Result cache file (default: {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--no-cache', action='store_true', help='Always fetch websites, ignoring the cache')
+    parser.add_argument('--ttl-found-days', type=float, default=DEFAULT_TTL_FOUND / DAY,
+                        help='Days a found email stays cached')
+    parser.add_argument('--ttl-not-found-days', type=float, default=DEFAULT_TTL_NOT_FOUND / DAY,
+                        help='Days a "no email" result stays cached')
+    parser.add_argument('--ttl-error-days', type=float, default=DEFAULT_TTL_ERROR / DAY,
+                        help='Days a failed fetch stays cached')
+
+
+def make_cache(args):
+    """Create the EmailCache described by parsed CLI arguments, or None with --no-cache."""
+    if args.no_cache:
+        return None
+    return EmailCache(args.cache, ttl_found=args.ttl_found_days * DAY,
+                      ttl_not_found=args.ttl_not_found_days * DAY, ttl_error=args.ttl_error_days * DAY)
+
+
+def add_store_arguments(parser):
+    """Add the output store options shared by the email extraction CLIs."""
+    parser.add_argument('--store', choices=STORE_KINDS + ['none'], default=DEFAULT_STORE_KIND,
+                        help=f'Output store that also receives the results (default: {DEFAULT_STORE_KIND})')
+    parser.add_argument('--store-path', help='Output store location (default: depends on the backend)')
+
+
+def make_store(args):
+    """Open the output store described by parsed CLI arguments, or None with --store none."""
+    if args.store == 'none':
+        return None
+    return open_store(args.store, args.store_path)
+
+
+def add_metrics_arguments(parser, profile=True):
+    """
+    Add the profiling, live metrics and resource policy options shared by the email extraction CLIs.
+
+    Long-running commands without a run to profile pass profile=False to leave out --profile.
+    """
+    parser.add_argument('--resource-policy', choices=list(POLICIES), default=resource_policy.policy,
+                        help=f'Resources Chrome skips: off, lean or strict (default: {resource_policy.policy})')
+    if profile:
+        parser.add_argument('--profile', nargs='?', const='sample', choices=PROFILE_MODES,
+                            help='Profile the run: sample (all threads, default) or cprofile')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Serve live timers and counters in Prometheus format on this port')
+
+
+def add_concurrency_arguments(parser):
+    """Add the Chrome concurrency options shared by the email extraction CLIs."""
+    parser.add_argument('--concurrency', type=int,
+                        help='Pin the number of websites loading in Chrome at once, e.g. for benchmarks '
+                             '(default: adapt between --min-concurrency and --max-concurrency)')
+    parser.add_argument('--min-concurrency', type=int, default=DEFAULT_MIN_CONCURRENCY,
+                        help=f'Lowest adaptive concurrency (default: {DEFAULT_MIN_CONCURRENCY})')
+    parser.add_argument('--max-concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help=f'Highest adaptive concurrency (default: {DEFAULT_MAX_CONCURRENCY}, the CPU count)')
+    parser.add_argument('--start-concurrency', type=int, default=DEFAULT_START_CONCURRENCY,
+                        help=f'Adaptive concurrency to start from (default: {DEFAULT_START_CONCURRENCY})')
+
+
+def add_host_arguments(parser):
+    """Add the per-host politeness and circuit breaker options shared by the email extraction CLIs."""
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                        help=f'Requests to one site (registrable domain) at the same time (default: {DEFAULT_PER_HOST})')
+    parser.add_argument('--host-delay', type=float, default=DEFAULT_HOST_DELAY,
+                        help=f'Seconds between two requests to one site (default: {DEFAULT_HOST_DELAY})')
+    parser.add_argument('--per-ip', type=int, default=DEFAULT_PER_IP,
+                        help=f'Requests to one IP address at the same time, across the sites it hosts '
+                             f'(default: {DEFAULT_PER_IP})')
+    parser.add_argument('--breaker-failures', type=int, default=DEFAULT_FAILURE_THRESHOLD,
+                        help=f'Connection failures in a row before a host is skipped (default: {DEFAULT_FAILURE_THRESHOLD})')
+    parser.add_argument('--breaker-cooldown', type=float, default=DEFAULT_COOLDOWN,
+                        help=f'Seconds a failing host is skipped before it is tried again (default: {DEFAULT_COOLDOWN})')
+
+
+def add_chunk_arguments(parser):
+    """Add the streaming option shared by the email extraction CLIs."""
+    parser.add_argument('--chunk-rows', type=int, nargs='?', const=DEFAULT_CHUNK_ROWS,
+                        help=f'Stream large sheets this many rows at a time, writing results as they finish '
+                             f'(default without a value: {DEFAULT_CHUNK_ROWS}; off unless given)')
+
+
+def install_scheduler(args):
+    """Install the HostScheduler described by parsed CLI arguments for this process."""
+    host_scheduler.install(HostScheduler(args.per_host, args.host_delay, args.breaker_failures, args.breaker_cooldown,
+                                         args.per_ip))
+
+
+def pool_size(args):
+    """Chrome sessions to allow: --pool-size, else as many as the concurrency can use."""
+    return args.pool_size or args.concurrency or args.max_concurrency
+
+
+def profile_file(mode):
+    """Where --profile saves its full results."""
+    return os.path.join(DATA_DIR, 'email_profile.' + ('prof' if mode == 'cprofile' else 'txt'))
 
 
 def run_on_data_dir():
@@ -136,10 +645,43 @@ def run_on_data_dir():
 if __name__ == "__main__":
     try:
         parser = argparse.ArgumentParser(description='Extract emails from websites listed in Excel file')
-        parser.add_argument('--excel', required=True, help='Path to Excel file')
+        parser.add_argument('--excel', required=True, help='Path to the .xlsx, .csv or .parquet input file')
+        parser.add_argument('--engine', choices=['http', 'browser', 'auto'], default='auto',
+                            help='http: plain requests only, browser: Chrome only, '
+                                 'auto: HTTP first and Chrome for pages that need JavaScript (default: auto)')
+        parser.add_argument('--pool-size', type=int,
+                            help='Maximum number of Chrome sessions (default: the concurrency ceiling)')
+        parser.add_argument('--recycle-pages', type=int, default=DEFAULT_RECYCLE_PAGES,
+                            help=f'Restart a Chrome session after this many pages (default: {DEFAULT_RECYCLE_PAGES})')
+        parser.add_argument('--recycle-memory-mb', type=int, default=DEFAULT_RECYCLE_MEMORY_MB,
+                            help=f'Restart a Chrome session above this memory use (default: {DEFAULT_RECYCLE_MEMORY_MB})')
+        parser.add_argument('--checkout-timeout', type=float, default=DEFAULT_CHECKOUT_TIMEOUT,
+                            help=f'Seconds to wait for a free Chrome session (default: {DEFAULT_CHECKOUT_TIMEOUT})')
+        add_cache_arguments(parser)
+        add_store_arguments(parser)
+        add_metrics_arguments(parser)
+        add_concurrency_arguments(parser)
+        add_host_arguments(parser)
+        add_chunk_arguments(parser)
+        add_service_arguments(parser)
         args = parser.parse_args()
-        
-        batch_process_from_excel(args.excel)
+
+        if args.remote:
+            job = run_remote(args.remote, 'emails', {'file': os.path.abspath(args.excel), 'engine': args.engine,
+                                                     'chunk_rows': args.chunk_rows})
+            exit(1 if job['state'] == FAILED else 0)
+
+        resource_policy.set_policy(args.resource_policy)
+        install_scheduler(args)
+        if args.metrics_port:
+            metrics.serve(args.metrics_port)
+        cache = make_cache(args)
+        store = make_store(args)
+        with make_pool(pool_size(args), args.recycle_pages, args.recycle_memory_mb, args.checkout_timeout) as pool:
+            with profiled(args.profile, profile_file(args.profile)):
+                batch_process_from_excel(args.excel, args.engine, pool, cache, store, make_limiter(args, pool),
+                                         args.chunk_rows)
+            print_pool_metrics(pool)
     except Exception as e:
         print(f"\n❌ Fatal error: {str(e)}")
         exit(1)
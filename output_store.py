@@ -0,0 +1,395 @@
+import os
+import json
+import glob
+import time
+import sqlite3
+import argparse
+
+# Create data directory if it doesn't exist
+DATA_DIR = 'data'
+os.makedirs(DATA_DIR, exist_ok=True)
+
+PARTITION_COLUMN = 'partition'
+STORE_KINDS = ['csv', 'parquet', 'sqlite']
+DEFAULT_STORE_KIND = 'csv'
+DEFAULT_STORE_PATHS = {
+    'csv': os.path.join(DATA_DIR, 'store'),
+    'parquet': os.path.join(DATA_DIR, 'store_parquet'),
+    'sqlite': os.path.join(DATA_DIR, 'store.sqlite'),
+}
+DEFAULT_CONSOLIDATED = os.path.join(DATA_DIR, 'all_emails.csv')
+CONSOLIDATED_COLUMNS = ['Business Name', 'Website', 'Email', PARTITION_COLUMN]
+DEFAULT_CHUNK_ROWS = 1000
+
+
+def partition_name(location, service):
+    """Partition for one location/service scrape, matching the per-location file names."""
+    return f'{location.replace(" ", "_")}_{service}'
+
+
+def read_table(path):
+    """Read an .xlsx, .csv or .parquet file into a DataFrame."""
+    import pandas as pd
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_excel(path)
+
+
+def write_table(df, path):
+    """Write a DataFrame as .xlsx, .csv or .parquet depending on the file extension."""
+    if path.endswith('.csv'):
+        df.to_csv(path, index=False)
+    elif path.endswith('.parquet'):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+
+
+def read_chunks(path, rows=DEFAULT_CHUNK_ROWS):
+    """
+    Read an .xlsx, .csv or .parquet file as DataFrames of at most `rows` rows, without loading it whole.
+
+    The index keeps counting across chunks, as in the frame read_table returns.
+    Parquet needs pyarrow and Excel needs openpyxl.
+    """
+    import pandas as pd
+    if path.endswith('.csv'):
+        yield from pd.read_csv(path, chunksize=rows)
+        return
+
+    start = 0
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=rows):
+            df = batch.to_pandas()
+            df.index = pd.RangeIndex(start, start + len(df))
+            start += len(df)
+            yield df
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        lines = workbook.active.iter_rows(values_only=True)
+        header = next(lines, None)
+        if header is None:
+            return
+        columns = [name if name is not None else f'Unnamed: {i}' for i, name in enumerate(header)]
+        buffer = []
+        for line in lines:
+            buffer.append(line)
+            if len(buffer) == rows:
+                yield pd.DataFrame(buffer, columns=columns, index=pd.RangeIndex(start, start + rows))
+                start += rows
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns, index=pd.RangeIndex(start, start + len(buffer)))
+    finally:
+        workbook.close()
+
+
+class TableWriter:
+    """
+    Write a table chunk by chunk as .xlsx, .csv or .parquet, depending on the file extension.
+
+    CSV rows are on disk as soon as append() returns. Parquet (needs pyarrow)
+    and Excel (openpyxl's write-only mode) hold little in memory but the file is
+    only complete once close() runs, which a with-block also does on errors.
+    """
+
+    def __init__(self, path, rows=0):
+        """
+        Args:
+            path (str): Output file; the extension picks the format
+            rows (int): Rows already in an existing CSV file at `path`, to append after them
+        """
+        self.path = path
+        self.rows = rows
+        self._writer = None
+        self._schema = None
+        self._sheet = None
+
+    def append(self, df):
+        if self.path.endswith('.csv'):
+            df.to_csv(self.path, mode='a' if self.rows else 'w', header=not self.rows, index=False)
+        elif self.path.endswith('.parquet'):
+            self._append_parquet(df)
+        else:
+            self._append_excel(df)
+        self.rows += len(df)
+
+    def _append_parquet(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            # Columns that are empty in the first chunk may hold text later
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            self._schema = pa.schema([pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+                                      for field in schema])
+            self._writer = pq.ParquetWriter(self.path, self._schema)
+        self._writer.write_table(pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+
+    def _append_excel(self, df):
+        import pandas as pd
+        if self._writer is None:
+            from openpyxl import Workbook
+
+            self._writer = Workbook(write_only=True)
+            self._sheet = self._writer.create_sheet()
+            self._sheet.append(list(df.columns))
+        for row in df.astype(object).where(pd.notna(df), None).itertuples(index=False):
+            self._sheet.append(list(row))
+
+    def close(self):
+        if self._writer is None:
+            return
+        if self.path.endswith('.parquet'):
+            self._writer.close()
+        else:
+            self._writer.save(self.path)
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _frame(records, partition):
+    import pandas as pd
+    df = pd.DataFrame(records)
+    df[PARTITION_COLUMN] = partition
+    return df
+
+
+class CsvStore:
+    """One CSV file per partition in a directory. Appends add rows to the partition's file."""
+
+    def __init__(self, path=DEFAULT_STORE_PATHS['csv']):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, partition):
+        return os.path.join(self.path, f'{partition}.csv')
+
+    def append(self, partition, records):
+        if not records:
+            return
+        file_path = self._file(partition)
+        _frame(records, partition).to_csv(file_path, mode='a', header=not os.path.exists(file_path), index=False)
+
+    def write_partition(self, partition, records):
+        """Replace a partition's rows."""
+        _frame(records, partition).to_csv(self._file(partition), index=False)
+
+    def partitions(self):
+        """partition -> last update time"""
+        files = glob.glob(os.path.join(self.path, '*.csv'))
+        return {os.path.basename(f)[:-4]: os.path.getmtime(f) for f in files}
+
+    def read(self, partitions=None):
+        import pandas as pd
+        names = partitions if partitions is not None else list(self.partitions())
+        frames = [pd.read_csv(self._file(name)) for name in names if os.path.exists(self._file(name))]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def location(self, partition):
+        return self._file(partition)
+
+
+class ParquetStore:
+    """A directory per partition holding one Parquet file per write. Needs pyarrow."""
+
+    def __init__(self, path=DEFAULT_STORE_PATHS['parquet']):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _dir(self, partition):
+        return os.path.join(self.path, partition)
+
+    def append(self, partition, records):
+        if not records:
+            return
+        directory = self._dir(partition)
+        os.makedirs(directory, exist_ok=True)
+        file_path = os.path.join(directory, f'part-{time.time_ns()}.parquet')
+        # Write under a temporary name so readers never see half a file
+        _frame(records, partition).to_parquet(file_path + '.tmp', index=False)
+        os.replace(file_path + '.tmp', file_path)
+
+    def write_partition(self, partition, records):
+        """Replace a partition's rows."""
+        for part in glob.glob(os.path.join(self._dir(partition), '*.parquet')):
+            os.remove(part)
+        self.append(partition, records)
+
+    def partitions(self):
+        """partition -> last update time"""
+        result = {}
+        for directory in glob.glob(os.path.join(self.path, '*')):
+            parts = glob.glob(os.path.join(directory, '*.parquet'))
+            if parts:
+                result[os.path.basename(directory)] = max(os.path.getmtime(p) for p in parts)
+        return result
+
+    def read(self, partitions=None):
+        import pandas as pd
+        names = partitions if partitions is not None else list(self.partitions())
+        frames = [
+            pd.read_parquet(part)
+            for name in names
+            for part in sorted(glob.glob(os.path.join(self._dir(name), '*.parquet')))
+        ]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def location(self, partition):
+        return self._dir(partition)
+
+
+class SqliteStore:
+    """All partitions in one SQLite file, each row stored as JSON."""
+
+    def __init__(self, path=DEFAULT_STORE_PATHS['sqlite']):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records (partition TEXT NOT NULL, data TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS records_partition ON records (partition)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS partitions (partition TEXT PRIMARY KEY, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def append(self, partition, records):
+        if not records:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO records (partition, data) VALUES (?, ?)",
+                [(partition, json.dumps(record, ensure_ascii=False, default=str)) for record in records]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO partitions (partition, updated_at) VALUES (?, ?)", (partition, time.time())
+            )
+
+    def write_partition(self, partition, records):
+        """Replace a partition's rows."""
+        with self._conn:
+            self._conn.execute("DELETE FROM records WHERE partition = ?", (partition,))
+        self.append(partition, records)
+
+    def partitions(self):
+        """partition -> last update time"""
+        return dict(self._conn.execute("SELECT partition, updated_at FROM partitions").fetchall())
+
+    def read(self, partitions=None):
+        import pandas as pd
+        names = partitions if partitions is not None else list(self.partitions())
+        rows = []
+        for name in names:
+            for (data,) in self._conn.execute("SELECT data FROM records WHERE partition = ? ORDER BY rowid", (name,)):
+                record = json.loads(data)
+                record[PARTITION_COLUMN] = name
+                rows.append(record)
+        return pd.DataFrame(rows)
+
+    def location(self, partition):
+        return f'{self.path}#{partition}'
+
+
+STORES = {'csv': CsvStore, 'parquet': ParquetStore, 'sqlite': SqliteStore}
+
+
+def open_store(kind=DEFAULT_STORE_KIND, path=None):
+    """Open an output store of the given kind at `path` (or its default location)."""
+    return STORES[kind](path or DEFAULT_STORE_PATHS[kind])
+
+
+def consolidate(store, output=DEFAULT_CONSOLIDATED, full=False):
+    """
+    Collect every listing with an email into one CSV, replacing concat_mails.ipynb.
+
+    A manifest next to the output remembers each partition's update time, so
+    only partitions written since the last run are read again.
+
+    Args:
+        store: Output store to read from
+        output (str): Consolidated CSV file
+        full (bool): Ignore the manifest and rebuild from every partition
+
+    Returns:
+        tuple: (partitions read, rows in the consolidated file)
+    """
+    import pandas as pd
+    manifest_file = output + '.manifest.json'
+    manifest = {}
+    if not full and os.path.exists(manifest_file) and os.path.exists(output):
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+
+    current = store.partitions()
+    changed = [name for name, updated in current.items() if manifest.get(name) != updated]
+    stale = set(changed) | {name for name in manifest if name not in current}
+
+    if manifest:
+        existing = pd.read_csv(output)
+        existing = existing[~existing[PARTITION_COLUMN].isin(stale)]
+    else:
+        existing = pd.DataFrame(columns=CONSOLIDATED_COLUMNS)
+
+    new = store.read(changed)
+    if 'Email' in new:
+        new = new.dropna(subset=['Email'])
+        new = new[new['Email'].astype(str).str.strip() != '']
+    else:
+        new = pd.DataFrame(columns=CONSOLIDATED_COLUMNS)
+    new = new.reindex(columns=CONSOLIDATED_COLUMNS)
+
+    result = pd.concat([existing, new], ignore_index=True)
+    result.to_csv(output, index=False)
+    with open(manifest_file, 'w') as f:
+        json.dump(current, f)
+    return len(changed), len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the scraper output store')
+    parser.add_argument('--store', choices=STORE_KINDS, default=DEFAULT_STORE_KIND,
+                        help=f'Store backend (default: {DEFAULT_STORE_KIND})')
+    parser.add_argument('--store-path', help='Store location (default: depends on the backend)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help='List partitions and when they were last written')
+
+    merge = commands.add_parser('consolidate', help='Collect all emails into one CSV')
+    merge.add_argument('--output', default=DEFAULT_CONSOLIDATED, help=f'Output CSV (default: {DEFAULT_CONSOLIDATED})')
+    merge.add_argument('--full', action='store_true', help='Re-read every partition instead of only new ones')
+
+    export = commands.add_parser('export', help='Export partitions to an .xlsx, .csv or .parquet file')
+    export.add_argument('output', help='File to write')
+    export.add_argument('--partition', action='append', help='Partition to export (repeatable, default: all)')
+    args = parser.parse_args()
+
+    store = open_store(args.store, args.store_path)
+    if args.command == 'list':
+        for name, updated in sorted(store.partitions().items()):
+            print(f"{name:50} {time.strftime('%Y-%m-%d %H:%M', time.localtime(updated))}")
+    elif args.command == 'consolidate':
+        read, rows = consolidate(store, args.output, args.full)
+        print(f"✅ Read {read} new or changed partitions, {rows} emails saved to {args.output}")
+    elif args.command == 'export':
+        df = store.read(args.partition)
+        write_table(df, args.output)
+        print(f"✅ Exported {len(df)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
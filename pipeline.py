@@ -0,0 +1,127 @@
+import queue
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from http_engine import make_session, extract_one, NEEDS_BROWSER
+from new_email_ext import normalize_url, extract_with_status, make_pool, print_pool_metrics, DEFAULT_POOL_SIZE
+from email_cache import NOT_FOUND, ERROR
+
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_EMAIL_WORKERS = 20
+
+_DONE = object()
+
+
+class EmailStream:
+    """
+    Email extraction that runs next to the Maps scraper in the same process.
+
+    The scraper submits each listing's website as soon as its details are
+    read; a background event loop drains the bounded queue over one shared
+    HTTP session, and pages that need JavaScript go to pooled Chrome
+    sessions. submit() blocks while the queue is full, which slows the
+    scraper down instead of letting the backlog grow without limit.
+    """
+
+    def __init__(self, engine='auto', workers=DEFAULT_EMAIL_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 cache=None, pool=None):
+        """
+        Args:
+            engine (str): 'http', 'browser' or 'auto'
+            workers (int): Websites processed at the same time
+            queue_size (int): Websites that may wait in the queue before submit() blocks
+            cache (EmailCache): Optional domain-keyed result cache
+            pool (DriverPool): Chrome sessions for the browser path; created on first use if omitted
+        """
+        self.engine = engine
+        self.workers = workers
+        self.cache = cache
+        self.pool = pool
+        self._own_pool = pool is None
+        self._pool_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._browser = ThreadPoolExecutor(max_workers=pool.size if pool else DEFAULT_POOL_SIZE)
+        self._results = {}
+        self.max_depth = 0
+        self.blocked_puts = 0
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._consume()), daemon=True)
+        self._thread.start()
+
+    def submit(self, key, website):
+        """Queue a website for extraction, blocking while the queue is full."""
+        url = normalize_url(website) if isinstance(website, str) and website != 'N/A' else None
+        if not url:
+            self._results[key] = None
+            return
+        if self._queue.full():
+            self.blocked_puts += 1
+        self._queue.put((key, url))
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def close(self):
+        """
+        Wait for every queued website to finish.
+
+        Returns:
+            dict: key -> email (None where no email was found)
+        """
+        for _ in range(self.workers):
+            self._queue.put(_DONE)
+        self._thread.join()
+        self._browser.shutdown(wait=True)
+        if self._own_pool and self.pool is not None:
+            print_pool_metrics(self.pool)
+            self.pool.close()
+        return dict(self._results)
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self.pool is None:
+                self.pool = make_pool()
+            return self.pool
+
+    def _browser_extract(self, url):
+        return extract_with_status(url, self._get_pool())
+
+    async def _extract(self, session, url):
+        """
+        Returns:
+            tuple: (email or None, status, reason for an ERROR status)
+        """
+        loop = asyncio.get_running_loop()
+        if self.engine != 'browser':
+            email, status = await extract_one(session, url)
+            if status != NEEDS_BROWSER:
+                return email, status, 'unreachable over HTTP' if status == ERROR else None
+            if self.engine == 'http':
+                return None, NOT_FOUND, None
+        # Crashes, timeouts and unloadable pages come back as ERROR, so they get the short error TTL
+        email, status = await loop.run_in_executor(self._browser, self._browser_extract, url)
+        return email, status, 'no page could be loaded in Chrome' if status == ERROR else None
+
+    async def _worker(self, session):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(None, self._queue.get)
+            if item is _DONE:
+                return
+            key, url = item
+            entry = self.cache.get(url) if self.cache is not None else None
+            if entry:
+                self._results[key] = entry.email
+                continue
+            try:
+                email, status, reason = await self._extract(session, url)
+            except Exception as e:
+                email, status, reason = None, ERROR, str(e)
+            self._results[key] = email
+            if self.cache is not None:
+                self.cache.put(url, email, status, reason)
+            print(f"[email] {'✔️ Found' if email else '❌ No'} email on {url}: {email or 'N/A'}")
+
+    async def _consume(self):
+        # The default executor runs the blocking queue.get() calls, one per worker
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=self.workers))
+        async with make_session(self.workers) as session:
+            await asyncio.gather(*(self._worker(session) for _ in range(self.workers)))
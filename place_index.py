@@ -0,0 +1,84 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from metrics import metrics
+
+# Create data directory if it doesn't exist
+DATA_DIR = 'data'
+os.makedirs(DATA_DIR, exist_ok=True)
+
+DEFAULT_INDEX_PATH = os.path.join(DATA_DIR, 'place_index.sqlite')
+DAY = 24 * 60 * 60
+# Phone numbers and websites change; older entries are scraped again
+DEFAULT_INDEX_TTL_DAYS = 30
+
+
+class PlaceIndex:
+    """
+    Detail-pane data for every Google place ID already scraped, shared across locations.
+
+    Backed by SQLite in WAL mode with a busy timeout, so several scrape
+    worker processes can read and write the same index at once. Each
+    process opens its own connection; writes are single short transactions.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, ttl_days=DEFAULT_INDEX_TTL_DAYS):
+        """
+        Args:
+            path (str): SQLite file
+            ttl_days (float): Ignore entries older than this many days (0 or None to keep them forever)
+        """
+        self.path = path
+        self.ttl = ttl_days * DAY if ttl_days else None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS places (
+                    place_id TEXT PRIMARY KEY,
+                    details TEXT NOT NULL,
+                    location TEXT,
+                    service TEXT,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def get(self, place_id):
+        """Return the stored details dict for a place ID if it is fresh, or None, counting hits and misses."""
+        if not place_id:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT details, updated_at FROM places WHERE place_id = ?",
+                                     (place_id,)).fetchone()
+            if row and (self.ttl is None or time.time() - row[1] <= self.ttl):
+                self.hits += 1
+                metrics.incr('place_index_hits')
+                return json.loads(row[0])
+            self.misses += 1
+        metrics.incr('place_index_misses')
+        return None
+
+    def put(self, place_id, details, location=None, service=None):
+        """Record the details scraped for a place ID. Details without any value are not worth keeping."""
+        if not place_id or not details or not any(details.values()):
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO places (place_id, details, location, service, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (place_id, json.dumps(details, ensure_ascii=False), location, service, time.time())
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
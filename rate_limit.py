@@ -0,0 +1,56 @@
+import time
+import multiprocessing
+
+from metrics import metrics
+
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 5
+
+# Process-wide limiter for Maps traffic, installed by the scheduler in each worker
+limiter = None
+
+
+class TokenBucket:
+    """
+    Token bucket whose state lives in shared memory, so one instance created in
+    the parent process limits every worker process it is passed to.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        """
+        Args:
+            rate (float): Tokens added per second
+            burst (int): Maximum number of tokens that can be saved up
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = multiprocessing.Value('d', float(burst), lock=False)
+        self._updated = multiprocessing.Value('d', time.time(), lock=False)
+        self._lock = multiprocessing.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` tokens are available and take them. Returns seconds waited."""
+        start = time.perf_counter()
+        while True:
+            with self._lock:
+                now = time.time()
+                elapsed = max(now - self._updated.value, 0)
+                self._tokens.value = min(self.burst, self._tokens.value + elapsed * self.rate)
+                self._updated.value = now
+                if self._tokens.value >= tokens:
+                    self._tokens.value -= tokens
+                    return time.perf_counter() - start
+                wait = (tokens - self._tokens.value) / self.rate
+            time.sleep(wait)
+
+
+def install(bucket):
+    """Make `bucket` the limiter used by throttle() in this process."""
+    global limiter
+    limiter = bucket
+
+
+def throttle():
+    """Wait for a Maps request token if a limiter is installed."""
+    if limiter is not None:
+        metrics.observe('rate_limit_wait', limiter.acquire())
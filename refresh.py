@@ -0,0 +1,142 @@
+import os
+import json
+import math
+from collections import namedtuple
+
+
+from feed_parser import format_stars
+from output_store import PARTITION_COLUMN
+
+ADDED = 'added'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+REMOVED = 'removed'
+CHANGE_COLUMN = 'Change'
+
+# changes: listing index -> ADDED, CHANGED or UNCHANGED
+# carried: listing index -> previous row, for unchanged listings
+# removed: previous rows whose listing is no longer in the feed
+Diff = namedtuple('Diff', ['changes', 'carried', 'removed'])
+
+
+def _text(value):
+    """Compare card fields as text; values read back from a store lose "N/A" and turn "12" into 12.0."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 'N/A'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def snapshot_key(place_id, name, address):
+    """Key matching a listing to its previous row: the place ID, else name and address."""
+    place_id = _text(place_id)
+    return place_id if place_id != 'N/A' else f"{_text(name)}|{_text(address)}"
+
+
+def listing_fingerprint(listing):
+    return _text(listing.place_id), _text(listing.name), format_stars(listing.stars), _text(listing.reviews)
+
+
+def row_fingerprint(row):
+    return _text(row.get('Place ID')), _text(row.get('Business Name')), format_stars(row.get('Stars')), \
+        _text(row.get('Number of Reviews'))
+
+
+def same_listing(row, listing):
+    """
+    Whether a previous row still describes a listing.
+
+    Stars and review count are only compared when both sides have them: the
+    dom backend leaves them "N/A" on cards it reads no rating from, while the
+    network backend has one for every rated place.
+    """
+    old, new = row_fingerprint(row), listing_fingerprint(listing)
+    return old[:2] == new[:2] and all(a == b or 'N/A' in (a, b) for a, b in zip(old[2:], new[2:]))
+
+
+def load_snapshot(store, partition):
+    """
+    The rows saved by the last run of a location/service, keyed by snapshot_key.
+
+    Rows that run already marked as removed are left out, so a vanished
+    listing is only reported once.
+    """
+    import pandas as pd
+    df = store.read([partition])
+    if df.empty:
+        return {}
+    df = df.drop(columns=[PARTITION_COLUMN], errors='ignore').astype(object)
+    snapshot = {}
+    for row in df.where(pd.notna(df), None).to_dict('records'):
+        if row.get(CHANGE_COLUMN) == REMOVED:
+            continue
+        row = {column: ('' if column == 'Email' else 'N/A') if value is None else value
+               for column, value in row.items()}
+        snapshot[snapshot_key(row.get('Place ID'), row.get('Business Name'), row.get('Address'))] = row
+    return snapshot
+
+
+def diff_listings(listings, previous):
+    """
+    Compare freshly parsed feed cards with the previous snapshot.
+
+    A listing is unchanged when its place ID, name, stars and review count
+    all match its previous row (see same_listing).
+
+    Returns:
+        Diff
+    """
+    changes = {}
+    carried = {}
+    seen = set()
+    for idx, listing in enumerate(listings):
+        key = snapshot_key(listing.place_id, listing.name, listing.address)
+        seen.add(key)
+        row = previous.get(key)
+        if row is None:
+            changes[idx] = ADDED
+        elif not same_listing(row, listing):
+            changes[idx] = CHANGED
+        else:
+            changes[idx] = UNCHANGED
+            carried[idx] = row
+    removed = [row for key, row in previous.items() if key not in seen]
+    return Diff(changes, carried, removed)
+
+
+def needs_email(row):
+    """
+    Whether a carried row should still go through email extraction: its last
+    run found no email or failed. The email cache skips the ones it already
+    has a fresh result for.
+    """
+    email = _text(row.get('Email'))
+    return email in ('', 'N/A') or email.startswith('ERROR')
+
+
+def diff_counts(diff):
+    """Number of added, changed, removed and unchanged listings."""
+    counts = dict.fromkeys([ADDED, CHANGED, REMOVED, UNCHANGED], 0)
+    for change in diff.changes.values():
+        counts[change] += 1
+    counts[REMOVED] = len(diff.removed)
+    return counts
+
+
+def full_run_seconds(report_file, listings):
+    """
+    How long a full scrape of `listings` listings would take, from the last run report of the partition.
+
+    A refresh run's report carries its own estimate forward; a full run's
+    elapsed time is scaled to the new listing count. None without a report.
+    """
+    if not os.path.exists(report_file):
+        return None
+    with open(report_file) as f:
+        report = json.load(f)
+    previous = report.get('refresh') or {}
+    seconds = previous.get('full_run_seconds') or report.get('elapsed')
+    if not seconds or not report.get('listings'):
+        return None
+    return seconds * listings / report['listings']
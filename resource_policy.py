@@ -0,0 +1,125 @@
+import os
+import json
+import threading
+
+from metrics import metrics
+
+# Resource groups as Network.setBlockedURLs patterns ('*' matches anything)
+RESOURCE_GROUPS = {
+    'images': ['*.png', '*.png?*', '*.jpg', '*.jpg?*', '*.jpeg', '*.jpeg?*', '*.gif', '*.gif?*', '*.webp',
+               '*.webp?*', '*.avif', '*.avif?*', '*.svg', '*.svg?*', '*.ico', '*.ico?*',
+               '*googleusercontent.com/*', '*streetviewpixels-pa.googleapis.com/*', '*/maps/vt?*',
+               '*/maps/vt/*', '*khms*.google.com/*'],
+    'media': ['*.mp4', '*.mp4?*', '*.webm', '*.webm?*', '*.mp3', '*.mp3?*', '*.m3u8', '*.m3u8?*', '*.ogg',
+              '*youtube.com/embed/*', '*player.vimeo.com/*'],
+    'fonts': ['*.woff', '*.woff?*', '*.woff2', '*.woff2?*', '*.ttf', '*.ttf?*', '*.otf', '*.otf?*',
+              '*fonts.gstatic.com/*', '*fonts.googleapis.com/*', '*use.typekit.net/*'],
+    'trackers': ['*google-analytics.com/*', '*googletagmanager.com/*', '*doubleclick.net/*',
+                 '*googlesyndication.com/*', '*googleadservices.com/*', '*adservice.google.*',
+                 '*connect.facebook.net/*', '*facebook.com/tr*', '*hotjar.com/*', '*clarity.ms/*',
+                 '*tiktok.com/i18n/pixel*', '*analytics.tiktok.com/*', '*snap.licdn.com/*', '*bat.bing.com/*',
+                 '*scorecardresearch.com/*', '*quantserve.com/*', '*criteo.com/*', '*taboola.com/*',
+                 '*outbrain.com/*', '*newrelic.com/*', '*nr-data.net/*', '*sentry.io/*', '*cookiebot.com/*'],
+    'stylesheets': ['*.css', '*.css?*'],
+}
+
+# Policy name -> resource groups it blocks
+POLICIES = {
+    'off': [],
+    'lean': ['images', 'media', 'fonts', 'trackers'],
+    'strict': ['images', 'media', 'fonts', 'trackers', 'stylesheets'],
+}
+DEFAULT_POLICY = 'lean'
+
+# Groups a stage always loads, whatever the policy. The Maps feed and detail pane
+# only scroll and lay out correctly with their stylesheets.
+STAGE_EXCEPTIONS = {
+    'maps': {'stylesheets'},
+    'place': {'stylesheets'},
+    'email': set(),
+}
+
+# Typical transfer size per resource type, used until the run has seen real ones
+DEFAULT_SIZES = {'Image': 30000, 'Media': 500000, 'Font': 40000, 'Script': 40000, 'Stylesheet': 20000}
+DEFAULT_SIZE = 10000
+
+# Policy used by every driver created in this process, set with set_policy()
+policy = os.environ.get('GMS_RESOURCE_POLICY', DEFAULT_POLICY)
+
+# resource type -> [bytes loaded, responses], for estimating the bytes blocked requests would have cost
+_sizes = {}
+_sizes_lock = threading.Lock()
+
+
+def set_policy(name):
+    """Make `name` the policy applied to drivers created from now on in this process."""
+    global policy
+    if name not in POLICIES:
+        raise ValueError(f"Unknown resource policy: {name}")
+    policy = name
+
+
+def blocked_patterns(name, stage):
+    """URL patterns a policy blocks for a stage ('maps', 'place' or 'email')."""
+    exceptions = STAGE_EXCEPTIONS.get(stage, set())
+    return [pattern for group in POLICIES[name] if group not in exceptions for pattern in RESOURCE_GROUPS[group]]
+
+
+def configure_options(options, capture=False):
+    """
+    Enable the performance log the blocked-request counters are read from. Call before creating the driver.
+
+    `capture` enables it whatever the policy, for reading response bodies (see maps_payload.py).
+    """
+    if policy != 'off' or capture:
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+
+def apply_policy(driver, stage):
+    """Install the current policy's blocked URL patterns on a new driver through the DevTools protocol."""
+    patterns = blocked_patterns(policy, stage)
+    if not patterns:
+        return
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+
+
+def record_network(driver, entries=None):
+    """
+    Drain the driver's performance log into the run metrics.
+
+    Counts blocked requests (per resource type) and bytes actually loaded, and
+    estimates bytes saved from the average size of loaded resources of the
+    same type. Call after each page; the log is buffered until read. Pass
+    `entries` when the caller already drained the log for other uses.
+    """
+    if entries is None:
+        if policy == 'off':
+            return
+        try:
+            entries = driver.get_log('performance')
+        except Exception:
+            return
+    types = {}
+    for entry in entries:
+        message = json.loads(entry['message'])['message']
+        method = message.get('method')
+        params = message.get('params', {})
+        if method == 'Network.requestWillBeSent':
+            types[params['requestId']] = params.get('type', 'Other')
+        elif method == 'Network.loadingFinished':
+            size = params.get('encodedDataLength', 0)
+            kind = types.get(params['requestId'], 'Other')
+            with _sizes_lock:
+                totals = _sizes.setdefault(kind, [0, 0])
+                totals[0] += size
+                totals[1] += 1
+            metrics.incr('bytes_loaded', int(size))
+        elif method == 'Network.loadingFailed' and params.get('blockedReason'):
+            kind = params.get('type') or types.get(params['requestId'], 'Other')
+            with _sizes_lock:
+                loaded, count = _sizes.get(kind, (0, 0))
+            metrics.incr('blocked_requests')
+            metrics.incr(f'blocked_{kind.lower()}')
+            estimate = int(loaded / count) if count else DEFAULT_SIZES.get(kind, DEFAULT_SIZE)
+            metrics.incr('bytes_saved_estimate', estimate)
@@ -0,0 +1,588 @@
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+import http.client
+import socketserver
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Create data directory if it doesn't exist
+DATA_DIR = 'data'
+os.makedirs(DATA_DIR, exist_ok=True)
+
+DEFAULT_PORT = 8765
+DEFAULT_ADDRESS = f'http://127.0.0.1:{DEFAULT_PORT}'
+# Address the CLIs send their work to when it is set: an http:// URL or unix:<socket path>
+SERVICE_ENV = 'GMS_SERVICE'
+DEFAULT_WARM = 2
+DEFAULT_KEEP_JOBS = 200
+
+# Job kinds
+SCRAPE = 'scrape'
+EMAILS = 'emails'
+KINDS = [SCRAPE, EMAILS]
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+FINISHED = (DONE, FAILED)
+
+# Heavy modules loaded once when the service starts instead of by every job
+PRELOAD = ['pandas', 'selenium.webdriver', 'aiohttp', 'gms', 'new_email_ext', 'pipeline', 'http_engine']
+
+
+class ServiceError(Exception):
+    """The service rejected a request or could not be reached."""
+
+
+class ServiceJob:
+    """One scrape or email-extraction job: its arguments, state and the events streamed to clients."""
+
+    def __init__(self, job_id, kind, args):
+        self.id = job_id
+        self.kind = kind
+        self.args = args
+        self.state = QUEUED
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.events = []
+        self._changed = threading.Condition()
+
+    def emit(self, event):
+        with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    def set_state(self, state, result=None, error=None):
+        with self._changed:
+            self.state = state
+            if state == RUNNING:
+                self.started = time.time()
+            if state in FINISHED:
+                self.finished = time.time()
+                self.result = result
+                self.error = error
+            self.events.append({'type': 'state', 'state': state})
+            self._changed.notify_all()
+
+    def wait_events(self, after, timeout):
+        """Events after the first `after`, waiting up to `timeout` seconds for new ones. Returns (events, finished)."""
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events) > after or self.state in FINISHED, timeout)
+            return self.events[after:], self.state in FINISHED
+
+    def summary(self):
+        return {'id': self.id, 'kind': self.kind, 'args': self.args, 'state': self.state, 'result': self.result,
+                'error': self.error, 'created': self.created, 'started': self.started, 'finished': self.finished,
+                'events': len(self.events)}
+
+
+class JobOutput:
+    """
+    Stand-in for sys.stdout that copies every line printed while a job runs into the job's events.
+
+    Jobs run one at a time, so everything printed in the meantime, including by
+    the job's worker threads, belongs to the running job.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.job = None
+        self._partial = ''
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        self.stream.write(text)
+        with self._lock:
+            if self.job is None:
+                return len(text)
+            lines = (self._partial + text).split('\n')
+            self._partial = lines.pop()
+            for line in lines:
+                self.job.emit({'type': 'log', 'line': line})
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def attach(self, job):
+        with self._lock:
+            if self.job is not None and self._partial:
+                self.job.emit({'type': 'log', 'line': self._partial})
+            self.job = job
+            self._partial = ''
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class ScrapeService:
+    """
+    Long-lived process that runs scrape and email-extraction jobs with warm state.
+
+    The heavy modules are imported once, and the Chrome sessions for place pages
+    and email extraction, the email cache, the output store and the learned
+    Chrome concurrency are kept between jobs, so a job starts working right
+    away instead of paying for imports and cold browsers. Jobs run one at a
+    time in submission order; the metrics registry is per process and reset by
+    each job.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.jobs = OrderedDict()
+        self.started = time.time()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self.output = JobOutput(sys.stdout)
+
+        start = time.perf_counter()
+        self.preload()
+        print(f"📦 Loaded {', '.join(PRELOAD)} in {time.perf_counter() - start:.1f}s")
+
+        from gms import get_maps_driver
+        from driver_pool import DriverPool
+        from functools import partial
+        from new_email_ext import make_pool, make_limiter, make_cache, make_store, pool_size
+
+        self.cache = make_cache(args)
+        self.store = make_store(args)
+        self.email_pool = make_pool(pool_size(args), args.recycle_pages, args.recycle_memory_mb,
+                                    args.checkout_timeout)
+        self.place_pool = DriverPool(partial(get_maps_driver, 'place'), size=args.detail_concurrency, reset=False)
+        self.limiter = make_limiter(args, self.email_pool)
+        if args.warm:
+            self.warm(args.warm)
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def preload(self):
+        import importlib
+        for name in PRELOAD:
+            importlib.import_module(name)
+
+    def warm(self, count):
+        """Start `count` Chrome sessions in each pool; a missing Chrome only means jobs start them later."""
+        for name, pool in (('place page', self.place_pool), ('email', self.email_pool)):
+            start = time.perf_counter()
+            try:
+                started = pool.warm(count)
+            except Exception as e:
+                print(f"⚠️ Could not start {name} Chrome sessions: {e}")
+                continue
+            print(f"🔥 {started} {name} Chrome sessions ready in {time.perf_counter() - start:.1f}s")
+
+    def submit(self, kind, args):
+        """Validate and queue a job. Raises ServiceError for an unknown kind or arguments."""
+        if kind not in KINDS:
+            raise ServiceError(f"unknown job kind {kind!r}, expected one of {', '.join(KINDS)}")
+        if not isinstance(args, dict):
+            raise ServiceError("args must be an object")
+        check_args(kind, args)
+        with self._lock:
+            job = ServiceJob(str(self._next_id), kind, args)
+            self._next_id += 1
+            self.jobs[job.id] = job
+            # Forget the oldest finished jobs
+            finished = [old for old in self.jobs.values() if old.state in FINISHED]
+            for old in finished[:max(len(self.jobs) - self.args.keep_jobs, 0)]:
+                del self.jobs[old.id]
+        self._queue.put(job)
+        return job
+
+    def run_scrape(self, job):
+        from gms import scrape_location
+
+        args = dict(job.args)
+        location = args.pop('location')
+        if args.get('bbox') is not None:
+            args['bbox'] = tuple(args['bbox'])
+        return {'file': scrape_location(location, detail_pool=self.place_pool, email_pool=self.email_pool, **args)}
+
+    def run_emails(self, job):
+        from new_email_ext import batch_process_from_excel, extract_websites, normalize_url, updated_path
+        from email_cache import ERROR
+
+        engine = job.args.get('engine', 'auto')
+        if 'files' in job.args:
+            from batch_email_extract import process_merged
+            summary = process_merged(job.args['files'], engine, self.email_pool, self.cache, self.store, self.limiter)
+            return {'files': [updated_path(file) for file in job.args['files']], 'summary': summary}
+        if 'file' in job.args:
+            batch_process_from_excel(job.args['file'], engine, self.email_pool, self.cache, self.store, self.limiter,
+                                     job.args.get('chunk_rows'))
+            return {'file': updated_path(job.args['file'])}
+
+        websites = dict(enumerate(job.args['websites']))
+        emails = {}
+        pending = {}
+        for key, website in websites.items():
+            entry = self.cache.get(normalize_url(website)) if self.cache is not None and normalize_url(website) else None
+            if entry:
+                emails[website] = entry.email
+                job.emit({'type': 'result', 'website': website, 'email': entry.email, 'status': entry.status})
+            else:
+                pending[key] = website
+
+        def record(key, email, status, reason=None):
+            website = websites[key]
+            if self.cache is not None and normalize_url(website):
+                self.cache.put(normalize_url(website), email if status != ERROR else None, status, reason)
+            emails[website] = email if status != ERROR else None
+            job.emit({'type': 'result', 'website': website, 'email': email, 'status': status})
+
+        if pending:
+            self.limiter = extract_websites(pending, engine, self.email_pool, self.limiter, record)
+        return {'emails': emails}
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job.set_state(RUNNING)
+            self.output.attach(job)
+            try:
+                result = self.run_scrape(job) if job.kind == SCRAPE else self.run_emails(job)
+            except Exception as e:
+                # Clients print the error from the job's state
+                self.output.attach(None)
+                print(f"❌ Job {job.id} failed: {e}")
+                job.set_state(FAILED, error=str(e))
+            else:
+                self.output.attach(None)
+                job.set_state(DONE, result=result)
+
+    def health(self):
+        counts = {}
+        for job in list(self.jobs.values()):
+            counts[job.state] = counts.get(job.state, 0) + 1
+        return {'status': 'ok', 'pid': os.getpid(), 'uptime': round(time.time() - self.started, 1), 'jobs': counts,
+                'place_pool': self.place_pool.metrics(), 'email_pool': self.email_pool.metrics()}
+
+    def close(self):
+        self._queue.put(None)
+        self.place_pool.close()
+        self.email_pool.close()
+
+
+def check_args(kind, args):
+    """Reject arguments the job's function does not take, before the job is queued."""
+    import inspect
+
+    if kind == SCRAPE:
+        from gms import scrape_location
+        if not args.get('location'):
+            raise ServiceError("a scrape job needs a location")
+        accepted = set(inspect.signature(scrape_location).parameters) - {'detail_pool', 'email_pool'}
+    else:
+        if sum(name in args for name in ('file', 'files', 'websites')) != 1:
+            raise ServiceError("an emails job needs one of a file, a list of files or a list of websites")
+        for file in [args['file']] if 'file' in args else args.get('files', []):
+            if not os.path.exists(file):
+                raise ServiceError(f"file not found on the service's machine: {file}")
+        accepted = {'file', 'files', 'websites', 'engine', 'chunk_rows'}
+    unknown = set(args) - accepted
+    if unknown:
+        raise ServiceError(f"unknown {kind} argument(s): {', '.join(sorted(unknown))}")
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    The job API:
+
+        POST /jobs                     {"kind": "scrape" | "emails", "args": {...}} -> the queued job
+        GET  /jobs                     every job the service remembers
+        GET  /jobs/<id>                one job's state and result
+        GET  /jobs/<id>/events?after=N the job's events as JSON lines, streamed until it finishes
+        GET  /health                   uptime, job counts and Chrome pool metrics
+    """
+    service = None
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != '/jobs':
+            self.send_json(404, {'error': 'not found'})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            job = self.service.submit(body.get('kind'), body.get('args', {}))
+        except (ValueError, AttributeError):
+            self.send_json(400, {'error': 'the body must be a JSON object'})
+            return
+        except ServiceError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        self.send_json(202, job.summary())
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        if parts == ['health']:
+            self.send_json(200, self.service.health())
+        elif parts == ['jobs']:
+            self.send_json(200, [job.summary() for job in list(self.service.jobs.values())])
+        elif len(parts) in (2, 3) and parts[0] == 'jobs' and parts[1] in self.service.jobs:
+            job = self.service.jobs[parts[1]]
+            if len(parts) == 2:
+                self.send_json(200, job.summary())
+            elif parts[2] == 'events':
+                self.stream_events(job, int(parse_qs(url.query).get('after', ['0'])[0]))
+            else:
+                self.send_json(404, {'error': 'not found'})
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def stream_events(self, job, after):
+        # HTTP/1.0 without a Content-Length: the client reads lines until the connection closes
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        finished = False
+        while not finished:
+            events, finished = job.wait_events(after, timeout=15)
+            after += len(events)
+            try:
+                # An empty line keeps idle connections alive through long detail stages
+                self.wfile.write(''.join(json.dumps(event) + '\n' for event in events).encode() or b'\n')
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+    def log_message(self, *args):
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        return request, ('local', 0)
+
+
+def start_service(args):
+    """Start the service and its API server. Returns (service, server)."""
+    # Work the service runs must not be sent back to it, e.g. by the subprocess email mode
+    os.environ.pop(SERVICE_ENV, None)
+    import rate_limit
+    import resource_policy
+    from new_email_ext import install_scheduler
+    from rate_limit import TokenBucket
+
+    resource_policy.set_policy(args.resource_policy)
+    install_scheduler(args)
+    rate_limit.install(TokenBucket(args.rate, args.burst))
+
+    service = ScrapeService(args)
+    sys.stdout = service.output
+    handler = type('Handler', (ServiceHandler,), {'service': service})
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = UnixHTTPServer(args.socket, handler)
+        address = f'unix:{args.socket}'
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), handler)
+        server.daemon_threads = True
+        address = f'http://{args.host}:{server.server_address[1]}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🛰️ Service listening on {address}")
+    return service, server
+
+
+# Client side: standard library only, so thin clients start without loading pandas, Selenium or aiohttp
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def connect(address, timeout=30):
+    """HTTP connection to a service address: http://host:port or unix:<socket path>."""
+    if address.startswith('unix:'):
+        return UnixHTTPConnection(address[len('unix:'):], timeout)
+    url = urlparse(address if '://' in address else f'http://{address}')
+    return http.client.HTTPConnection(url.hostname, url.port or DEFAULT_PORT, timeout=timeout)
+
+
+def call(address, method, path, body=None):
+    """One API call. Returns the decoded JSON response; raises ServiceError on failure."""
+    connection = connect(address)
+    try:
+        connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                           headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        data = json.loads(response.read() or b'null')
+    except (OSError, http.client.HTTPException) as e:
+        raise ServiceError(f"service at {address} is not reachable: {e}")
+    finally:
+        connection.close()
+    if response.status >= 400:
+        raise ServiceError(data.get('error') if isinstance(data, dict) else f"HTTP {response.status}")
+    return data
+
+
+def submit_job(address, kind, args):
+    """Queue a job on the service. Returns its summary."""
+    return call(address, 'POST', '/jobs', {'kind': kind, 'args': args})
+
+
+def job_events(address, job_id, after=0):
+    """Yield a job's events as they happen, from the `after`-th on, until it finishes."""
+    connection = connect(address, timeout=None)
+    try:
+        connection.request('GET', f'/jobs/{job_id}/events?after={after}')
+        response = connection.getresponse()
+        if response.status != 200:
+            raise ServiceError(f"job {job_id} not found on {address}")
+        for line in response:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        connection.close()
+
+
+def follow_job(address, job_id):
+    """Print a job's output as it runs. Returns the finished job's summary."""
+    try:
+        for event in job_events(address, job_id):
+            if event['type'] == 'log':
+                print(event['line'], flush=True)
+            elif event['type'] == 'result':
+                print(f"{'✔️ Found' if event['email'] else '❌ No'} email on {event['website']}: "
+                      f"{event['email'] or 'N/A'}", flush=True)
+    except KeyboardInterrupt:
+        print(f"\n🛰️ Job {job_id} keeps running on the service; follow it with: python service.py watch {job_id}")
+        raise
+    job = call(address, 'GET', f'/jobs/{job_id}')
+    if job['state'] == FAILED:
+        print(f"❌ Job {job_id} failed: {job['error']}")
+    return job
+
+
+def run_remote(address, kind, args):
+    """Run a job on the service and stream its output here, as if it ran in this process."""
+    job = submit_job(address, kind, args)
+    print(f"🛰️ Job {job['id']} ({kind}) queued on {address}")
+    return follow_job(address, job['id'])
+
+
+def add_service_arguments(parser):
+    """Add the --remote option the CLIs use to hand their work to a running service."""
+    parser.add_argument('--remote', default=os.environ.get(SERVICE_ENV),
+                        help=f'Run the work on a running service.py (http://host:port or unix:<socket>) '
+                             f'instead of in this process (default: ${SERVICE_ENV})')
+
+
+def main():
+    from new_email_ext import (add_cache_arguments, add_store_arguments, add_metrics_arguments,
+                               add_concurrency_arguments, add_host_arguments, DEFAULT_RECYCLE_PAGES,
+                               DEFAULT_RECYCLE_MEMORY_MB, DEFAULT_CHECKOUT_TIMEOUT)
+    from detail_fetcher import DEFAULT_DETAIL_CONCURRENCY
+    from rate_limit import DEFAULT_RATE, DEFAULT_BURST
+
+    parser = argparse.ArgumentParser(description='Long-lived scrape service with warm Chrome sessions, and its client')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help='Run the service in the foreground')
+    serve.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port to listen on (default: {DEFAULT_PORT})')
+    serve.add_argument('--socket', help='Listen on this Unix socket instead of a TCP port')
+    serve.add_argument('--warm', type=int, default=DEFAULT_WARM,
+                       help=f'Chrome sessions started per pool before the first job (default: {DEFAULT_WARM})')
+    serve.add_argument('--keep-jobs', type=int, default=DEFAULT_KEEP_JOBS,
+                       help=f'Finished jobs remembered for status queries (default: {DEFAULT_KEEP_JOBS})')
+    serve.add_argument('--detail-concurrency', type=int, default=DEFAULT_DETAIL_CONCURRENCY,
+                       help=f'Chrome sessions for place pages (default: {DEFAULT_DETAIL_CONCURRENCY})')
+    serve.add_argument('--pool-size', type=int,
+                       help='Maximum number of email Chrome sessions (default: the concurrency ceiling)')
+    serve.add_argument('--recycle-pages', type=int, default=DEFAULT_RECYCLE_PAGES,
+                       help=f'Restart a Chrome session after this many pages (default: {DEFAULT_RECYCLE_PAGES})')
+    serve.add_argument('--recycle-memory-mb', type=int, default=DEFAULT_RECYCLE_MEMORY_MB,
+                       help=f'Restart a Chrome session above this memory use (default: {DEFAULT_RECYCLE_MEMORY_MB})')
+    serve.add_argument('--checkout-timeout', type=float, default=DEFAULT_CHECKOUT_TIMEOUT,
+                       help=f'Seconds to wait for a free Chrome session (default: {DEFAULT_CHECKOUT_TIMEOUT})')
+    serve.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                       help=f'Maps page loads per second (default: {DEFAULT_RATE})')
+    serve.add_argument('--burst', type=int, default=DEFAULT_BURST,
+                       help=f'Page loads allowed back to back (default: {DEFAULT_BURST})')
+    add_cache_arguments(serve)
+    add_store_arguments(serve)
+    add_metrics_arguments(serve, profile=False)
+    add_concurrency_arguments(serve)
+    add_host_arguments(serve)
+
+    for name, help_text in (('status', 'Show the service health and its jobs'),
+                            ('watch', "Stream a job's output until it finishes")):
+        command = commands.add_parser(name, help=help_text)
+        add_service_arguments(command)
+        if name == 'watch':
+            command.add_argument('job', help='Job ID')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        from metrics import metrics
+
+        service, server = start_service(args)
+        if args.metrics_port:
+            metrics.serve(args.metrics_port)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            print("\n🛑 Service stopping")
+        finally:
+            server.shutdown()
+            service.close()
+            if args.socket and os.path.exists(args.socket):
+                os.remove(args.socket)
+        return
+
+    address = args.remote or DEFAULT_ADDRESS
+    try:
+        if args.command == 'status':
+            health = call(address, 'GET', '/health')
+            print(f"🛰️ {address}: up {health['uptime']:.0f}s, pid {health['pid']}, jobs "
+                  + (', '.join(f'{state} {count}' for state, count in health['jobs'].items()) or 'none'))
+            for job in call(address, 'GET', '/jobs'):
+                target = job['args'].get('location') or job['args'].get('file') or \
+                    (f"{len(job['args']['files'])} files" if 'files' in job['args'] else
+                     f"{len(job['args'].get('websites', []))} websites")
+                print(f"{job['id']:>5} {job['kind']:7} {job['state']:8} {target}"
+                      + (f"  {job['error']}" if job['error'] else ''))
+        else:
+            follow_job(address, args.job)
+    except ServiceError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import os
+import time
+import socket
+import argparse
+import threading
+import multiprocessing
+
+import rate_limit
+import resource_policy
+from job_queue import (open_queue, add_queue_arguments, LOCATION_QUEUE, WEBSITE_QUEUE, DEFAULT_VISIBILITY, READY,
+                       LEASED, DEAD)
+from rate_limit import TokenBucket, DEFAULT_RATE, DEFAULT_BURST
+from multi_location_scraper import backoff_delay, DEFAULT_BACKOFF
+from new_email_ext import (extract_websites, normalize_url, make_pool, make_limiter, print_pool_metrics, pool_size,
+                           add_cache_arguments, make_cache, add_metrics_arguments, add_concurrency_arguments,
+                           add_host_arguments, install_scheduler, profile_file, ERROR, DEFAULT_RECYCLE_PAGES,
+                           DEFAULT_RECYCLE_MEMORY_MB, DEFAULT_CHECKOUT_TIMEOUT)
+from metrics import metrics, profiled
+
+DEFAULT_PROCESSES = 2
+DEFAULT_BATCH = 20
+DEFAULT_POLL = 5
+
+
+class Heartbeat:
+    """Background thread that renews the leases of the jobs a worker holds every third of the visibility timeout."""
+
+    def __init__(self, queue, owner, visibility=DEFAULT_VISIBILITY):
+        self.queue = queue
+        self.owner = owner
+        self.visibility = visibility
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def hold(self, jobs):
+        with self._lock:
+            self.jobs.update((job.id, job) for job in jobs)
+
+    def drop(self, job):
+        with self._lock:
+            self.jobs.pop(job.id, None)
+
+    def held(self):
+        with self._lock:
+            return list(self.jobs.values())
+
+    def _run(self):
+        while not self._stop.wait(self.visibility / 3):
+            jobs = self.held()
+            if not jobs:
+                continue
+            try:
+                renewed = self.queue.heartbeat(jobs, self.owner, self.visibility)
+            except Exception as e:
+                print(f"⚠️ Heartbeat failed: {e}")
+                continue
+            for job in jobs:
+                if job.id not in renewed:
+                    # Another worker may already be running it; our result will be ignored
+                    metrics.incr('leases_lost')
+                    print(f"⚠️ Lost the lease on {job.key}")
+                    self.drop(job)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class Worker:
+    """
+    One worker process: leases jobs from the queues, runs them and settles them.
+
+    Location jobs run one at a time through gms.scrape_location. Website jobs
+    are leased in batches and extracted like a sheet in new_email_ext.py, with
+    the Chrome pool and learned concurrency kept across batches. A failed job
+    is retried after an exponential backoff until it runs out of attempts and
+    is dead-lettered.
+    """
+
+    def __init__(self, args, owner):
+        self.args = args
+        self.owner = owner
+        self.queue = open_queue(args.queue_backend, args.queue_path)
+        self.heartbeat = Heartbeat(self.queue, owner, args.visibility)
+        self.cache = make_cache(args)
+        self.pool = None
+        self.limiter = None
+
+    def settle(self, job, error=None, result=None):
+        """Complete a job, or fail it with a backoff before the next attempt."""
+        self.heartbeat.drop(job)
+        if error is None:
+            if self.queue.complete(job, self.owner, result):
+                metrics.incr('jobs_done')
+            return
+        outcome = self.queue.fail(job, self.owner, error, backoff_delay(job.attempts, self.args.backoff))
+        metrics.incr('jobs_dead' if outcome == DEAD else 'jobs_retried')
+        if outcome == DEAD:
+            print(f"💀 {job.key} failed {job.attempts} times and was dead-lettered: {error}")
+        return outcome
+
+    def run_location(self, job):
+        from gms import scrape_location
+
+        location, service = job.payload['location'], job.payload['service']
+        print(f"📍 {location} ({service}), attempt {job.attempts}/{job.max_attempts}")
+        start = time.perf_counter()
+        try:
+            # Retries pick up from the failed attempt's journal
+            excel_file = scrape_location(location, service, resume=job.attempts > 1,
+                                         tiled=job.payload.get('tiled', False),
+                                         refresh=job.payload.get('refresh', False),
+                                         backend=job.payload.get('backend', 'dom'))
+        except Exception as e:
+            print(f"❌ Error scraping {location}: {e}")
+            self.settle(job, error=str(e))
+            return
+        metrics.observe('location', time.perf_counter() - start)
+        self.settle(job, result={'file': excel_file})
+        print(f"✅ {location} in {time.perf_counter() - start:.0f}s")
+
+    def run_websites(self, jobs):
+        jobs = {job.id: job for job in jobs}
+        websites = {}
+        for job_id, job in jobs.items():
+            website = job.payload['website']
+            entry = self.cache.get(normalize_url(website)) if self.cache is not None else None
+            if entry:
+                self.settle(job, result={'email': entry.email, 'status': entry.status})
+            else:
+                websites[job_id] = website
+        if not websites:
+            return
+
+        if self.pool is None and self.args.engine != 'http':
+            args = self.args
+            self.pool = make_pool(pool_size(args), args.recycle_pages, args.recycle_memory_mb, args.checkout_timeout)
+            self.limiter = make_limiter(args, self.pool)
+
+        def record(job_id, email, status, reason=None):
+            job = jobs[job_id]
+            last_attempt = job.attempts >= job.max_attempts
+            if self.cache is not None and normalize_url(job.payload['website']) and (status != ERROR or last_attempt):
+                self.cache.put(normalize_url(job.payload['website']), email if status != ERROR else None, status, reason)
+            if status == ERROR:
+                self.settle(job, error=reason or email)
+            else:
+                self.settle(job, result={'email': email, 'status': status})
+            print(f"{'✔️ Found' if email else '❌ No'} email on {job.payload['website']}: {email or 'N/A'}")
+
+        self.limiter = extract_websites(websites, self.args.engine, self.pool, self.limiter, record)
+
+    def pending(self):
+        """Whether the queues this worker serves still have ready or leased jobs."""
+        counts = self.queue.counts()
+        return any(counts.get(name, {}).get(state) for name in self.args.queues for state in (READY, LEASED))
+
+    def run(self):
+        args = self.args
+        print(f"👷 Worker {self.owner} serving {', '.join(args.queues)}")
+        try:
+            while True:
+                for name in args.queues:
+                    jobs = self.queue.lease(name, self.owner, 1 if name == LOCATION_QUEUE else args.batch,
+                                            args.visibility)
+                    if jobs:
+                        break
+                if not jobs:
+                    if args.exit_when_empty and not self.pending():
+                        break
+                    time.sleep(args.poll)
+                    continue
+
+                self.heartbeat.hold(jobs)
+                if name == LOCATION_QUEUE:
+                    self.run_location(jobs[0])
+                else:
+                    self.run_websites(jobs)
+        except KeyboardInterrupt:
+            print(f"\n🛑 Worker {self.owner} stopping")
+        finally:
+            # Unfinished jobs go straight back to the queue instead of waiting for their leases to expire
+            for job in self.heartbeat.held():
+                self.queue.release(job, self.owner)
+            self.heartbeat.stop()
+            if self.pool is not None:
+                print_pool_metrics(self.pool)
+                self.pool.close()
+            self.queue.close()
+
+
+def work(args, bucket, index=0):
+    """
+    Entry point of one worker process; every process of a machine shares the Maps token bucket.
+
+    Each process serves its own metrics, process `index` on --metrics-port + index.
+    """
+    if args.metrics_port:
+        metrics.serve(args.metrics_port + index)
+    rate_limit.install(bucket)
+    resource_policy.set_policy(args.resource_policy)
+    install_scheduler(args)
+    with profiled(args.profile, profile_file(args.profile)):
+        Worker(args, f"{socket.gethostname()}:{os.getpid()}").run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run jobs from the job queue; start one per machine')
+    add_queue_arguments(parser)
+    parser.add_argument('--queues', nargs='+', choices=[LOCATION_QUEUE, WEBSITE_QUEUE],
+                        default=[LOCATION_QUEUE, WEBSITE_QUEUE],
+                        help='Queues to serve, in order of priority (default: locations websites)')
+    parser.add_argument('--processes', type=int, default=DEFAULT_PROCESSES,
+                        help=f'Worker processes on this machine (default: {DEFAULT_PROCESSES})')
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH,
+                        help=f'Website jobs leased at once (default: {DEFAULT_BATCH})')
+    parser.add_argument('--visibility', type=float, default=DEFAULT_VISIBILITY,
+                        help=f'Seconds a lease lasts without a heartbeat (default: {DEFAULT_VISIBILITY})')
+    parser.add_argument('--backoff', type=float, default=DEFAULT_BACKOFF,
+                        help=f'Base retry delay in seconds, jittered and doubled per attempt (default: {DEFAULT_BACKOFF})')
+    parser.add_argument('--poll', type=float, default=DEFAULT_POLL,
+                        help=f'Seconds to wait when the queues are empty (default: {DEFAULT_POLL})')
+    parser.add_argument('--exit-when-empty', action='store_true',
+                        help='Stop once no job is ready or leased instead of waiting for new ones')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help=f'Maps page loads per second across the processes of this machine (default: {DEFAULT_RATE})')
+    parser.add_argument('--burst', type=int, default=DEFAULT_BURST,
+                        help=f'Page loads allowed back to back (default: {DEFAULT_BURST})')
+    parser.add_argument('--engine', choices=['http', 'browser', 'auto'], default='auto',
+                        help='Email extraction engine (default: auto)')
+    parser.add_argument('--pool-size', type=int,
+                        help='Maximum number of Chrome sessions per process (default: the concurrency ceiling)')
+    parser.add_argument('--recycle-pages', type=int, default=DEFAULT_RECYCLE_PAGES,
+                        help=f'Restart a Chrome session after this many pages (default: {DEFAULT_RECYCLE_PAGES})')
+    parser.add_argument('--recycle-memory-mb', type=int, default=DEFAULT_RECYCLE_MEMORY_MB,
+                        help=f'Restart a Chrome session above this memory use (default: {DEFAULT_RECYCLE_MEMORY_MB})')
+    parser.add_argument('--checkout-timeout', type=float, default=DEFAULT_CHECKOUT_TIMEOUT,
+                        help=f'Seconds to wait for a free Chrome session (default: {DEFAULT_CHECKOUT_TIMEOUT})')
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    add_concurrency_arguments(parser)
+    add_host_arguments(parser)
+    args = parser.parse_args()
+
+    bucket = TokenBucket(args.rate, args.burst)
+    if args.processes == 1:
+        work(args, bucket)
+        return
+
+    processes = [multiprocessing.Process(target=work, args=(args, bucket, i)) for i in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Ctrl+C reaches every process; wait for them to hand their jobs back
+        for process in processes:
+            process.join()
+    print(f"\n✅ {args.processes} workers stopped")
+
+
+if __name__ == "__main__":
+    main()